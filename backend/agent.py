@@ -16,12 +16,19 @@ from sqlalchemy import create_engine
 import pandas as pd
 from pydantic import PrivateAttr
 from pinecone import Pinecone
+from concurrent.futures import ThreadPoolExecutor
+from search_index import RESULT_COLUMNS, SEARCH_COLUMN, any_word_query, reciprocal_rank_fusion, search_documents
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in .env file.")
 SQL_ENGINE = create_engine(DATABASE_URL)
 
+# Semantic search: each hybrid leg returns CANDIDATES_PER_LEG hits, fused down to HYBRID_RESULTS
+VECTOR_RESULTS = 5
+CANDIDATES_PER_LEG = 20
+HYBRID_RESULTS = 5
+
 class SQLQueryTool(BaseTool):
     name: str = "sql_query"
     description: str = "Execute SQL queries on the database. Use for specific data questions, counts, analytics, etc."
@@ -111,68 +118,131 @@ class SQLSchemaTool(BaseTool):
             return f"Schema Error: {str(e)}"
 
 class SemanticSearchTool(BaseTool):
-    """Tool for semantic/vector search with full post/comment retrieval"""
+    """
+    Tool for semantic/vector search with full post/comment retrieval.
+
+    In hybrid mode (the default) a lexical full-text query runs next to the vector
+    query and the two rankings are merged with reciprocal rank fusion, so exact terms
+    (usernames, product names, hashtags) surface even when the embedding misses them.
+    """
     name: str = "semantic_search"
-    description: str = "Search for content based on semantic similarity. Returns table, row_id, snippet, and full text."
+    description: str = "Search for content based on semantic similarity and matching words. Returns table, row_id, snippet, and full text."
     
     _index: Any = PrivateAttr()
     _embedding_model: Any = PrivateAttr()
     _db_engine: Any = PrivateAttr() 
+    _mode: str = PrivateAttr()
 
-    def __init__(self, index, embedding_model, db_engine=None, **kwargs):
+    def __init__(self, index, embedding_model, db_engine=None, mode="hybrid", **kwargs):
         super().__init__(**kwargs)
         self._index = index
         self._embedding_model = embedding_model
         self._db_engine = db_engine
+        self._mode = mode if db_engine is not None else "vector"
     
     def _run(self, query: str) -> str:
         try:
-            query_embedding = self._embedding_model.encode(query).tolist()
-            results = self._index.query(
-                vector=query_embedding,
-                top_k=5,
-                include_metadata=True
-            )
-            
-            if not results.matches:
+            if self._mode == "hybrid":
+                # Both legs wait on I/O (Pinecone, Postgres), so they overlap well in threads
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    vector_future = pool.submit(self._vector_candidates, query, CANDIDATES_PER_LEG)
+                    lexical_future = pool.submit(self._lexical_candidates, query, CANDIDATES_PER_LEG)
+                    rankings = {"vector": vector_future.result(), "lexical": lexical_future.result()}
+                hits = reciprocal_rank_fusion(rankings)[:HYBRID_RESULTS]
+            else:
+                hits = [
+                    {**candidate, "relevance_score": candidate["score"], "matched_by": ["vector"]}
+                    for candidate in self._vector_candidates(query, VECTOR_RESULTS)
+                ]
+
+            if not hits:
                 return "[]"
-            
+
+            full_rows = self._fetch_rows(hits)
             formatted_results = []
-            for match in results.matches:
-                try:
-                    table_name, row_id_str = match.id.rsplit("_", 1)
-                    row_id = int(row_id_str)
-                except Exception:
-                    table_name = match.metadata.get("source", "unknown")
-                    row_id = None
-
-                content = match.metadata.get("text", "No content available")
+            for hit in hits:
+                content = hit["text"] or "No content available"
                 snippet = content[:200] + "..." if len(content) > 200 else content
-
-                full_content = content
-                if self._db_engine and row_id:
-                    try:
-                        sql = f"SELECT * FROM {table_name} WHERE source_id = {row_id}"
-                        df = pd.read_sql(sql, self._db_engine)
-                        if not df.empty:
-                            full_content = df.iloc[0].to_dict()
-                    except Exception as e:
-                        pass
-
                 formatted_results.append({
-                    "table_name": table_name,
-                    "row_id": row_id,
-                    "source": match.metadata.get("source", table_name),
+                    "table_name": hit["table_name"],
+                    "row_id": hit["row_id"],
+                    "source": hit["table_name"],
                     "content_snippet": snippet,
-                    "full_content": full_content,
-                    "relevance_score": round(match.score, 3)
+                    "full_content": full_rows.get((hit["table_name"], hit["row_id"]), content),
+                    "relevance_score": round(hit["relevance_score"], 4),
+                    "matched_by": hit["matched_by"]
                 })
             
-            return json.dumps(formatted_results, indent=2)
+            return json.dumps(formatted_results, indent=2, default=str)
         
         except Exception as e:
             return f"Semantic Search Error: {str(e)}"
 
+    def _vector_candidates(self, query, top_k):
+        query_embedding = self._embedding_model.encode(query).tolist()
+        results = self._index.query(
+            vector=query_embedding,
+            top_k=top_k,
+            include_metadata=True
+        )
+        candidates = []
+        for match in results.matches:
+            try:
+                table_name, row_id_str = match.id.rsplit("_", 1)
+                row_id = int(row_id_str)
+            except Exception:
+                table_name = match.metadata.get("source", "unknown")
+                row_id = None
+            candidates.append({
+                "table_name": table_name,
+                "row_id": row_id,
+                "text": match.metadata.get("text"),
+                "score": match.score
+            })
+        return candidates
+
+    def _lexical_candidates(self, query, top_k):
+        # Any of the query's words may match; documents matching more of them rank higher
+        lexical_query = any_word_query(query)
+        if not lexical_query:
+            return []
+        try:
+            with self._db_engine.connect() as conn:
+                rows = search_documents(conn, lexical_query, limit=top_k)
+        except Exception as e:
+            print(f"Lexical search unavailable, using vector results only: {e}")
+            return []
+        return [
+            {
+                "table_name": f"{row['platform']}_{row['kind']}s",
+                "row_id": int(row["source_id"]),
+                "text": row["content"],
+                "score": float(row["rank"])
+            }
+            for row in rows[:top_k]
+        ]
+
+    def _fetch_rows(self, hits):
+        """Full rows for the hits, one query per table: {(table_name, row_id): row dict}."""
+        ids_by_table = {}
+        for hit in hits:
+            if hit["row_id"] is not None and hit["table_name"] in RESULT_COLUMNS:
+                ids_by_table.setdefault(hit["table_name"], []).append(hit["row_id"])
+        if self._db_engine is None:
+            return {}
+
+        full_rows = {}
+        for table_name, row_ids in ids_by_table.items():
+            try:
+                sql = f"SELECT * FROM {table_name} WHERE source_id IN ({', '.join(str(int(row_id)) for row_id in row_ids)})"
+                df = pd.read_sql(sql, self._db_engine).drop(columns=[SEARCH_COLUMN], errors="ignore")
+                for row in df.to_dict(orient="records"):
+                    full_rows[(table_name, int(row["source_id"]))] = row
+            except Exception as e:
+                pass
+        return full_rows
+
+
 class DataAnalysisAgent:
     """Main agent class that orchestrates all operations"""
     
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Path, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import create_engine, text
 import pandas as pd
@@ -11,8 +12,9 @@ from sentence_transformers import SentenceTransformer
 # import google.generativeai as genai
 import re
 import json
+import math
 import asyncio
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from collections import defaultdict
 import sqlite3
 import traceback
@@ -22,6 +24,12 @@ import traceback
 # from agent import router_chain, sql_agent_executor, semantic_search_tool, chart_selector_chain
 # from agent import agent_executor
 from agent import create_agent
+from trending import top_trending
+from rollups import LEADERBOARD_SIZE, SENTIMENT_COLUMNS, read_leaderboard, read_sentiment_series, read_sentiment_totals, read_toxicity
+import approx as approximate
+from keyset import RANKED_TABLES, InvalidCursor, board_cursor, fetch_page, ranked_table
+from realtime import ActivityHub
+from search_index import RESULT_COLUMNS, search_documents
 
 load_dotenv()
 # SQL_DB_NAME = 'insights.db'
@@ -31,6 +39,14 @@ if not DATABASE_URL:
     raise ValueError("DATABASE_URL not found in .env file.")
 SQL_ENGINE = create_engine(DATABASE_URL)
 
+# Read-only dashboard queries can run on a local Parquet snapshot (see snapshot.py)
+ANALYTICS_BACKEND = os.getenv("ANALYTICS_BACKEND", "postgres")
+if ANALYTICS_BACKEND == "duckdb":
+    from snapshot import create_snapshot_engine
+    ANALYTICS_ENGINE = create_snapshot_engine(os.getenv("SNAPSHOT_DIR", "snapshot"))
+else:
+    ANALYTICS_ENGINE = SQL_ENGINE
+
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = 'insights-index'
 # GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -40,6 +56,8 @@ pinecone_index = pc.Index(PINECONE_INDEX_NAME)
 # llm = genai.GenerativeModel('gemini-1.5-flash')
 
 agent = None
+# Recent activity ring buffers fed by ingestion, shared by the realtime and trend endpoints
+ACTIVITY_HUB = ActivityHub()
 
 class TopRedditPost(BaseModel):
     title: Optional[str] = "No Title"
@@ -76,6 +94,7 @@ class AnalyticsResponse(BaseModel):
     engagement_stats: Dict[str, Any]
     sentiment_overview: Dict[str, Any]
     top_keywords: List[Dict[str, Any]]
+    approximate: Optional[Dict[str, Any]] = None
 
 class TrendData(BaseModel):
     date: str
@@ -121,6 +140,10 @@ def get_db_connection():
     """Get database connection to Postgres"""
     return SQL_ENGINE.connect()
 
+def get_analytics_connection():
+    """Get a connection for the read-only analytics queries (Postgres or the DuckDB snapshot)"""
+    return ANALYTICS_ENGINE.connect()
+
 # @app.on_event("startup")
 # async def startup_event():
 #     """Initialize the agent on startup"""
@@ -142,7 +165,7 @@ def get_overall_summary():
     Provides a comprehensive summary from all four data tables.
     """
     try:
-        with SQL_ENGINE.connect() as connection:
+        with get_analytics_connection() as connection:
             yt_comments_count = pd.read_sql_query('SELECT COUNT(*) as count FROM youtube_comments', connection).iloc[0]['count']
             rd_comments_count = pd.read_sql_query('SELECT COUNT(*) as count FROM reddit_comments', connection).iloc[0]['count']
             yt_posts_count = pd.read_sql_query('SELECT COUNT(*) as count FROM youtube_posts', connection).iloc[0]['count']
@@ -273,7 +296,7 @@ async def handle_chat_query(query: ChatQuery) -> Union[TextResponse, ChartRespon
 def get_timeseries_data():
     """Provides daily counts of comments for time-series analysis."""
     try:
-        with SQL_ENGINE.connect() as connection:
+        with get_analytics_connection() as connection:
             yt_df = pd.read_sql_query(
                 text("SELECT date_of_comment FROM youtube_comments"),
                 connection,
@@ -312,11 +335,73 @@ def get_timeseries_data():
         print(e)
         raise HTTPException(status_code=500, detail=f"Error fetching time-series data: {e}")
 
+def approximate_overview():
+    """Overview estimated from the content sample; top posts and max views come from the leaderboards"""
+    with get_db_connection() as conn:
+        strata = approximate.populations(conn)
+        posts = approximate.sample_moments(conn, {"views": "views", "engagement": "engagement"}, ["kind = 'post'", "views IS NOT NULL"])
+        sentiment = approximate.sample_moments(conn, {column: column for column in SENTIMENT_COLUMNS})
+        top_reddit = read_leaderboard(conn, "reddit", "post_engagement", 5)
+        top_youtube = read_leaderboard(conn, "youtube", "post_views", 5)
+        max_views = max([row["score"] for platform in ("reddit", "youtube") for row in read_leaderboard(conn, platform, "post_views", 1)] or [0])
+
+    empty = (0, approximate.Estimate(0.0))
+    counts = {key: strata.get(key, empty)[1] for key in [(platform, kind) for platform in ("reddit", "youtube") for kind in ("post", "comment")]}
+    total_posts = counts[("reddit", "post")] + counts[("youtube", "post")]
+    total_comments = counts[("reddit", "comment")] + counts[("youtube", "comment")]
+    average_views = approximate.combined_mean(strata, posts, "views")
+    average_engagement = approximate.combined_mean(strata, posts, "engagement")
+    total_engagement = approximate.combined_total(strata, posts, "engagement")
+    sentiment_overview = {}
+    for column in SENTIMENT_COLUMNS:
+        label = column.replace("sentiment_", "")
+        share = approximate.combined_mean(strata, sentiment, column)
+        sentiment_overview[label] = share.rounded(100, 1)
+        sentiment_overview[f"{label}_ci"] = share.interval(100, 1)
+
+    return AnalyticsResponse(
+        total_posts=round(total_posts.value),
+        total_comments=round(total_comments.value),
+        platforms={
+            platform: {
+                "posts": round(counts[(platform, "post")].value),
+                "posts_ci": counts[(platform, "post")].interval(digits=0),
+                "comments": round(counts[(platform, "comment")].value),
+                "comments_ci": counts[(platform, "comment")].interval(digits=0)
+            }
+            for platform in ("reddit", "youtube")
+        },
+        engagement_stats={
+            "average_views": average_views.rounded(),
+            "average_views_ci": average_views.interval(),
+            "average_engagement": average_engagement.rounded(),
+            "average_engagement_ci": average_engagement.interval(),
+            "max_views": int(max_views),
+            "total_engagement": round(total_engagement.value),
+            "total_engagement_ci": total_engagement.interval(digits=0)
+        },
+        sentiment_overview=sentiment_overview,
+        top_keywords=[
+            {"keyword": f"Reddit: {(row['content'] or '')[:50]}...", "count": row["engagement"]}
+            for row in top_reddit
+        ] + [
+            {"keyword": f"YouTube: {(row['content'] or '')[:50]}...", "count": row["views"]}
+            for row in top_youtube
+        ],
+        approximate=approximate.metadata(
+            strata,
+            total_posts_ci=total_posts.interval(digits=0),
+            total_comments_ci=total_comments.interval(digits=0)
+        )
+    )
+
 @app.get("/api/analytics/overview")
-async def get_analytics_overview() -> AnalyticsResponse:
-    """Get comprehensive analytics overview"""
+async def get_analytics_overview(approx: bool = False) -> AnalyticsResponse:
+    """Get comprehensive analytics overview (estimated from the content sample with approx=true)"""
     try:
-        with get_db_connection() as conn:
+        if approx:
+            return approximate_overview()
+        with get_analytics_connection() as conn:
             # Counts
             reddit_posts = conn.execute(text("SELECT COUNT(*) FROM reddit_posts")).scalar()
             youtube_posts = conn.execute(text("SELECT COUNT(*) FROM youtube_posts")).scalar()
@@ -407,10 +492,12 @@ async def get_analytics_overview() -> AnalyticsResponse:
         raise HTTPException(status_code=500, detail=f"Analytics error: {str(e)}")
 
 @app.get("/api/trends/activity")
-async def get_activity_trends():
-    """Get activity trends over time (Postgres version)"""
+async def get_activity_trends(days: int = Query(30, ge=1, le=30)):
+    """Get daily activity over the last `days` days (from the activity store once it is hydrated)"""
     try:
-        with get_db_connection() as conn:
+        if ACTIVITY_HUB.ready:
+            return ACTIVITY_HUB.store.daily(days)
+        with get_analytics_connection() as conn:
             results = conn.execute(text("""
                 WITH daily_stats AS (
                     SELECT 
@@ -420,7 +507,7 @@ async def get_activity_trends():
                         COUNT(*) as count,
                         SUM(engagement::integer) as total_engagement
                     FROM reddit_posts 
-                    WHERE timestamp::timestamp >= CURRENT_DATE - INTERVAL '30 days'
+                    WHERE timestamp::timestamp >= CURRENT_DATE - :days * INTERVAL '1 day'
                     GROUP BY DATE(timestamp::timestamp)
                     
                     UNION ALL
@@ -432,7 +519,7 @@ async def get_activity_trends():
                         COUNT(*) as count,
                         SUM(engagement::integer) as total_engagement
                     FROM youtube_posts 
-                    WHERE timestamp::timestamp >= CURRENT_DATE - INTERVAL '30 days'
+                    WHERE timestamp::timestamp >= CURRENT_DATE - :days * INTERVAL '1 day'
                     GROUP BY DATE(timestamp::timestamp)
                     
                     UNION ALL
@@ -444,7 +531,7 @@ async def get_activity_trends():
                         COUNT(*) as count,
                         SUM(likes::integer) as total_engagement
                     FROM reddit_comments 
-                    WHERE date_of_comment::timestamp >= CURRENT_DATE - INTERVAL '30 days'
+                    WHERE date_of_comment::timestamp >= CURRENT_DATE - :days * INTERVAL '1 day'
                     GROUP BY DATE(date_of_comment::timestamp)
                     
                     UNION ALL
@@ -456,7 +543,7 @@ async def get_activity_trends():
                         COUNT(*) as count,
                         SUM(likes::integer) as total_engagement
                     FROM youtube_comments 
-                    WHERE date_of_comment::timestamp >= CURRENT_DATE - INTERVAL '30 days'
+                    WHERE date_of_comment::timestamp >= CURRENT_DATE - :days * INTERVAL '1 day'
                     GROUP BY DATE(date_of_comment::timestamp)
                 )
                 SELECT 
@@ -469,7 +556,7 @@ async def get_activity_trends():
                 FROM daily_stats
                 GROUP BY date
                 ORDER BY date
-            """)).fetchall()
+            """), {"days": days}).fetchall()
 
             return [
                 {
@@ -487,459 +574,536 @@ async def get_activity_trends():
         print(f"❌ Error in get_activity_trends:\n{tb}")
         raise HTTPException(status_code=500, detail=f"Trends error: {str(e)}")
 
+def approximate_sentiment(window, granularity, platform):
+    """Sentiment analysis estimated from the content sample, with 95% intervals"""
+    def shares(rows):
+        entry = {}
+        for column in SENTIMENT_COLUMNS:
+            label = column.replace("sentiment_", "")
+            share = approximate.combined_mean(strata, rows, column)
+            entry[label] = share.rounded(100)
+            entry[f"{label}_ci"] = share.interval(100)
+        return entry
+
+    filters, params = [], {}
+    if platform:
+        filters.append("platform = :platform")
+        params["platform"] = platform
+    columns = {column: column for column in SENTIMENT_COLUMNS}
+    with get_db_connection() as conn:
+        strata = approximate.populations(conn)
+        by_stratum = {(row["platform"], row["kind"]): row for row in approximate.sample_moments(conn, columns, filters, params)}
+        trend_filters = filters + [
+            "kind = 'post'",
+            f"""created_at::timestamp >= (
+                SELECT MAX(created_at)::timestamp FROM content_sample
+                WHERE kind = 'post'{' AND platform = :platform' if platform else ''}
+            ) - :days * INTERVAL '1 day'""",
+        ]
+        trend_rows = approximate.sample_moments(
+            conn, columns, trend_filters, {**params, "days": window, "granularity": granularity},
+            period="date_trunc(:granularity, created_at::timestamp)"
+        )
+
+    periods = defaultdict(list)
+    for row in trend_rows:
+        periods[row["period"]].append(row)
+    date_format = '%Y-%m-%d %H:00' if granularity == 'hour' else '%Y-%m-%d'
+    return {
+        "platform_sentiment": [
+            {
+                "category": f"{label} {kind.title()}s",
+                **shares([by_stratum[(item_platform, kind)]]),
+                "total_items": round(approximate.subpopulation(
+                    strata, by_stratum[(item_platform, kind)], by_stratum[(item_platform, kind)]["sentiment_positive_n"]
+                ).value)
+            }
+            for item_platform, label in (('reddit', 'Reddit'), ('youtube', 'YouTube'))
+            for kind in ('post', 'comment')
+            if (item_platform, kind) in by_stratum
+        ],
+        "sentiment_trends": [
+            {"date": period.strftime(date_format), **shares(rows)}
+            for period, rows in sorted(periods.items())
+        ],
+        "approximate": approximate.metadata(strata)
+    }
+
 @app.get("/api/sentiment/analysis")
-async def get_sentiment_analysis():
-    """Get detailed sentiment analysis (Postgres version with timestamp casting)"""
+async def get_sentiment_analysis(
+    window: int = Query(14, ge=1, le=365),
+    granularity: str = Query("day", pattern="^(hour|day|week)$"),
+    platform: Optional[str] = Query(None, pattern="^(reddit|youtube)$"),
+    approx: bool = False,
+):
+    """
+    Get sentiment by platform and content type (all time) and the post sentiment
+    trend over the last `window` days of data, per `granularity`. Averages are
+    sum/count arithmetic over the sentiment_hourly rollup, or estimates from the
+    content sample with approx=true.
+    """
+    if approx:
+        try:
+            return approximate_sentiment(window, granularity, platform)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Sentiment analysis error: {str(e)}")
+
+    def percentages(scored, positive, negative, neutral):
+        scored, positive, negative, neutral = (float(value or 0) for value in (scored, positive, negative, neutral))
+        return {
+            "positive": round(positive / scored * 100, 2) if scored else 0,
+            "negative": round(negative / scored * 100, 2) if scored else 0,
+            "neutral": round(neutral / scored * 100, 2) if scored else 0,
+        }
+
     try:
         with get_db_connection() as conn:
-            # Sentiment by category
-            sentiment_data = conn.execute(text("""
-                SELECT 
-                    'Reddit Posts' as category,
-                    AVG(sentiment_positive) * 100 as positive,
-                    AVG(sentiment_negative) * 100 as negative,
-                    AVG(sentiment_neutral) * 100 as neutral,
-                    COUNT(*) as total_items
-                FROM reddit_posts WHERE sentiment_positive IS NOT NULL
-                
-                UNION ALL
-                
-                SELECT 
-                    'YouTube Posts' as category,
-                    AVG(sentiment_positive) * 100 as positive,
-                    AVG(sentiment_negative) * 100 as negative,
-                    AVG(sentiment_neutral) * 100 as neutral,
-                    COUNT(*) as total_items
-                FROM youtube_posts WHERE sentiment_positive IS NOT NULL
-                
-                UNION ALL
-                
-                SELECT 
-                    'Reddit Comments' as category,
-                    AVG(sentiment_positive) * 100 as positive,
-                    AVG(sentiment_negative) * 100 as negative,
-                    AVG(sentiment_neutral) * 100 as neutral,
-                    COUNT(*) as total_items
-                FROM reddit_comments WHERE sentiment_positive IS NOT NULL
-                
-                UNION ALL
-                
-                SELECT 
-                    'YouTube Comments' as category,
-                    AVG(sentiment_positive) * 100 as positive,
-                    AVG(sentiment_negative) * 100 as negative,
-                    AVG(sentiment_neutral) * 100 as neutral,
-                    COUNT(*) as total_items
-                FROM youtube_comments WHERE sentiment_positive IS NOT NULL
-            """)).fetchall()
+            totals = {(row[0], row[1]): row[2:] for row in read_sentiment_totals(conn, platform)}
+            trend_data = read_sentiment_series(conn, window, granularity, platform)
 
-            # Sentiment trends over last 14 days
-            trend_data = conn.execute(text("""
-                WITH max_ts AS (
-                    SELECT MAX(ts) as max_timestamp
-                    FROM (
-                        SELECT timestamp::timestamp as ts FROM reddit_posts
-                        UNION ALL
-                        SELECT timestamp::timestamp as ts FROM youtube_posts
-                    ) AS combined
-                ),
-                daily_sentiment AS (
-                    SELECT 
-                        DATE(ts) as date,
-                        AVG(sentiment_positive) as positive,
-                        AVG(sentiment_negative) as negative,
-                        AVG(sentiment_neutral) as neutral
-                    FROM (
-                        SELECT timestamp::timestamp as ts, sentiment_positive, sentiment_negative, sentiment_neutral 
-                        FROM reddit_posts
-                        UNION ALL
-                        SELECT timestamp::timestamp as ts, sentiment_positive, sentiment_negative, sentiment_neutral 
-                        FROM youtube_posts
-                    ) AS combined
-                    WHERE ts >= (
-                        SELECT max_timestamp - INTERVAL '14 days' FROM max_ts
-                    )
-                    GROUP BY DATE(ts)
-                    ORDER BY DATE(ts)
-                )
-                SELECT * FROM daily_sentiment
-            """)).fetchall()
-
-            return {
-                "platform_sentiment": [
-                    {
-                        "category": row[0],
-                        "positive": round(row[1] or 0, 2),
-                        "negative": round(row[2] or 0, 2),
-                        "neutral": round(row[3] or 0, 2),
-                        "total_items": row[4]
-                    }
-                    for row in sentiment_data
-                ],
-                "sentiment_trends": [
-                    {
-                        "date": row[0],
-                        "positive": round((row[1] or 0) * 100, 2),
-                        "negative": round((row[2] or 0) * 100, 2),
-                        "neutral": round((row[3] or 0) * 100, 2)
-                    }
-                    for row in trend_data
-                ]
-            }
+        date_format = '%Y-%m-%d %H:00' if granularity == 'hour' else '%Y-%m-%d'
+        return {
+            "platform_sentiment": [
+                {
+                    "category": f"{label} {kind.title()}s",
+                    **percentages(*totals.get((item_platform, kind), (0, 0, 0, 0))),
+                    "total_items": int(totals.get((item_platform, kind), (0,))[0])
+                }
+                for item_platform, label in (('reddit', 'Reddit'), ('youtube', 'YouTube'))
+                if platform in (None, item_platform)
+                for kind in ('post', 'comment')
+            ],
+            "sentiment_trends": [
+                {"date": row[0].strftime(date_format), **percentages(*row[1:])}
+                for row in trend_data
+            ]
+        }
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Sentiment analysis error: {str(e)}")
 
 @app.get("/api/engagement/leaderboard")
-async def get_engagement_leaderboard():
-    """Get top performing content across platforms (Postgres version)"""
+async def get_engagement_leaderboard(
+    limit: int = Query(10, ge=1, le=LEADERBOARD_SIZE),
+    comment_limit: int = Query(5, ge=1, le=LEADERBOARD_SIZE),
+    day: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+):
+    """
+    Get top performing content across platforms from the maintained leaderboards.
+    With `day` (YYYY-MM-DD) the boards of that day are used, which hold the top
+    DAILY_LEADERBOARD_SIZE entries. Otherwise `next_cursor` holds, per list and
+    platform, a cursor for /api/content/ranked that continues after the last entry.
+    """
     try:
         with get_db_connection() as conn:
-            # Top Reddit posts
-            top_reddit = conn.execute(text("""
-                SELECT 
-                    title,
-                    username,
-                    views::integer as views,
-                    engagement::integer as engagement,
-                    ups::integer as ups,
-                    'reddit' as platform
-                FROM reddit_posts 
-                WHERE views IS NOT NULL AND title IS NOT NULL
-                ORDER BY engagement::integer DESC 
-                LIMIT 10
-            """)).fetchall()
-            
-            # Top YouTube posts
-            top_youtube = conn.execute(text("""
-                SELECT 
-                    title,
-                    username,
-                    views::integer as views,
-                    engagement::integer as engagement,
-                    comments::integer as comments,
-                    'youtube' as platform
-                FROM youtube_posts 
-                WHERE views IS NOT NULL AND title IS NOT NULL
-                ORDER BY engagement::integer DESC 
-                LIMIT 10
-            """)).fetchall()
-            
-            # Top comments (Reddit + YouTube)
-            top_comments = conn.execute(text("""
-                SELECT text, username, likes, platform FROM (
-                    SELECT 
-                        text,
-                        username,
-                        likes::integer as likes,
-                        'reddit' as platform
-                    FROM reddit_comments 
-                    WHERE likes IS NOT NULL AND text IS NOT NULL
-                    ORDER BY likes::integer DESC 
-                    LIMIT 5
-                ) AS reddit_top
-                UNION ALL
-                SELECT text, username, likes, platform FROM (
-                    SELECT 
-                        text,
-                        username,
-                        likes::integer as likes,
-                        'youtube' as platform
-                    FROM youtube_comments 
-                    WHERE likes IS NOT NULL AND text IS NOT NULL
-                    ORDER BY likes::integer DESC 
-                    LIMIT 5
-                ) AS youtube_top
-            """)).fetchall()
-            
+            top_reddit = read_leaderboard(conn, "reddit", "post_engagement", limit, day)
+            top_youtube = read_leaderboard(conn, "youtube", "post_engagement", limit, day)
+            comment_boards = {
+                platform: read_leaderboard(conn, platform, "comment_likes", comment_limit, day)
+                for platform in ("reddit", "youtube")
+            }
+            top_comments = [(platform, row) for platform, board in comment_boards.items() for row in board]
+            next_cursor = None
+            if day is None:
+                next_cursor = {
+                    "top_posts": {
+                        "reddit": board_cursor(ranked_table("reddit", "post"), "engagement", top_reddit, limit),
+                        "youtube": board_cursor(ranked_table("youtube", "post"), "engagement", top_youtube, limit),
+                    },
+                    "top_comments": {
+                        platform: board_cursor(ranked_table(platform, "comment"), "likes", board, comment_limit)
+                        for platform, board in comment_boards.items()
+                    },
+                }
+
             return {
                 "top_posts": {
                     "reddit": [
                         {
-                            "title": row[0][:100] + "..." if len(row[0]) > 100 else row[0],
-                            "username": row[1],
-                            "views": row[2],
-                            "engagement": row[3],
-                            "ups": row[4],
-                            "platform": row[5]
+                            "title": row["content"][:100] + "..." if len(row["content"]) > 100 else row["content"],
+                            "username": row["username"],
+                            "views": row["views"],
+                            "engagement": row["engagement"],
+                            "ups": row["ups"],
+                            "platform": "reddit"
                         }
                         for row in top_reddit
                     ],
                     "youtube": [
                         {
-                            "title": row[0][:100] + "..." if len(row[0]) > 100 else row[0],
-                            "username": row[1],
-                            "views": row[2],
-                            "engagement": row[3],
-                            "comments": row[4],
-                            "platform": row[5]
+                            "title": row["content"][:100] + "..." if len(row["content"]) > 100 else row["content"],
+                            "username": row["username"],
+                            "views": row["views"],
+                            "engagement": row["engagement"],
+                            "comments": row["comments"],
+                            "platform": "youtube"
                         }
                         for row in top_youtube
                     ]
                 },
                 "top_comments": [
                     {
-                        "text": row[0][:200] + "..." if len(row[0]) > 200 else row[0],
-                        "username": row[1],
-                        "likes": row[2],
-                        "platform": row[3]
+                        "text": row["content"][:200] + "..." if len(row["content"]) > 200 else row["content"],
+                        "username": row["username"],
+                        "likes": row["likes"],
+                        "platform": platform
                     }
-                    for row in top_comments
-                ]
+                    for platform, row in top_comments
+                ],
+                "next_cursor": next_cursor
             }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Leaderboard error: {str(e)}")
 
+def approximate_toxicity(start, end):
+    """Toxicity analysis estimated from the content sample, with 95% intervals"""
+    filters, params = ["toxicity_code IS NOT NULL"], {}
+    if start:
+        filters.append("LEFT(created_at, 10) >= :start")
+        params["start"] = start
+    if end:
+        filters.append("LEFT(created_at, 10) <= :end")
+        params["end"] = end
+    columns = {
+        "toxic": "CASE WHEN toxicity_code = 1 THEN 1 ELSE 0 END",
+        "non_toxic": "CASE WHEN toxicity_code = 1 THEN 0 ELSE 1 END",
+    }
+    with get_db_connection() as conn:
+        strata = approximate.populations(conn)
+        rows = approximate.sample_moments(conn, columns, filters, params)
+
+    toxicity_distribution = []
+    for kind in ("post", "comment"):
+        kind_rows = [row for row in rows if row["kind"] == kind]
+        for level in ("non_toxic", "toxic"):
+            count = approximate.combined_total(strata, kind_rows, level)
+            if round(count.value):
+                toxicity_distribution.append({
+                    "category": f"{kind.title()}s - {level}",
+                    "count": round(count.value),
+                    "count_ci": count.interval(digits=0),
+                    "level": level
+                })
+
+    platform_comparison = []
+    for platform, label in (("reddit", "Reddit"), ("youtube", "YouTube")):
+        platform_rows = [row for row in rows if row["platform"] == platform]
+        share = approximate.combined_mean(strata, platform_rows, "toxic")
+        toxic = approximate.combined_total(strata, platform_rows, "toxic")
+        total = approximate.combined_count(strata, platform_rows)
+        platform_comparison.append({
+            "platform": label,
+            "toxic_percentage": share.rounded(100),
+            "toxic_percentage_ci": share.interval(100),
+            "toxic_count": round(toxic.value),
+            "toxic_count_ci": toxic.interval(digits=0),
+            "total_count": round(total.value),
+            "total_count_ci": total.interval(digits=0)
+        })
+
+    return {
+        "toxicity_distribution": toxicity_distribution,
+        "platform_comparison": platform_comparison,
+        "approximate": approximate.metadata(strata)
+    }
+
 @app.get("/api/insights/toxicity")
-async def get_toxicity_insights():
-    """Get toxicity analysis"""
+async def get_toxicity_insights(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    approx: bool = False,
+):
+    """
+    Get toxicity analysis, optionally for the days start..end (from the toxicity_daily
+    rollup, or estimated from the content sample with approx=true)
+    """
+    # Parsed as dates so an impossible day is a 422; both sources compare ISO day strings
+    start, end = (day.isoformat() if day else None for day in (start, end))
     try:
-        with SQL_ENGINE.connect() as conn:
-            # Toxicity distribution
-            toxicity_query = text("""
-                SELECT 
-                    toxicity,
-                    COUNT(*) as count,
-                    'posts' as type
-                FROM (
-                    SELECT toxicity FROM reddit_posts WHERE toxicity IS NOT NULL
-                    UNION ALL
-                    SELECT toxicity FROM youtube_posts WHERE toxicity IS NOT NULL
-                ) AS posts
-                GROUP BY toxicity
-                
-                UNION ALL
-                
-                SELECT 
-                    toxicity,
-                    COUNT(*) as count,
-                    'comments' as type
-                FROM (
-                    SELECT toxicity FROM reddit_comments WHERE toxicity IS NOT NULL
-                    UNION ALL
-                    SELECT toxicity FROM youtube_comments WHERE toxicity IS NOT NULL
-                ) AS comments
-                GROUP BY toxicity
-            """)
-            toxicity_data = conn.execute(toxicity_query).fetchall()
-
-            # Platform comparison
-            platform_query = text("""
-                SELECT 
-                    'Reddit' as platform,
-                    SUM(CASE WHEN toxicity = 'toxic' THEN 1 ELSE 0 END) as toxic_count,
-                    COUNT(*) as total_count
-                FROM (
-                    SELECT toxicity FROM reddit_posts WHERE toxicity IS NOT NULL
-                    UNION ALL
-                    SELECT toxicity FROM reddit_comments WHERE toxicity IS NOT NULL
-                ) AS reddit_data
-                
-                UNION ALL
-                
-                SELECT 
-                    'YouTube' as platform,
-                    SUM(CASE WHEN toxicity = 'toxic' THEN 1 ELSE 0 END) as toxic_count,
-                    COUNT(*) as total_count
-                FROM (
-                    SELECT toxicity FROM youtube_posts WHERE toxicity IS NOT NULL
-                    UNION ALL
-                    SELECT toxicity FROM youtube_comments WHERE toxicity IS NOT NULL
-                ) AS youtube_data
-            """)
-            platform_toxicity = conn.execute(platform_query).fetchall()
-
-            return {
-                "toxicity_distribution": [
-                    {
-                        "category": f"{row[2].title()} - {row[0]}",
-                        "count": row[1],
-                        "level": row[0]
-                    }
-                    for row in toxicity_data
-                ],
-                "platform_comparison": [
-                    {
-                        "platform": row[0],
-                        "toxic_percentage": round((row[1] / row[2]) * 100, 2) if row[2] > 0 else 0,
-                        "toxic_count": row[1],
-                        "total_count": row[2]
-                    }
-                    for row in platform_toxicity
-                ]
-            }
+        if approx:
+            return approximate_toxicity(start, end)
+        with get_db_connection() as conn:
+            # One grouped read gives both the per-type and the per-platform figures
+            totals = read_toxicity(conn, start, end)
+
+        toxicity_distribution = []
+        for kind in ('post', 'comment'):
+            scored = sum(counts[0] for (platform, item_kind), counts in totals.items() if item_kind == kind)
+            toxic = sum(counts[1] for (platform, item_kind), counts in totals.items() if item_kind == kind)
+            for level, count in (('non_toxic', scored - toxic), ('toxic', toxic)):
+                if count:
+                    toxicity_distribution.append({"category": f"{kind.title()}s - {level}", "count": count, "level": level})
+
+        platform_comparison = []
+        for platform, label in (('reddit', 'Reddit'), ('youtube', 'YouTube')):
+            scored = sum(counts[0] for (item_platform, kind), counts in totals.items() if item_platform == platform)
+            toxic = sum(counts[1] for (item_platform, kind), counts in totals.items() if item_platform == platform)
+            platform_comparison.append({
+                "platform": label,
+                "toxic_percentage": round((toxic / scored) * 100, 2) if scored > 0 else 0,
+                "toxic_count": toxic,
+                "total_count": scored
+            })
+
+        return {
+            "toxicity_distribution": toxicity_distribution,
+            "platform_comparison": platform_comparison
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Toxicity analysis error: {str(e)}")
 
 @app.get("/api/content/popular")
-async def get_popular_content():
-    """Get most popular content with detailed metrics"""
+async def get_popular_content(
+    limit: int = Query(15, ge=1, le=LEADERBOARD_SIZE),
+    day: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+):
+    """
+    Get the most viewed posts per platform (optionally of one day) from the maintained
+    leaderboards. Without `day`, `next_cursor` holds per platform a cursor for
+    /api/content/ranked?metric=views that continues after the last post.
+    """
     try:
-        with SQL_ENGINE.connect() as conn:
-            query = text("""
-                SELECT * FROM (
-                    SELECT 
-                        title,
-                        username,
-                        CAST(views AS INTEGER) as views,
-                        CAST(engagement AS INTEGER) as engagement,
-                        CAST(comments AS INTEGER) as comment_count,
-                        sentiment_positive,
-                        timestamp,
-                        'reddit' as platform
-                    FROM reddit_posts 
-                    WHERE views IS NOT NULL AND title IS NOT NULL
-                    ORDER BY CAST(views AS INTEGER) DESC 
-                    LIMIT 15
-                ) AS r
-                UNION ALL
-                SELECT * FROM (
-                    SELECT 
-                        title,
-                        username,
-                        CAST(views AS INTEGER) as views,
-                        CAST(engagement AS INTEGER) as engagement,
-                        CAST(comments AS INTEGER) as comment_count,
-                        sentiment_positive,
-                        timestamp,
-                        'youtube' as platform
-                    FROM youtube_posts 
-                    WHERE views IS NOT NULL AND title IS NOT NULL
-                    ORDER BY CAST(views AS INTEGER) DESC 
-                    LIMIT 15
-                ) AS y
-            """)
-
-            result = conn.execute(query).fetchall()
+        with get_db_connection() as conn:
+            boards = {
+                platform: read_leaderboard(conn, platform, "post_views", limit, day)
+                for platform in ("reddit", "youtube")
+            }
+            result = [(platform, row) for platform, board in boards.items() for row in board]
 
             popular_content = [
                 {
-                    "title": row[0][:120] + "..." if row[0] and len(row[0]) > 120 else row[0],
-                    "username": row[1],
-                    "views": row[2],
-                    "engagement": row[3],
-                    "comments": row[4],
-                    "sentiment_score": round((row[5] or 0) * 100, 1),
-                    "timestamp": row[6],
-                    "platform": row[7]
+                    "title": row["content"][:120] + "..." if row["content"] and len(row["content"]) > 120 else row["content"],
+                    "username": row["username"],
+                    "views": row["views"],
+                    "engagement": row["engagement"],
+                    "comments": row["comments"],
+                    "sentiment_score": round((row["sentiment_positive"] or 0) * 100, 1),
+                    "timestamp": row["created_at"],
+                    "platform": platform
                 }
-                for row in result
+                for platform, row in result
             ]
 
-            return popular_content
+            return {
+                "items": popular_content,
+                "next_cursor": None if day else {
+                    platform: board_cursor(ranked_table(platform, "post"), "views", board, limit)
+                    for platform, board in boards.items()
+                }
+            }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Popular content error: {str(e)}")
 
+@app.get("/api/content/ranked")
+async def get_ranked_content(
+    platform: str = Query(..., pattern="^(reddit|youtube)$"),
+    kind: str = Query("post", pattern="^(post|comment)$"),
+    metric: Optional[str] = Query(None, pattern="^(engagement|views|likes)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=500),
+):
+    """
+    Browse posts or comments of one platform by a metric (by default engagement for
+    posts, likes for comments), best first. Pass the returned `next_cursor` to get the
+    following page; it is null on the last page.
+    """
+    table_name = ranked_table(platform, kind)
+    metric = metric or RANKED_TABLES[table_name]["metrics"][0]
+    if metric not in RANKED_TABLES[table_name]["metrics"]:
+        raise HTTPException(status_code=400, detail=f"{kind.title()}s can be ranked by: {', '.join(RANKED_TABLES[table_name]['metrics'])}")
+    try:
+        with get_db_connection() as conn:
+            rows, next_cursor = fetch_page(conn, table_name, metric, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ranked content error: {str(e)}")
+
+    return {
+        "items": [
+            {"source_id": row["source_id"], "platform": platform, **{column: row[column] for column in RANKED_TABLES[table_name]["columns"]}}
+            for row in rows
+        ],
+        "next_cursor": next_cursor
+    }
+
 @app.get("/api/search/trending")
-async def get_trending_keywords():
-    """Get trending keywords and topics"""
+async def get_trending_keywords(
+    days: int = Query(7, ge=1, le=365),
+    platform: Optional[str] = Query(None, pattern="^(reddit|youtube)$"),
+    kind: str = Query("post", pattern="^(post|comment|all)$"),
+    limit: int = Query(20, ge=1, le=200),
+    mode: str = Query("index", pattern="^(index|sketch)$"),
+):
+    """
+    Get trending keywords over the last `days` days of data. mode=index ranks by total
+    engagement from the keyword_daily rollup; mode=sketch ranks by time-decayed mentions
+    from the streaming trending sketch, over all posts and comments.
+    """
     try:
-        with SQL_ENGINE.connect() as conn:
-            query = text("""
-                WITH latest AS (
-                    SELECT MAX(CAST(timestamp AS TIMESTAMP)) AS max_ts FROM reddit_posts
-                    UNION ALL
-                    SELECT MAX(CAST(timestamp AS TIMESTAMP)) AS max_ts FROM youtube_posts
-                ),
-                global_latest AS (
-                    SELECT MAX(max_ts) AS latest_timestamp FROM latest
-                ),
-                reddit_data AS (
-                    SELECT title, CAST(engagement AS INTEGER) as engagement, 'reddit' as platform
-                    FROM reddit_posts, global_latest
-                    WHERE title IS NOT NULL 
-                      AND engagement IS NOT NULL 
-                      AND CAST(timestamp AS TIMESTAMP) >= (global_latest.latest_timestamp - interval '7 days')
-                    ORDER BY CAST(engagement AS INTEGER) DESC 
-                    LIMIT 50
-                ),
-                youtube_data AS (
-                    SELECT title, CAST(engagement AS INTEGER) as engagement, 'youtube' as platform
-                    FROM youtube_posts, global_latest
-                    WHERE title IS NOT NULL 
-                      AND engagement IS NOT NULL 
-                      AND CAST(timestamp AS TIMESTAMP) >= (global_latest.latest_timestamp - interval '7 days')
-                    ORDER BY CAST(engagement AS INTEGER) DESC 
-                    LIMIT 50
+        if mode == "sketch":
+            with get_db_connection() as conn:
+                terms = top_trending(
+                    conn, days=days, limit=limit,
+                    platforms=[platform] if platform else None,
+                    kinds=None if kind == "all" else [kind],
                 )
-                SELECT * FROM reddit_data
-                UNION ALL
-                SELECT * FROM youtube_data;
-            """)
-            result = conn.execute(query)
-            trending_posts = result.fetchall()
-
-            # --- Keyword Processing ---
-            keyword_counts = defaultdict(int)
-            stopwords = {"this", "that", "with", "from", "they", "have", "been", "will", "what", "when", "where"}
+            return [
+                {
+                    "keyword": term,
+                    "trend_score": round(score, 2),
+                    "frequency": count
+                }
+                for term, score, count, error in terms
+            ]
 
-            for title, engagement, platform in trending_posts:
-                words = re.findall(r'\b\w{4,}\b', title.lower())
-                for word in words:
-                    if word not in stopwords:
-                        keyword_counts[word] += engagement
+        filters = ["day > bounds.last_day - :days"]
+        params = {"days": days, "limit": limit}
+        if platform:
+            filters.append("platform = :platform")
+            params["platform"] = platform
+        if kind != "all":
+            filters.append("kind = :kind")
+            params["kind"] = kind
 
-            trending_keywords = sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)[:20]
+        with get_db_connection() as conn:
+            # The window ends at the newest day in the data, like the dumps it is built from
+            rows = conn.execute(text(f"""
+                WITH bounds AS (
+                    SELECT MAX(day) AS last_day FROM keyword_daily
+                )
+                SELECT 
+                    keyword,
+                    SUM(engagement) AS engagement_score,
+                    SUM(mentions) AS frequency
+                FROM keyword_daily, bounds
+                WHERE {' AND '.join(filters)}
+                GROUP BY keyword
+                ORDER BY engagement_score DESC, frequency DESC
+                LIMIT :limit
+            """), params).fetchall()
 
             return [
                 {
-                    "keyword": keyword,
-                    "engagement_score": score,
-                    "frequency": sum(1 for p in trending_posts if keyword in p[0].lower())
+                    "keyword": row[0],
+                    "engagement_score": int(row[1] or 0),
+                    "frequency": int(row[2] or 0)
                 }
-                for keyword, score in trending_keywords
+                for row in rows
             ]
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Trending keywords error: {str(e)}")
 
-@app.get("/api/realtime/activity")
-async def get_realtime_activity():
-    """Get real-time activity metrics from Postgres"""
+@app.get("/api/search")
+async def search_content(
+    q: str = Query(..., min_length=1, max_length=200),
+    platform: Optional[str] = Query(None, pattern="^(reddit|youtube)$"),
+    kind: str = Query("all", pattern="^(post|comment|all)$"),
+    page: int = Query(1, ge=1, le=500),
+    page_size: int = Query(20, ge=1, le=100),
+):
+    """
+    Full-text search over post titles/descriptions and comments, ranked by relevance.
+    `q` takes web-search syntax: "exact phrase", or, -excluded.
+    """
     try:
-        with SQL_ENGINE.connect() as conn:
-            query = text("""
-                SELECT 
-                    TO_CHAR(timestamp::timestamptz, 'HH24') AS hour,
-                    COUNT(*) AS activity_count,
-                    AVG(engagement::FLOAT) AS avg_engagement
-                FROM (
-                    SELECT timestamp::timestamptz, engagement 
-                    FROM reddit_posts 
-                    WHERE timestamp::timestamptz >= NOW() - INTERVAL '1 day'
-                    
-                    UNION ALL
-                    
-                    SELECT timestamp::timestamptz, engagement 
-                    FROM youtube_posts 
-                    WHERE timestamp::timestamptz >= NOW() - INTERVAL '1 day'
-                ) sub
-                GROUP BY TO_CHAR(timestamp::timestamptz, 'HH24')
-                ORDER BY hour
-            """)
-
-            rows = conn.execute(query).mappings().all()
-
-            return [
+        tables = {
+            table: source for table, source in RESULT_COLUMNS.items()
+            if (platform is None or source["platform"] == platform) and kind in ("all", source["kind"])
+        }
+        with get_db_connection() as conn:
+            rows = search_documents(conn, q, tables, limit=page_size, offset=(page - 1) * page_size)
+
+        return {
+            "query": q,
+            "page": page,
+            "page_size": page_size,
+            "has_more": len(rows) > page_size,
+            "results": [
                 {
-                    "hour": f"{int(row['hour']):02d}:00" if row["hour"] else None,
-                    "activity_count": row["activity_count"],
-                    "avg_engagement": round(row["avg_engagement"] or 0, 2)
+                    "platform": row["platform"],
+                    "kind": row["kind"],
+                    "source_id": row["source_id"],
+                    "content": row["content"],
+                    "snippet": row["snippet"],
+                    "created_at": row["created_at"],
+                    "engagement": int(row["engagement"] or 0),
+                    "rank": round(float(row["rank"]), 4)
                 }
-                for row in rows
+                for row in rows[:page_size]
             ]
-
+        }
     except Exception as e:
-        import traceback; traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Real-time activity error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Search error: {str(e)}")
+
+@app.on_event("startup")
+async def start_activity_hub():
+    """Start following ingestion for the realtime endpoints (needs Postgres LISTEN/NOTIFY)"""
+    if SQL_ENGINE.dialect.name == "postgresql":
+        ACTIVITY_HUB.start(SQL_ENGINE, asyncio.get_running_loop())
+
+@app.on_event("shutdown")
+async def stop_activity_hub():
+    ACTIVITY_HUB.stop()
+
+@app.get("/api/realtime/activity")
+async def get_realtime_activity():
+    """Get posts per hour over the last day from the in-memory activity store"""
+    return ACTIVITY_HUB.store.hourly()
+
+@app.get("/api/realtime/stream")
+async def stream_realtime_activity():
+    """
+    Server-sent events: a snapshot of the activity counters, then one message per
+    ingested chunk (and one per minute, as the window rolls forward).
+    """
+    async def events():
+        queue = ACTIVITY_HUB.subscribe()
+        try:
+            yield f"data: {json.dumps(ACTIVITY_HUB.snapshot())}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=15)
+                    yield f"data: {json.dumps(message)}\n\n"
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            ACTIVITY_HUB.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/realtime/ws")
+async def realtime_activity_socket(websocket: WebSocket):
+    """The same messages as /api/realtime/stream, over a WebSocket"""
+    await websocket.accept()
+    queue = ACTIVITY_HUB.subscribe()
+    try:
+        await websocket.send_json(ACTIVITY_HUB.snapshot())
+        while True:
+            await websocket.send_json(await queue.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ACTIVITY_HUB.unsubscribe(queue)
 
 
 @app.get("/api/insights/user-analysis")
-async def get_user_analysis():
-    """Get user behavior analysis"""
+async def get_user_analysis(approx: bool = False):
+    """
+    Get user behavior analysis from the per-user rollup. With approx=true the
+    engagement distribution is estimated from a TABLESAMPLE of user_stats.
+    """
     try:
         with get_db_connection() as conn:
+            percent = approximate.table_sample_percent(conn, "user_stats", approximate.SAMPLE_SIZE) if approx else 100.0
+            sample = f" TABLESAMPLE SYSTEM ({percent:.6f})" if percent < 100 else ""
+
             # -------------------------
             # Top contributors
             # -------------------------
@@ -947,28 +1111,26 @@ async def get_user_analysis():
                 (
                     SELECT 
                         username,
-                        COUNT(*) AS post_count,
-                        SUM(engagement::INTEGER) AS total_engagement,
-                        AVG(engagement::INTEGER) AS avg_engagement,
-                        'reddit' AS platform
-                    FROM reddit_posts 
-                    WHERE username IS NOT NULL AND engagement IS NOT NULL
-                    GROUP BY username
-                    ORDER BY SUM(engagement::INTEGER) DESC
+                        post_count,
+                        engagement_sum AS total_engagement,
+                        engagement_sum::FLOAT / post_count AS avg_engagement,
+                        platform
+                    FROM user_stats 
+                    WHERE platform = 'reddit' AND post_count > 0
+                    ORDER BY engagement_sum DESC
                     LIMIT 10
                 )
                 UNION ALL
                 (
                     SELECT 
                         username,
-                        COUNT(*) AS post_count,
-                        SUM(engagement::INTEGER) AS total_engagement,
-                        AVG(engagement::INTEGER) AS avg_engagement,
-                        'youtube' AS platform
-                    FROM youtube_posts 
-                    WHERE username IS NOT NULL AND engagement IS NOT NULL
-                    GROUP BY username
-                    ORDER BY SUM(engagement::INTEGER) DESC
+                        post_count,
+                        engagement_sum AS total_engagement,
+                        engagement_sum::FLOAT / post_count AS avg_engagement,
+                        platform
+                    FROM user_stats 
+                    WHERE platform = 'youtube' AND post_count > 0
+                    ORDER BY engagement_sum DESC
                     LIMIT 10
                 )
             """)).fetchall()
@@ -976,39 +1138,21 @@ async def get_user_analysis():
             # -------------------------
             # User engagement distribution
             # -------------------------
-            engagement_distribution = conn.execute(text("""
+            engagement_distribution = conn.execute(text(f"""
                 SELECT *
                 FROM (
                     SELECT 
                         CASE 
-                            WHEN engagement < 100 THEN '0-100'
-                            WHEN engagement < 500 THEN '100-500'
-                            WHEN engagement < 1000 THEN '500-1K'
-                            WHEN engagement < 5000 THEN '1K-5K'
+                            WHEN engagement_sum < 100 THEN '0-100'
+                            WHEN engagement_sum < 500 THEN '100-500'
+                            WHEN engagement_sum < 1000 THEN '500-1K'
+                            WHEN engagement_sum < 5000 THEN '1K-5K'
                             ELSE '5K+'
                         END AS engagement_range,
                         COUNT(*) AS user_count
-                    FROM (
-                        SELECT username, SUM(engagement::INTEGER) AS engagement
-                        FROM reddit_posts 
-                        WHERE engagement IS NOT NULL
-                        GROUP BY username
-
-                        UNION ALL
-
-                        SELECT username, SUM(engagement::INTEGER) AS engagement
-                        FROM youtube_posts 
-                        WHERE engagement IS NOT NULL
-                        GROUP BY username
-                    ) AS combined
-                    GROUP BY 
-                        CASE 
-                            WHEN engagement < 100 THEN '0-100'
-                            WHEN engagement < 500 THEN '100-500'
-                            WHEN engagement < 1000 THEN '500-1K'
-                            WHEN engagement < 5000 THEN '1K-5K'
-                            ELSE '5K+'
-                        END
+                    FROM user_stats{sample}
+                    WHERE post_count > 0
+                    GROUP BY 1
                 ) AS engagement_buckets
                 ORDER BY 
                     CASE engagement_range
@@ -1023,7 +1167,7 @@ async def get_user_analysis():
             # -------------------------
             # Build response
             # -------------------------
-            return {
+            response = {
                 "top_contributors": [
                     {
                         "username": row[0],
@@ -1042,7 +1186,73 @@ async def get_user_analysis():
                     for row in engagement_distribution
                 ]
             }
+            if approx:
+                # Each sampled count scales up by the sampled fraction. SYSTEM samples whole
+                # pages, so the binomial interval is a lower bound when pages cluster.
+                fraction = percent / 100
+                for entry in response["engagement_distribution"]:
+                    count = approximate.Estimate(entry["user_count"] / fraction, math.sqrt(entry["user_count"] * (1 - fraction)) / fraction)
+                    entry["user_count"] = round(count.value)
+                    entry["user_count_ci"] = count.interval(digits=0)
+                response["approximate"] = {"confidence": approximate.CONFIDENCE, "sample_percent": round(percent, 3)}
+            return response
 
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"User analysis error: {str(e)}")
+
+
+def user_stats_row(row):
+    """Response shape of one user_stats row."""
+    return {
+        "platform": row["platform"],
+        "username": row["username"],
+        "post_count": row["post_count"],
+        "comment_count": row["comment_count"],
+        "total_engagement": row["engagement_sum"],
+        "avg_engagement": round(row["engagement_sum"] / row["post_count"], 2) if row["post_count"] else 0,
+        "total_likes": row["likes_sum"],
+        "avg_likes": round(row["likes_sum"] / row["comment_count"], 2) if row["comment_count"] else 0,
+        "first_seen": row["first_seen"],
+        "last_seen": row["last_seen"]
+    }
+
+@app.get("/api/users")
+async def get_top_users(
+    platform: Optional[str] = Query(None, pattern="^(reddit|youtube)$"),
+    sort: str = Query("engagement", pattern="^(engagement|posts|comments|likes)$"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """Get the most active users by total engagement, posts, comments or likes"""
+    sort_column = {
+        "engagement": "engagement_sum",
+        "posts": "post_count",
+        "comments": "comment_count",
+        "likes": "likes_sum",
+    }[sort]
+    try:
+        with get_db_connection() as conn:
+            platform_filter = "WHERE platform = :platform" if platform else ""
+            rows = conn.execute(text(f"""
+                SELECT * FROM user_stats
+                {platform_filter}
+                ORDER BY {sort_column} DESC, username
+                LIMIT :limit
+            """), {"platform": platform, "limit": limit}).mappings().all()
+            return [user_stats_row(row) for row in rows]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Top users error: {str(e)}")
+
+@app.get("/api/users/{platform}/{username}")
+async def get_user_profile(platform: str = Path(..., pattern="^(reddit|youtube)$"), username: str = Path(...)):
+    """Get one user's activity totals"""
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute(text("""
+                SELECT * FROM user_stats WHERE platform = :platform AND username = :username
+            """), {"platform": platform, "username": username}).mappings().first()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"User profile error: {str(e)}")
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"No activity for {platform} user '{username}'")
+    return user_stats_row(row)
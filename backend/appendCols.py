@@ -1,58 +1,31 @@
-import pandas as pd
-from sqlalchemy import create_engine, text, inspect
+import argparse
 import os
-import json
+from functools import partial
+from sqlalchemy import create_engine
+
+from backfill import backfill_columns, raw_text_values
 
 # --- SQL DB Config ---
 SQL_DB_NAME = 'insights.db'
-SQL_ENGINE = create_engine(f'sqlite:///{SQL_DB_NAME}')
+SQL_ENGINE = create_engine(os.getenv('INGEST_DATABASE_URL', f'sqlite:///{SQL_DB_NAME}'))
+
+# Columns derived from raw_text for each platform. A new field only needs an entry here:
+# column name -> function(raw_text Series) -> values.
+PLATFORM_FIELDS = {
+    'reddit': {'body': partial(raw_text_values, key='body')},
+    'youtube': {'tags': partial(raw_text_values, key='tags')},
+}
 
-def add_column_if_not_exists(conn, table_name, column_name):
-    """Add column if not present."""
-    inspector = inspect(conn)
-    if column_name not in [col['name'] for col in inspector.get_columns(table_name)]:
-        print(f"Adding column '{column_name}' to '{table_name}'")
-        conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} TEXT'))
 
-def extract_nested_columns(csv_path, table_name, platform):
+def extract_nested_columns(csv_path, table_name, platform, only_empty=True):
     """
-    Correctly extracts 'body' for Reddit or 'tags' for YouTube from raw_text JSON
-    and updates SQL table.
+    Extracts 'body' for Reddit or 'tags' for YouTube from the raw_text JSON
+    and updates the SQL table in one set-based pass.
     """
     print(f"\nProcessing '{csv_path}' for '{table_name}' ({platform})...")
+    backfill_columns(SQL_ENGINE, csv_path, table_name, PLATFORM_FIELDS[platform], only_empty=only_empty)
+    print(f"Finished updating '{table_name}' with {', '.join(PLATFORM_FIELDS[platform])}.")
 
-    # Read only id and raw_text
-    df = pd.read_csv(csv_path, usecols=['id', 'raw_text'], low_memory=False)
-
-    # Extract the correct column based on platform
-    if platform == 'reddit':
-        df['body'] = df['raw_text'].apply(lambda x: json.loads(x)['body'] if isinstance(x, str) and 'body' in json.loads(x) else None)
-        column_to_add = 'body'
-    elif platform == 'youtube':
-        df['tags'] = df['raw_text'].apply(lambda x: json.dumps(json.loads(x)['tags']) if isinstance(x, str) and 'tags' in json.loads(x) else None)
-        column_to_add = 'tags'
-
-    df.rename(columns={'id': 'source_id'}, inplace=True)
-
-    with SQL_ENGINE.connect() as conn:
-        add_column_if_not_exists(conn, table_name, column_to_add)
-
-        # Update only rows where value is currently NULL or empty
-        batch_size = 500
-        for start in range(0, len(df), batch_size):
-            batch = df.iloc[start:start+batch_size]
-            for _, row in batch.iterrows():
-                value = row[column_to_add]
-                if value is not None:
-                    stmt = text(f"""
-                        UPDATE {table_name}
-                        SET {column_to_add} = :value
-                        WHERE source_id = :source_id
-                          AND ({column_to_add} IS NULL OR {column_to_add} = '')
-                    """)
-                    conn.execute(stmt, {'value': value, 'source_id': row['source_id']})
-
-    print(f"Finished updating '{table_name}' with '{column_to_add}'.")
 
 # --- Apply to CSV files ---
 files_to_patch = [
@@ -60,8 +33,13 @@ files_to_patch = [
     {"csv_path": "data/posts Data Dump - Youtube.csv", "table_name": "youtube_posts", "platform": "youtube"}
 ]
 
-for f in files_to_patch:
-    if os.path.exists(f["csv_path"]):
-        extract_nested_columns(f["csv_path"], f["table_name"], f["platform"])
-    else:
-        print(f"CSV not found: {f['csv_path']}")
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill columns derived from raw_text into the posts tables.")
+    parser.add_argument('--overwrite', action='store_true', help="Also replace values that are already set.")
+    args = parser.parse_args()
+
+    for f in files_to_patch:
+        if os.path.exists(f["csv_path"]):
+            extract_nested_columns(f["csv_path"], f["table_name"], f["platform"], only_empty=not args.overwrite)
+        else:
+            print(f"CSV not found: {f['csv_path']}")
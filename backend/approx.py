@@ -0,0 +1,145 @@
+import math
+from sqlalchemy import text
+
+from bulk_load import quote_ident
+from rollups import CONTENT_SAMPLE, SAMPLE_SIZE
+
+# --- Approximate answers from the content sample ---
+# Aggregates run over content_sample (at most SAMPLE_SIZE rows per platform and kind),
+# so their cost does not grow with the tables. Each platform/kind is a stratum:
+# within it the sample is uniform, the row count comes from the KMV estimate and
+# means carry the usual standard error (with the finite population correction).
+# Strata are combined weighted by their estimated sizes. Intervals are 95%.
+
+Z = 1.96
+CONFIDENCE = 0.95
+
+
+class Estimate:
+    """A point estimate and its standard error."""
+
+    def __init__(self, value, stderr=0.0):
+        self.value = value
+        self.stderr = stderr
+
+    def interval(self, scale=1.0, digits=2):
+        return [round((self.value - Z * self.stderr) * scale, digits), round((self.value + Z * self.stderr) * scale, digits)]
+
+    def rounded(self, scale=1.0, digits=2):
+        return round(self.value * scale, digits)
+
+    def __add__(self, other):
+        return Estimate(self.value + other.value, math.hypot(self.stderr, other.stderr))
+
+
+def populations(conn):
+    """{(platform, kind): (sample rows, Estimate of the table's row count)}."""
+    rows = conn.execute(text(f"""
+        SELECT platform, kind, COUNT(*), MAX(priority)
+        FROM {quote_ident(CONTENT_SAMPLE.table)}
+        GROUP BY platform, kind
+    """)).fetchall()
+    strata = {}
+    for platform, kind, sampled, largest in rows:
+        if sampled < SAMPLE_SIZE:
+            # The sample still holds the whole table
+            strata[(platform, kind)] = (sampled, Estimate(float(sampled)))
+        else:
+            size = (sampled - 1) / largest
+            strata[(platform, kind)] = (sampled, Estimate(size, size / math.sqrt(sampled - 2)))
+    return strata
+
+
+def sample_moments(conn, columns, filters=(), params=None, period=None):
+    """
+    Per stratum (and `period` expression, if given): the number of sampled rows
+    matching `filters`, and count / mean / variance of each column expression.
+    """
+    group = ['platform', 'kind']
+    selects = ['platform', 'kind']
+    if period is not None:
+        selects.append(f"{period} AS period")
+        group.append('period')
+    selects.append('COUNT(*) AS matched')
+    for name, expression in columns.items():
+        selects.append(f"COUNT({expression}) AS {name}_n")
+        selects.append(f"AVG(({expression})::DOUBLE PRECISION) AS {name}_mean")
+        selects.append(f"COALESCE(VAR_SAMP(({expression})::DOUBLE PRECISION), 0) AS {name}_var")
+    where = f"WHERE {' AND '.join(filters)}" if filters else ''
+    return conn.execute(text(f"""
+        SELECT {', '.join(selects)}
+        FROM {quote_ident(CONTENT_SAMPLE.table)}
+        {where}
+        GROUP BY {', '.join(group)}
+    """), params or {}).mappings().all()
+
+
+def subpopulation(strata, row, count=None):
+    """Estimated number of table rows like the `count` (default: matched) sampled rows of `row`'s stratum."""
+    sampled, size = strata[(row['platform'], row['kind'])]
+    share = (row['matched'] if count is None else count) / sampled
+    correction = max(0.0, 1 - sampled / size.value)  # 0 while the sample is the whole table
+    stderr = math.hypot(size.value * math.sqrt(share * (1 - share) / sampled * correction), share * size.stderr)
+    return Estimate(size.value * share, stderr)
+
+
+def stratum_mean(strata, row, name):
+    """Estimate of a column's mean over the stratum's rows that `row` describes."""
+    observed = row[f'{name}_n']
+    if not observed:
+        return None
+    population = subpopulation(strata, row, observed).value
+    correction = max(0.0, 1 - observed / population) if population else 0.0
+    return Estimate(row[f'{name}_mean'], math.sqrt(row[f'{name}_var'] / observed * correction))
+
+
+def combined_mean(strata, rows, name):
+    """Stratified estimate of a column's mean over the union of `rows`' strata."""
+    parts = []
+    for row in rows:
+        mean = stratum_mean(strata, row, name)
+        if mean is not None:
+            parts.append((subpopulation(strata, row, row[f'{name}_n']).value, mean))
+    weight = sum(size for size, _ in parts)
+    if not weight:
+        return Estimate(0.0)
+    return Estimate(
+        sum(size * mean.value for size, mean in parts) / weight,
+        math.sqrt(sum((size / weight * mean.stderr) ** 2 for size, mean in parts))
+    )
+
+
+def combined_total(strata, rows, name):
+    """Estimate of a column's sum over the union of `rows`' strata."""
+    total = Estimate(0.0)
+    for row in rows:
+        mean = stratum_mean(strata, row, name)
+        if mean is not None:
+            size = subpopulation(strata, row, row[f'{name}_n'])
+            total = total + Estimate(
+                size.value * mean.value,
+                math.hypot(size.value * mean.stderr, mean.value * size.stderr)
+            )
+    return total
+
+
+def combined_count(strata, rows):
+    """Estimate of how many table rows match, over the union of `rows`' strata."""
+    total = Estimate(0.0)
+    for row in rows:
+        total = total + subpopulation(strata, row)
+    return total
+
+
+def table_sample_percent(conn, table_name, target_rows):
+    """TABLESAMPLE SYSTEM percentage that reads about `target_rows` rows of `table_name`."""
+    estimated = conn.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table)"), {'table': table_name}
+    ).scalar()
+    if not estimated or estimated <= target_rows:
+        return 100.0
+    return 100.0 * target_rows / estimated
+
+
+def metadata(strata, **extra):
+    return {"confidence": CONFIDENCE, "sample_rows": sum(sampled for sampled, _ in strata.values()), **extra}
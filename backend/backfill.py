@@ -0,0 +1,113 @@
+import json
+import time
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from bulk_load import copy_dataframe, is_postgres, quote_ident
+from csv_chunks import iter_csv_chunks
+from parsing import extract_json_fields
+from search_index import ensure_search_index
+
+# --- Set-based column backfill ---
+# New columns derived from a dump's `raw_text` JSON are filled in three steps: every
+# row is decoded once, the (source_id, value) pairs are bulk-loaded into a temporary
+# table, and a single UPDATE ... FROM join copies them into the target table.
+# Works on Postgres and on SQLite 3.33+ (the first version with UPDATE ... FROM).
+
+
+def raw_text_values(series, key):
+    """
+    Pulls `key` out of each raw_text JSON string. Lists and objects are stored as
+    JSON text; rows without the key come back as None.
+    """
+    values = extract_json_fields(series, {key: None})[key]
+    return values.map(lambda v: json.dumps(v) if isinstance(v, (list, dict)) else v)
+
+
+def add_column_if_not_exists(conn, table_name, column_name, column_type='TEXT'):
+    """Add column if not present."""
+    if column_name not in [col['name'] for col in inspect(conn).get_columns(table_name)]:
+        print(f"  - Adding column '{column_name}' to '{table_name}'")
+        conn.execute(text(
+            f"ALTER TABLE {quote_ident(table_name)} ADD COLUMN {quote_ident(column_name)} {column_type}"
+        ))
+
+
+def _stage_values(conn, staging, pairs):
+    if is_postgres(conn.engine):
+        copy_dataframe(conn, staging, pairs)
+    else:
+        conn.execute(
+            text(f"INSERT INTO {quote_ident(staging)} (source_id, value, seq) VALUES (:source_id, :value, :seq)"),
+            pairs.to_dict('records'),
+        )
+
+
+def backfill_columns(engine, csv_path, table_name, fields, only_empty=True, chunk_size=50000):
+    """
+    Fills columns of `table_name` from the `raw_text` of the CSV it was loaded from.
+
+    `fields` maps each target column to a function that takes the raw_text Series
+    and returns the values for it (see raw_text_values). With `only_empty=True`
+    rows that already have a non-empty value are left alone.
+    Returns {column: rows updated}.
+    """
+    start = time.perf_counter()
+    table = quote_ident(table_name)
+    stagings = {column: f'backfill_{table_name}_{column}' for column in fields}
+    staged = dict.fromkeys(fields, 0)
+    rows_read = 0
+    updated = {}
+
+    with engine.begin() as conn:
+        for column, staging in stagings.items():
+            add_column_if_not_exists(conn, table_name, column)
+            # Copies the source_id type of the target table, so the join needs no casts
+            conn.execute(text(f"DROP TABLE IF EXISTS {quote_ident(staging)}"))
+            conn.execute(text(
+                f"CREATE TEMP TABLE {quote_ident(staging)} AS "
+                f"SELECT source_id, CAST(NULL AS TEXT) AS value, CAST(NULL AS BIGINT) AS seq FROM {table} LIMIT 0"
+            ))
+
+        # 1. Decode each chunk once and stage the non-null values for every column
+        for chunk, _ in iter_csv_chunks(csv_path, chunk_size, usecols=['id', 'raw_text']):
+            chunk = chunk.dropna(subset=['id'])
+            # Ids stay float64 when the chunk held a NaN, and COPY would send '123.0' to a BIGINT column
+            chunk['id'] = chunk['id'].astype('Int64')
+            # File position of each row, so a source_id repeated in the dump keeps its last value
+            seq = range(rows_read, rows_read + len(chunk))
+            rows_read += len(chunk)
+            for column, extract in fields.items():
+                pairs = pd.DataFrame({'source_id': chunk['id'], 'value': extract(chunk['raw_text']), 'seq': seq})
+                pairs = pairs.dropna(subset=['value'])
+                if pairs.empty:
+                    continue
+                _stage_values(conn, stagings[column], pairs)
+                staged[column] += len(pairs)
+
+        # 2. One joined UPDATE per column
+        for column, staging in stagings.items():
+            index_name = quote_ident(f'ix_{staging}')
+            staging, target = quote_ident(staging), quote_ident(column)
+            conn.execute(text(f"CREATE INDEX {index_name} ON {staging} (source_id, seq)"))
+            if is_postgres(engine):
+                conn.execute(text(f"ANALYZE {staging}"))
+            condition = f" AND ({table}.{target} IS NULL OR {table}.{target} = '')" if only_empty else ""
+            latest = (
+                f"SELECT source_id, value FROM {staging} a WHERE NOT EXISTS "
+                f"(SELECT 1 FROM {staging} b WHERE b.source_id = a.source_id AND b.seq > a.seq)"
+            )
+            result = conn.execute(text(
+                f"UPDATE {table} SET {target} = s.value FROM ({latest}) s "
+                f"WHERE {table}.source_id = s.source_id{condition}"
+            ))
+            updated[column] = result.rowcount
+            conn.execute(text(f"DROP TABLE {staging}"))
+
+    elapsed = time.perf_counter() - start
+    for column in fields:
+        print(f"  - {table_name}.{column}: {staged[column]:,} values staged, {updated[column]:,} rows updated")
+    print(f"  - Backfill finished in {elapsed:.1f}s")
+    # A backfilled column may be one the search vector should cover (e.g. reddit_posts.body)
+    ensure_search_index(engine, table_name)
+    return updated
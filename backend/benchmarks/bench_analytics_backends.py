@@ -0,0 +1,98 @@
+"""
+Runs the dashboard's aggregate queries against Postgres (DATABASE_URL) and against
+the DuckDB view of the Parquet snapshot, and prints the median latency of each.
+
+Usage (from the backend folder, after `python snapshot.py`):
+    python -m benchmarks.bench_analytics_backends [--snapshot snapshot] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from snapshot import create_snapshot_engine
+
+# The same SQL the analytics endpoints in app.py send
+QUERIES = {
+    'overview counts': """
+        SELECT (SELECT COUNT(*) FROM reddit_posts), (SELECT COUNT(*) FROM youtube_posts),
+               (SELECT COUNT(*) FROM reddit_comments), (SELECT COUNT(*) FROM youtube_comments)
+    """,
+    'overview sentiment': """
+        SELECT AVG(sentiment_positive), AVG(sentiment_negative), AVG(sentiment_neutral)
+        FROM (
+            SELECT sentiment_positive, sentiment_negative, sentiment_neutral FROM reddit_posts
+            UNION ALL
+            SELECT sentiment_positive, sentiment_negative, sentiment_neutral FROM youtube_posts
+            UNION ALL
+            SELECT sentiment_positive, sentiment_negative, sentiment_neutral FROM reddit_comments
+            UNION ALL
+            SELECT sentiment_positive, sentiment_negative, sentiment_neutral FROM youtube_comments
+        ) AS combined
+    """,
+    'activity trends': """
+        SELECT DATE(date_of_comment::timestamp) AS date, COUNT(*), SUM(likes::integer)
+        FROM (
+            SELECT date_of_comment, likes FROM reddit_comments
+            UNION ALL
+            SELECT date_of_comment, likes FROM youtube_comments
+        ) AS comments
+        WHERE date_of_comment::timestamp >= CURRENT_DATE - INTERVAL '30 days'
+        GROUP BY DATE(date_of_comment::timestamp)
+        ORDER BY date
+    """,
+    'toxicity distribution': """
+        SELECT toxicity, COUNT(*)
+        FROM (
+            SELECT toxicity FROM reddit_comments WHERE toxicity IS NOT NULL
+            UNION ALL
+            SELECT toxicity FROM youtube_comments WHERE toxicity IS NOT NULL
+        ) AS comments
+        GROUP BY toxicity
+    """,
+    'top contributors': """
+        SELECT username, COUNT(*), SUM(engagement::INTEGER)
+        FROM reddit_posts
+        WHERE username IS NOT NULL AND engagement IS NOT NULL
+        GROUP BY username
+        ORDER BY SUM(engagement::INTEGER) DESC
+        LIMIT 10
+    """,
+    'top comments': """
+        SELECT text, username, likes::integer FROM reddit_comments
+        WHERE likes IS NOT NULL AND text IS NOT NULL
+        ORDER BY likes::integer DESC
+        LIMIT 5
+    """,
+}
+
+
+def time_query(engine, sql, repeat):
+    timings = []
+    with engine.connect() as conn:
+        conn.execute(text(sql)).fetchall()  # warm-up
+        for _ in range(repeat):
+            start = time.perf_counter()
+            conn.execute(text(sql)).fetchall()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--postgres', default=os.getenv('DATABASE_URL'))
+    parser.add_argument('--snapshot', default='snapshot')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    postgres = create_engine(args.postgres)
+    duckdb = create_snapshot_engine(args.snapshot)
+    print(f"{'query':<22} {'postgres':>12} {'duckdb':>12} {'speedup':>9}")
+    for name, sql in QUERIES.items():
+        pg_ms = time_query(postgres, sql, args.repeat)
+        duck_ms = time_query(duckdb, sql, args.repeat)
+        print(f"{name:<22} {pg_ms:>10.1f}ms {duck_ms:>10.1f}ms {pg_ms / duck_ms:>8.1f}x")
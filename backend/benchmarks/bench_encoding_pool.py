@@ -0,0 +1,69 @@
+"""
+Measures how embedding throughput scales with the number of EncodingPool workers,
+against one in-process model using torch's default threading:
+
+  in-process - embeddings.encode_length_bucketed on a single model
+  N workers  - encoding_pool.EncodingPool(workers=N), cores split evenly between them
+
+Every pool's output is compared with the in-process vectors, so a speedup that
+comes from encoding something different shows up as a large max difference.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_encoding_pool "data/comments Data Dump - Reddit.csv" --rows 20000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from embeddings import encode_length_bucketed
+from encoding_pool import EncodingPool
+
+
+def timed(encode, chunks):
+    """Returns (seconds, stacked vectors) for encoding every chunk in turn."""
+    start = time.perf_counter()
+    vectors = [encode(chunk) for chunk in chunks]
+    return time.perf_counter() - start, np.vstack(vectors)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv_path')
+    parser.add_argument('--text-col', default='text')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--chunk-size', type=int, default=2000, help="Rows per encode call, as in the loader.")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--workers', type=int, nargs='+', help="Pool sizes to try (default: 1, 2, 4, ... up to the core count).")
+    args = parser.parse_args()
+
+    # Imported here: spawned pool workers re-import this file and load torch themselves
+    from sentence_transformers import SentenceTransformer
+
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    sizes = args.workers or [2 ** i for i in range(cores.bit_length()) if 2 ** i <= cores]
+
+    texts = pd.read_csv(args.csv_path, usecols=[args.text_col], nrows=args.rows)[args.text_col]
+    texts = texts.dropna().astype(str)
+    texts = texts[texts.str.strip() != ''].tolist()
+    chunks = [texts[i:i + args.chunk_size] for i in range(0, len(texts), args.chunk_size)]
+
+    model = SentenceTransformer(args.model, device='cpu')
+    dim = model.get_sentence_embedding_dimension()
+    baseline, reference = timed(lambda chunk: encode_length_bucketed(model, chunk, batch_size=args.batch_size), chunks)
+    del model
+
+    print(f"{len(texts):,} texts in chunks of {args.chunk_size:,}, batch size {args.batch_size}, {cores} cores")
+    print(f"  {'in-process':<11} {baseline:7.1f}s {len(texts) / baseline:>9,.0f} texts/s   1.00x")
+    for workers in sizes:
+        with EncodingPool(args.model, dim, workers=workers, batch_size=args.batch_size) as pool:
+            pool.encode(chunks[0][:workers])  # first call pays for tokenizer and allocator warm-up
+            seconds, vectors = timed(pool.encode, chunks)
+        difference = float(np.abs(vectors - reference).max()) if len(vectors) else 0.0
+        print(
+            f"  {f'{workers} workers':<11} {seconds:7.1f}s {len(texts) / seconds:>9,.0f} texts/s "
+            f"{baseline / seconds:6.2f}x  (max difference {difference:.1e})"
+        )
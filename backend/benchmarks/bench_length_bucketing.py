@@ -0,0 +1,88 @@
+"""
+Measures transformer padding waste on a real comments dump for three batching
+strategies, and optionally times the actual encoding:
+
+  csv order     - batches taken in file order (what a naive loop sends)
+  char sorted   - SentenceTransformer.encode's own sort by character length
+  token buckets - embeddings.encode_length_bucketed (token-length sort, explicit splitting)
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_length_bucketing "data/comments Data Dump - Reddit.csv" --rows 20000 [--encode]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sentence_transformers import SentenceTransformer
+
+from embeddings import encode_length_bucketed, split_long_texts
+
+
+def padding_stats(lengths, batch_size):
+    """Returns (real tokens, padded tokens) when `lengths` are batched in the given order."""
+    real = padded = 0
+    for start in range(0, len(lengths), batch_size):
+        batch = lengths[start:start + batch_size]
+        real += int(batch.sum())
+        padded += int(batch.max()) * len(batch)
+    return real, padded
+
+
+def report(name, real, padded):
+    waste = (padded - real) / padded * 100 if padded else 0
+    print(f"  {name:<14} {padded:>12,} padded tokens  ({waste:5.1f}% padding)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv_path')
+    parser.add_argument('--text-col', default='text')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--chunk-size', type=int, default=2000, help="Rows per encode call, as in the loader.")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--encode', action='store_true', help="Also time the encoding itself.")
+    args = parser.parse_args()
+
+    model = SentenceTransformer(args.model, device='cpu')
+    texts = pd.read_csv(args.csv_path, usecols=[args.text_col], nrows=args.rows)[args.text_col]
+    texts = texts.dropna().astype(str)
+    texts = texts[texts.str.strip() != ''].tolist()
+    max_tokens = model.max_seq_length - 2
+
+    totals = {'csv order': [0, 0], 'char sorted': [0, 0], 'token buckets': [0, 0]}
+    split_count = 0
+    for start in range(0, len(texts), args.chunk_size):
+        chunk = texts[start:start + args.chunk_size]
+        # Both baselines let the model truncate silently at max_seq_length
+        tokens = np.minimum(split_long_texts(model.tokenizer, chunk, 10**9)[2], max_tokens) + 2
+        char_order = np.argsort([-len(text) for text in chunk], kind='stable')
+        segments, owners, lengths = split_long_texts(model.tokenizer, chunk, max_tokens)
+        split_count += len(segments) - len(chunk)
+
+        for name, lens in [
+            ('csv order', tokens),
+            ('char sorted', tokens[char_order]),
+            ('token buckets', np.sort(lengths) + 2),
+        ]:
+            real, padded = padding_stats(lens, args.batch_size)
+            totals[name][0] += real
+            totals[name][1] += padded
+
+    print(f"{len(texts):,} comments, batch size {args.batch_size}, {split_count:,} extra windows for long texts")
+    for name, (real, padded) in totals.items():
+        report(name, real, padded)
+
+    if args.encode:
+        chunks = [texts[i:i + args.chunk_size] for i in range(0, len(texts), args.chunk_size)]
+        start = time.perf_counter()
+        for chunk in chunks:
+            model.encode(chunk, batch_size=args.batch_size, convert_to_numpy=True)
+        baseline = time.perf_counter() - start
+        start = time.perf_counter()
+        for chunk in chunks:
+            encode_length_bucketed(model, chunk, batch_size=args.batch_size)
+        bucketed = time.perf_counter() - start
+        print(f"  model.encode:           {baseline:.1f}s ({len(texts) / baseline:,.0f} texts/s)")
+        print(f"  encode_length_bucketed: {bucketed:.1f}s ({len(texts) / bucketed:,.0f} texts/s)")
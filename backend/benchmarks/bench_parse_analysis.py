@@ -0,0 +1,99 @@
+"""
+Benchmarks parsing.parse_analysis_data against the original row-by-row parser
+on a synthetic 'text_analysis' dump.
+
+Usage (from the backend folder):
+    python -m benchmarks.bench_parse_analysis --rows 500000
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from parsing import parse_analysis_data
+
+
+def legacy_parse_analysis_data(series):
+    """The original per-row implementation, kept here as the baseline."""
+    data = {'sentiment_neutral': [], 'sentiment_negative': [], 'sentiment_positive': [], 'toxicity': []}
+
+    for item in series:
+        try:
+            analysis = json.loads(item)
+            sentiment = analysis.get('Sentiment', {})
+            data['sentiment_neutral'].append(sentiment.get('neutral'))
+            data['sentiment_negative'].append(sentiment.get('negative'))
+            data['sentiment_positive'].append(sentiment.get('positive'))
+            toxicity_dict = analysis.get('Toxicity', {})
+            toxic_key = next((k for k in toxicity_dict if k != 'non_toxic'), 'non_toxic')
+            data['toxicity'].append(toxic_key if toxicity_dict.get(toxic_key, 0) > 0.5 else 'non_toxic')
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            for key in data: data[key].append(None)
+
+    return pd.DataFrame(data, index=series.index)
+
+
+def make_synthetic_dump(rows, seed=0):
+    """Builds a text_analysis column shaped like the real dumps, with a few bad rows."""
+    rng = random.Random(seed)
+    items = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.01:
+            items.append(None)
+        elif roll < 0.0105:
+            items.append('{not json')
+        else:
+            pos, neg = rng.random() / 2, rng.random() / 2
+            toxic = rng.random() ** 4
+            items.append(json.dumps({
+                "Sentiment": {"neutral": 1 - pos - neg, "negative": neg, "positive": pos},
+                "Toxicity": {"toxic": toxic, "non_toxic": 1 - toxic},
+            }))
+    return pd.Series(items)
+
+
+def check_equivalent(expected, actual):
+    """Asserts the new parser returns the same values as the baseline."""
+    for col in ['sentiment_neutral', 'sentiment_negative', 'sentiment_positive']:
+        np.testing.assert_allclose(
+            expected[col].astype(float).to_numpy(), actual[col].astype(float).to_numpy(), rtol=1e-6
+        )
+    assert expected['toxicity'].fillna('<NA>').tolist() == actual['toxicity'].astype(object).fillna('<NA>').tolist()
+
+
+def time_it(func, series, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(series)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--chunk-size', type=int, default=2000, help="Rows per call, as in process_and_load_data.")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    dump = make_synthetic_dump(args.rows)
+    chunks = [dump.iloc[i:i + args.chunk_size] for i in range(0, len(dump), args.chunk_size)]
+
+    def run_chunked(func):
+        return lambda _: pd.concat([func(chunk) for chunk in chunks])
+
+    legacy_time, legacy_result = time_it(run_chunked(legacy_parse_analysis_data), dump, args.repeat)
+    new_time, new_result = time_it(run_chunked(parse_analysis_data), dump, args.repeat)
+    check_equivalent(legacy_result, new_result)
+
+    print(f"Rows: {args.rows:,} in chunks of {args.chunk_size:,}")
+    print(f"  legacy parser:   {legacy_time:.3f}s ({args.rows / legacy_time:,.0f} rows/s)")
+    print(f"  columnar parser: {new_time:.3f}s ({args.rows / new_time:,.0f} rows/s)")
+    print(f"  speedup:         {legacy_time / new_time:.2f}x")
+    print(f"  memory: {legacy_result.memory_usage(deep=True).sum() / 1e6:.1f} MB -> "
+          f"{new_result.memory_usage(deep=True).sum() / 1e6:.1f} MB")
@@ -0,0 +1,255 @@
+import io
+import time
+import pandas as pd
+from sqlalchemy import inspect, text
+
+# --- Bulk write layer shared by the loaders ---
+# On Postgres every chunk is streamed through COPY FROM STDIN from an in-memory CSV
+# buffer. Other databases (the local SQLite file) fall back to DataFrame.to_sql.
+
+NULL_MARKER = r'\N'
+INTEGER_TYPES = {'smallint', 'integer', 'bigint'}
+
+
+def is_postgres(engine):
+    return engine.dialect.name == 'postgresql'
+
+
+def quote_ident(name):
+    """Double-quotes a table or column name for use in raw SQL."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def copy_dataframe(conn, table_name, df):
+    """Streams a DataFrame into an existing Postgres table with COPY FROM STDIN."""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep=NULL_MARKER)
+    buffer.seek(0)
+
+    columns = ', '.join(quote_ident(col) for col in df.columns)
+    copy_sql = f"COPY {quote_ident(table_name)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')"
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(copy_sql, buffer)
+
+
+def column_type(dtype):
+    """SQL type DataFrame.to_sql gives a column of `dtype`, for adding it to an existing table."""
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'BOOLEAN'
+    if pd.api.types.is_integer_dtype(dtype):
+        return {1: 'SMALLINT', 2: 'SMALLINT', 4: 'INTEGER'}.get(dtype.itemsize, 'BIGINT')
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL' if dtype.itemsize == 4 else 'DOUBLE PRECISION'
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return 'TIMESTAMP WITH TIME ZONE'
+    if pd.api.types.is_datetime64_dtype(dtype):
+        return 'TIMESTAMP'
+    return 'TEXT'
+
+
+def table_persistence(conn, table_name):
+    """pg_class.relpersistence of a Postgres table: 'p' (logged), 'u' (unlogged) or 't' (temporary)."""
+    return conn.execute(
+        text("SELECT relpersistence FROM pg_class WHERE oid = to_regclass(:table)"), {'table': quote_ident(table_name)}
+    ).scalar()
+
+
+def count_rows(engine, table_name):
+    """Number of rows in `table_name`, 0 if it does not exist."""
+    with engine.connect() as conn:
+        if not inspect(conn).has_table(table_name):
+            return 0
+        return conn.execute(text(f"SELECT COUNT(*) FROM {quote_ident(table_name)}")).scalar()
+
+
+class BulkWriter:
+    """
+    Writes DataFrame chunks into a single table and reports rows/second.
+
+    With `upsert_key` set the writer merges instead of appending: rows are upserted
+    on that column (backed by a unique index), so re-loading overlapping dumps
+    updates existing rows rather than duplicating them.
+
+    The table is created from the first chunk's dtypes (`if_exists` works as in
+    DataFrame.to_sql). With `unlogged=True` a Postgres table skips the WAL while
+    loading; `finish()` switches any UNLOGGED table back to LOGGED (including one left
+    so by an interrupted earlier load) and builds the indexes, so they are not
+    maintained row by row during the load.
+
+    Each callable in `on_write` is called as hook(conn, table_name, rows, replaced)
+    inside the transaction that writes a chunk, so derived tables commit together
+    with it. `rows` is the chunk as written; in merge mode `replaced` holds the
+    versions of its rows that were already in the table (the chunk's columns only)
+    as they were before the write, otherwise it is None.
+    """
+
+    def __init__(self, engine, table_name, if_exists='replace', unlogged=False, upsert_key=None, on_write=()):
+        self.engine = engine
+        self.table_name = table_name
+        self.upsert_key = upsert_key
+        self.on_write = list(on_write)
+        # Merging into an existing table never replaces it or switches it to UNLOGGED
+        self.if_exists = 'append' if upsert_key else if_exists
+        self.unlogged = unlogged and is_postgres(engine) and not upsert_key
+        self.rows = 0
+        self.seconds = 0.0
+        self._created = False
+        self._integer_columns = set()
+
+    def write(self, df, on_write=()):
+        """Appends one processed chunk to the table; `on_write` adds hooks for this chunk only."""
+        start = time.perf_counter()
+        if not self._created:
+            self._create_table(df)
+
+        if self.upsert_key:
+            # Later rows win within a chunk, as they would across chunks
+            df = df.drop_duplicates(subset=[self.upsert_key], keep='last')
+
+        if is_postgres(self.engine):
+            df = self._match_integer_columns(df)
+        with self.engine.begin() as conn:
+            replaced = self._replaced_rows(conn, df) if self.upsert_key and self.on_write else None
+            if is_postgres(self.engine):
+                if self.upsert_key:
+                    self._copy_upsert(conn, df)
+                else:
+                    copy_dataframe(conn, self.table_name, df)
+            elif self.upsert_key:
+                df.to_sql(self.table_name, conn, if_exists='append', index=False, method=self._insert_upsert)
+            else:
+                df.to_sql(self.table_name, conn, if_exists='append', index=False)
+            for hook in [*self.on_write, *on_write]:
+                hook(conn, self.table_name, df, replaced)
+
+        self.rows += len(df)
+        self.seconds += time.perf_counter() - start
+
+    def finish(self, index_columns=()):
+        """Builds deferred indexes, restores logging and prints the load rate."""
+        start = time.perf_counter()
+        with self.engine.begin() as conn:
+            # Also runs when a resumed load wrote nothing: the run that was interrupted may
+            # have left the table without its indexes or UNLOGGED
+            if inspect(conn).has_table(self.table_name):
+                for col in index_columns:
+                    if col == self.upsert_key:
+                        continue  # already covered by the unique index
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS {quote_ident(f'ix_{self.table_name}_{col}')} "
+                        f"ON {quote_ident(self.table_name)} ({quote_ident(col)})"
+                    ))
+                if is_postgres(self.engine):
+                    # Postgres empties UNLOGGED tables after a crash, so no finished table may stay one
+                    if table_persistence(conn, self.table_name) == 'u':
+                        conn.execute(text(f"ALTER TABLE {quote_ident(self.table_name)} SET LOGGED"))
+                    conn.execute(text(f"ANALYZE {quote_ident(self.table_name)}"))
+        self.seconds += time.perf_counter() - start
+        print(f"  - {self.table_name}: {self.report()}")
+
+    def report(self):
+        rate = self.rows / self.seconds if self.seconds else 0
+        return f"{self.rows:,} rows in {self.seconds:.1f}s ({rate:,.0f} rows/s)"
+
+    def _create_table(self, df):
+        df.head(0).to_sql(self.table_name, self.engine, if_exists=self.if_exists, index=False)
+        if self.if_exists == 'append':
+            self._add_missing_columns(df)
+        if self.upsert_key:
+            self._ensure_unique_key()
+        if is_postgres(self.engine):
+            with self.engine.begin() as conn:
+                if self.unlogged:
+                    conn.execute(text(f"ALTER TABLE {quote_ident(self.table_name)} SET UNLOGGED"))
+                columns = inspect(conn).get_columns(self.table_name)
+            self._integer_columns = {
+                col['name'] for col in columns
+                if str(col['type']).lower() in INTEGER_TYPES
+            }
+        self._created = True
+
+    def _add_missing_columns(self, df):
+        """Appending keeps the existing table, which may predate columns the loader now writes."""
+        with self.engine.begin() as conn:
+            existing = {col['name'] for col in inspect(conn).get_columns(self.table_name)}
+            for col in df.columns:
+                if col not in existing:
+                    print(f"  - Adding column '{col}' to '{self.table_name}'")
+                    conn.execute(text(
+                        f"ALTER TABLE {quote_ident(self.table_name)} ADD COLUMN {quote_ident(col)} {column_type(df[col].dtype)}"
+                    ))
+
+    def _match_integer_columns(self, df):
+        """COPY rejects '3.0' for integer columns, so float chunks (ints with NaN) become Int64."""
+        float_cols = [
+            col for col in df.columns
+            if col in self._integer_columns and df[col].dtype.kind == 'f'
+        ]
+        if not float_cols:
+            return df
+        return df.astype({col: 'Int64' for col in float_cols})
+
+    # --- Merge (upsert) mode ---
+
+    def _ensure_unique_key(self):
+        """Creates the unique index ON CONFLICT needs, dropping older duplicate rows first."""
+        table, key = quote_ident(self.table_name), quote_ident(self.upsert_key)
+        index_name = f'ux_{self.table_name}_{self.upsert_key}'
+        with self.engine.begin() as conn:
+            indexes = inspect(conn).get_indexes(self.table_name)
+            if any(ix['name'] == index_name for ix in indexes):
+                return
+            print(f"  - Adding unique index on {self.table_name}.{self.upsert_key} for merge mode...")
+            if is_postgres(self.engine):
+                conn.execute(text(
+                    f"DELETE FROM {table} a USING {table} b WHERE a.{key} = b.{key} AND a.ctid < b.ctid"
+                ))
+            else:
+                conn.execute(text(
+                    f"DELETE FROM {table} WHERE rowid NOT IN (SELECT MAX(rowid) FROM {table} GROUP BY {key})"
+                ))
+            conn.execute(text(f"CREATE UNIQUE INDEX {quote_ident(index_name)} ON {table} ({key})"))
+
+    def _replaced_rows(self, conn, df, batch_size=500):
+        """The table's current version of the rows in `df` that the upsert will overwrite."""
+        existing = {col['name'] for col in inspect(conn).get_columns(self.table_name)}
+        columns = [col for col in df.columns if col in existing]
+        keys = df[self.upsert_key].dropna().unique().tolist()
+        found = []
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            params = {f'k{i}': key.item() if hasattr(key, 'item') else key for i, key in enumerate(batch)}
+            placeholders = ', '.join(f':{name}' for name in params)
+            found.extend(conn.execute(text(
+                f"SELECT {', '.join(map(quote_ident, columns))} FROM {quote_ident(self.table_name)} "
+                f"WHERE {quote_ident(self.upsert_key)} IN ({placeholders})"
+            ), params).fetchall())
+        return pd.DataFrame(found, columns=columns)
+
+    def _upsert_sql(self, columns):
+        cols = ', '.join(quote_ident(col) for col in columns)
+        updates = ', '.join(
+            f"{quote_ident(col)} = EXCLUDED.{quote_ident(col)}" for col in columns if col != self.upsert_key
+        )
+        action = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        return cols, f"ON CONFLICT ({quote_ident(self.upsert_key)}) {action}"
+
+    def _copy_upsert(self, conn, df):
+        """COPYs the chunk into a temporary staging table and merges it in one statement."""
+        staging = f'{self.table_name}_staging'
+        conn.execute(text(
+            f"CREATE TEMP TABLE {quote_ident(staging)} (LIKE {quote_ident(self.table_name)}) ON COMMIT DROP"
+        ))
+        copy_dataframe(conn, staging, df)
+        cols, conflict = self._upsert_sql(df.columns)
+        conn.execute(text(
+            f"INSERT INTO {quote_ident(self.table_name)} ({cols}) "
+            f"SELECT {cols} FROM {quote_ident(staging)} {conflict}"
+        ))
+
+    def _insert_upsert(self, table, conn, keys, data_iter):
+        """DataFrame.to_sql `method` that turns the inserts into INSERT ... ON CONFLICT."""
+        cols, conflict = self._upsert_sql(keys)
+        placeholders = ', '.join('?' for _ in keys)
+        sql = f"INSERT INTO {quote_ident(table.name)} ({cols}) VALUES ({placeholders}) {conflict}"
+        conn.exec_driver_sql(sql, [tuple(row) for row in data_iter])
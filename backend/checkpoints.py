@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import text
+
+# --- Ingestion checkpoints ---
+# Records, per input file and per sink ('sql', 'vector'), the byte offset and chunk
+# index of the last chunk that sink finished. Loaders resume from there, so a crash
+# only repeats the chunk in flight, and rows appended to a dump later are picked up
+# on the next run. SQL sinks keep their checkpoints in a table of the database they
+# write to (TableCheckpointStore), committed in the same transaction as the chunk,
+# so a crash can never leave a chunk written but not checkpointed.
+
+CHECKPOINT_FILE = 'ingest_checkpoints.json'
+CHECKPOINT_TABLE = 'ingest_checkpoints'
+HEAD_BYTES = 64 * 1024
+
+
+def file_head_hash(file_path, size):
+    """Fingerprints the first `size` bytes of a file, to tell an appended dump from a replaced one."""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read(size)).hexdigest()
+
+
+def still_valid(file_path, checkpoint):
+    """False if the dump was replaced since the checkpoint was taken, rather than appended to."""
+    # A dump that shrank or whose first block changed has been replaced
+    if os.path.getsize(file_path) < checkpoint['offset']:
+        return False
+    if 'head_hash' in checkpoint and checkpoint['head_hash'] != file_head_hash(file_path, checkpoint['head_size']):
+        return False
+    return True
+
+
+def new_checkpoint(file_path, previous, offset, chunk, rows, chunk_size):
+    """The checkpoint following `previous` (or None) once chunk `chunk` ends at byte `offset`."""
+    return {
+        'offset': offset,
+        'chunk': chunk,
+        'rows': ((previous or {}).get('rows', 0) if chunk > 1 else 0) + rows,
+        'chunk_size': chunk_size,
+        # Only bytes already consumed are hashed; appending never changes them
+        'head_size': min(offset, HEAD_BYTES),
+        'head_hash': file_head_hash(file_path, min(offset, HEAD_BYTES)),
+        'updated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def checkpoint_key(file_path):
+    return os.path.abspath(file_path)
+
+
+class CheckpointStore:
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self._data = {}
+        # The vector sink is checkpointed from upsert worker threads
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+
+    def get(self, file_path, sink):
+        """Returns the checkpoint for a sink, or None if it has to start from scratch."""
+        checkpoint = self._data.get(checkpoint_key(file_path), {}).get(sink)
+        if checkpoint is None or not still_valid(file_path, checkpoint):
+            return None
+        return checkpoint
+
+    def update(self, file_path, sink, offset, chunk, rows, chunk_size):
+        """Records that `sink` has finished everything up to byte `offset`."""
+        with self._lock:
+            entries = self._data.setdefault(checkpoint_key(file_path), {})
+            entries[sink] = new_checkpoint(file_path, entries.get(sink), offset, chunk, rows, chunk_size)
+            self._save()
+
+    def clear(self, file_path=None):
+        """Forgets one file's checkpoints, or all of them."""
+        with self._lock:
+            if file_path is None:
+                self._data = {}
+            else:
+                self._data.pop(checkpoint_key(file_path), None)
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class TableCheckpointStore:
+    """
+    Checkpoints stored in `table` of the database a SQL sink loads into. update() takes
+    the connection of the transaction writing the chunk, so the checkpoint commits or
+    rolls back together with the chunk's rows and rollups.
+    """
+
+    def __init__(self, engine, table=CHECKPOINT_TABLE):
+        self.engine = engine
+        self.table = table
+        # Created on first use: the loaders may delete the SQLite file before that
+        self._ready = False
+
+    def get(self, file_path, sink):
+        """Returns the checkpoint for a sink, or None if it has to start from scratch."""
+        with self.engine.begin() as conn:
+            checkpoint = self._read(conn, file_path, sink)
+        if checkpoint is None or not still_valid(file_path, checkpoint):
+            return None
+        return checkpoint
+
+    def update(self, conn, file_path, sink, offset, chunk, rows, chunk_size):
+        """Records, within `conn`'s transaction, that `sink` has finished everything up to byte `offset`."""
+        checkpoint = new_checkpoint(file_path, self._read(conn, file_path, sink), offset, chunk, rows, chunk_size)
+        conn.execute(text(f"""
+            INSERT INTO {self.table} (file_path, sink, checkpoint) VALUES (:file_path, :sink, :checkpoint)
+            ON CONFLICT (file_path, sink) DO UPDATE SET checkpoint = EXCLUDED.checkpoint
+        """), {'file_path': checkpoint_key(file_path), 'sink': sink, 'checkpoint': json.dumps(checkpoint)})
+
+    def clear(self, file_path=None):
+        """Forgets one file's checkpoints, or all of them."""
+        with self.engine.begin() as conn:
+            self._ensure_table(conn)
+            if file_path is None:
+                conn.execute(text(f"DELETE FROM {self.table}"))
+            else:
+                conn.execute(text(f"DELETE FROM {self.table} WHERE file_path = :file_path"),
+                             {'file_path': checkpoint_key(file_path)})
+
+    def _read(self, conn, file_path, sink):
+        self._ensure_table(conn)
+        stored = conn.execute(
+            text(f"SELECT checkpoint FROM {self.table} WHERE file_path = :file_path AND sink = :sink"),
+            {'file_path': checkpoint_key(file_path), 'sink': sink}
+        ).scalar()
+        return json.loads(stored) if stored is not None else None
+
+    def _ensure_table(self, conn):
+        if self._ready:
+            return
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                file_path TEXT NOT NULL,
+                sink TEXT NOT NULL,
+                checkpoint TEXT NOT NULL,
+                PRIMARY KEY (file_path, sink)
+            )
+        """))
+        self._ready = True
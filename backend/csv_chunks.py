@@ -0,0 +1,50 @@
+import io
+import pandas as pd
+
+# --- Byte-offset aware CSV chunking ---
+# pandas' chunked reader reads ahead, so it cannot tell us where a chunk ends in the
+# file. This reader splits the file into whole CSV records itself (a record only ends
+# at a newline outside quotes, so multi-line comment text stays intact) and hands
+# each block of records to pd.read_csv, yielding the byte offset after every chunk.
+
+
+def _read_record(f):
+    """Reads one CSV record, following quoted newlines. Returns b'' at end of file."""
+    record = f.readline()
+    if not record:
+        return b''
+    quotes = record.count(b'"')
+    while quotes % 2:
+        line = f.readline()
+        if not line:
+            break
+        record += line
+        quotes += line.count(b'"')
+    return record
+
+
+def iter_csv_chunks(file_path, chunk_size, start_offset=0, **read_csv_kwargs):
+    """
+    Yields (chunk, end_offset) for each block of `chunk_size` records, starting at
+    byte `start_offset` (0, or an offset previously yielded by this function).
+    """
+    read_csv_kwargs.setdefault('on_bad_lines', 'skip')
+    read_csv_kwargs.setdefault('low_memory', False)
+
+    with open(file_path, 'rb') as f:
+        header = _read_record(f)
+        if start_offset > f.tell():
+            f.seek(start_offset)
+
+        while True:
+            records = []
+            for _ in range(chunk_size):
+                record = _read_record(f)
+                if not record:
+                    break
+                records.append(record)
+            if not records:
+                return
+
+            chunk = pd.read_csv(io.BytesIO(header + b''.join(records)), **read_csv_kwargs)
+            yield chunk, f.tell()
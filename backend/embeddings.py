@@ -0,0 +1,165 @@
+import hashlib
+import sqlite3
+import unicodedata
+import numpy as np
+
+# --- Embedding cache ---
+# Vectors are stored in a local SQLite file keyed by a hash of the model id and the
+# normalized text, so text that was already embedded (an earlier run, a reposted
+# title, a copy-pasted comment) is looked up instead of being sent through the model.
+
+EMBEDDING_CACHE_DB = 'embedding_cache.db'
+LOOKUP_BATCH = 500  # stays under SQLite's bound-parameter limit
+
+
+def normalize_text(text):
+    """Canonical form used for hashing and encoding: NFC, whitespace collapsed."""
+    return ' '.join(unicodedata.normalize('NFC', str(text)).split())
+
+
+# --- Length-bucketed encoding ---
+# A transformer batch is padded to its longest member, so encoding comments in CSV
+# order wastes most of each batch on padding. Texts are measured in tokens, split
+# or truncated explicitly at the model's limit, sorted by length and encoded in
+# batches of similar length; the results are put back in the original order.
+
+
+def split_long_texts(tokenizer, texts, max_tokens, long_text='chunk'):
+    """
+    Returns (segments, owners, lengths): the text pieces to encode, the index of
+    the input text each piece belongs to, and each piece's token count.
+    Texts over `max_tokens` are cut into consecutive windows ('chunk') or cut
+    down to the first window ('truncate').
+    """
+    encoded = tokenizer(list(texts), add_special_tokens=False, return_offsets_mapping=True)
+    segments, owners, lengths = [], [], []
+    for i, (text, offsets) in enumerate(zip(texts, encoded['offset_mapping'])):
+        if len(offsets) <= max_tokens:
+            segments.append(text)
+            owners.append(i)
+            lengths.append(len(offsets))
+            continue
+        windows = range(0, len(offsets), max_tokens) if long_text == 'chunk' else [0]
+        for start in windows:
+            window = offsets[start:start + max_tokens]
+            segments.append(text[window[0][0]:window[-1][1]])
+            owners.append(i)
+            lengths.append(len(window))
+    return segments, np.array(owners, dtype=np.int64), np.array(lengths, dtype=np.int64)
+
+
+def encode_length_bucketed(model, texts, batch_size=64, long_text='chunk'):
+    """
+    Encodes `texts` with batches of similar token length. Texts split into several
+    windows get the mean of their window vectors (re-normalised if the model
+    normalises its output). Returns an (n, dim) float32 matrix in input order.
+    """
+    if not texts:
+        return np.empty((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    # Leave room for the [CLS]/[SEP] tokens the model adds
+    max_tokens = model.max_seq_length - 2
+    segments, owners, lengths = split_long_texts(model.tokenizer, texts, max_tokens, long_text)
+
+    order = np.argsort(lengths, kind='stable')
+    segment_vectors = np.empty((len(segments), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        segment_vectors[batch] = model.encode(
+            [segments[j] for j in batch], batch_size=len(batch), convert_to_numpy=True
+        )
+
+    if len(segments) == len(texts):
+        return segment_vectors  # no text was split, owners is 0..n-1
+
+    vectors = np.zeros((len(texts), segment_vectors.shape[1]), dtype=np.float32)
+    np.add.at(vectors, owners, segment_vectors)
+    vectors /= np.bincount(owners, minlength=len(texts))[:, None]
+    norms = np.linalg.norm(segment_vectors, axis=1)
+    if np.allclose(norms, 1.0, atol=1e-3):
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+class EmbeddingStore:
+    """Persistent map from (model id, normalized text) to a float32 vector."""
+
+    def __init__(self, model_id, dim, path=EMBEDDING_CACHE_DB):
+        self.model_id = model_id
+        self.dim = dim
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL) WITHOUT ROWID"
+        )
+
+    def key(self, normalized_text):
+        return hashlib.sha1(f"{self.model_id}\0{normalized_text}".encode('utf-8')).digest()
+
+    def get_many(self, keys):
+        """Returns {key: vector} for the keys that are cached."""
+        found = {}
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            placeholders = ','.join('?' for _ in batch)
+            rows = self.conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch)
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                ((key, vector.tobytes()) for key, vector in zip(keys, vectors)),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedEncoder:
+    """
+    Wraps a SentenceTransformer: each call deduplicates the texts, serves cached
+    vectors from the store and only encodes the misses. Misses go to `pool`
+    (an encoding_pool.EncodingPool) instead of `model` when one is given.
+    """
+
+    def __init__(self, model, store, batch_size=64, pool=None):
+        self.model = model
+        self.store = store
+        self.batch_size = batch_size
+        self.pool = pool
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, texts):
+        """Returns an (n, dim) float32 matrix in the order of `texts`."""
+        normalized = [normalize_text(text) for text in texts]
+        keys = [self.store.key(text) for text in normalized]
+        unique = dict(zip(keys, normalized))
+
+        vectors = self.store.get_many(list(unique))
+        missing = [key for key in unique if key not in vectors]
+        if missing:
+            encoded = self._encode_uncached([unique[key] for key in missing])
+            self.store.put_many(missing, encoded)
+            vectors.update(zip(missing, encoded))
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if not keys:
+            return np.empty((0, self.store.dim), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys])
+
+    def _encode_uncached(self, texts):
+        if self.pool is not None:
+            return self.pool.encode(texts)
+        return encode_length_bucketed(self.model, texts, batch_size=self.batch_size)
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0
+        return f"{total:,} texts, {self.misses:,} encoded, {rate:.1f}% served from the embedding cache"
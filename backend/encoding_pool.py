@@ -0,0 +1,135 @@
+import multiprocessing as mp
+import os
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+# --- Multi-process embedding pool ---
+# Torch's intra-op threading scales poorly on small MiniLM batches, so instead of one
+# model using every core, each worker process loads its own model with a small, fixed
+# number of threads (pinned to its own cores where the OS allows). Workers write their
+# vectors straight into a shared-memory output matrix, so only the texts are pickled.
+
+
+THREAD_VARIABLES = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+def _worker_main(worker_id, model_name, threads, batch_size, tasks, results):
+    # The thread counts reach torch through the environment the worker was spawned
+    # with (see EncodingPool.__init__); setting them here would be too late whenever
+    # re-importing the main script already loaded it
+    if hasattr(os, 'sched_setaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+        mine = cores[worker_id * threads:(worker_id + 1) * threads]
+        if len(mine) == threads:
+            os.sched_setaffinity(0, mine)
+
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from embeddings import encode_length_bucketed
+
+        torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device='cpu')
+        dim = model.get_sentence_embedding_dimension()
+    except Exception as e:
+        results.put(('error', f"worker {worker_id} could not load the model: {e}"))
+        return
+    results.put(('ready', worker_id))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        shm_name, total, start, texts = task
+        try:
+            # Spawned workers share the parent's resource tracker, which unlinks the segment
+            shm = SharedMemory(name=shm_name)
+            out = np.ndarray((total, dim), dtype=np.float32, buffer=shm.buf)
+            out[start:start + len(texts)] = encode_length_bucketed(model, texts, batch_size=batch_size)
+            del out
+            shm.close()
+            results.put(('done', start))
+        except Exception as e:
+            results.put(('error', f"worker {worker_id}: {e}"))
+
+
+class EncodingPool:
+    """
+    A pool of embedding worker processes with the same output as
+    embeddings.encode_length_bucketed: encode(texts) -> (n, dim) float32 matrix.
+    """
+
+    def __init__(self, model_name, dim, workers=None, threads_per_worker=None, batch_size=64, slices_per_worker=4):
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+        self.workers = workers or cores
+        self.threads = threads_per_worker or max(1, cores // self.workers)
+        self.dim = dim
+        self.slices = self.workers * slices_per_worker
+
+        # spawn, not fork: forking a process that already initialised torch can hang
+        ctx = mp.get_context('spawn')
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = [
+            ctx.Process(
+                target=_worker_main,
+                args=(i, model_name, self.threads, batch_size, self._tasks, self._results),
+                daemon=True,
+            )
+            for i in range(self.workers)
+        ]
+        print(f"Starting {self.workers} embedding workers ({self.threads} thread(s) each)...")
+        # Spawned children copy this environment before they import anything
+        saved = {name: os.environ.get(name) for name in THREAD_VARIABLES}
+        os.environ.update({name: str(self.threads) for name in THREAD_VARIABLES})
+        try:
+            for proc in self._procs:
+                proc.start()
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        for _ in self._procs:
+            self._result()
+        print("Embedding workers ready.")
+
+    def encode(self, texts):
+        n = len(texts)
+        if n == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        shm = SharedMemory(create=True, size=n * self.dim * 4)
+        try:
+            step = -(-n // self.slices)
+            starts = range(0, n, step)
+            for start in starts:
+                self._tasks.put((shm.name, n, start, list(texts[start:start + step])))
+            for _ in starts:
+                self._result()
+            out = np.ndarray((n, self.dim), dtype=np.float32, buffer=shm.buf)
+            vectors = out.copy()
+            del out
+            return vectors
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        for _ in self._procs:
+            self._tasks.put(None)
+        for proc in self._procs:
+            proc.join()
+
+    def _result(self):
+        kind, value = self._results.get()
+        if kind == 'error':
+            raise RuntimeError(f"Embedding pool failed: {value}")
+        return value
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,110 @@
+import base64
+import json
+from sqlalchemy import inspect, text
+
+from bulk_load import quote_ident
+
+# --- Keyset pagination over ranked content ---
+# Pages are read in (metric DESC, source_id DESC) order and each page ends with a
+# cursor holding the last row's (metric, source_id). The next page starts with
+# WHERE (metric, source_id) < cursor, which a composite index on (metric, source_id)
+# answers with a range scan, so page 100 costs the same as page 1.
+
+# Rankable metrics and the columns returned for each table
+RANKED_TABLES = {
+    'reddit_posts': {
+        'platform': 'reddit', 'kind': 'post', 'metrics': ('engagement', 'views'),
+        'columns': ('title', 'username', 'views', 'engagement', 'comments', 'timestamp'),
+    },
+    'youtube_posts': {
+        'platform': 'youtube', 'kind': 'post', 'metrics': ('engagement', 'views'),
+        'columns': ('title', 'username', 'views', 'engagement', 'comments', 'timestamp'),
+    },
+    'reddit_comments': {
+        'platform': 'reddit', 'kind': 'comment', 'metrics': ('likes',),
+        'columns': ('text', 'username', 'likes', 'date_of_comment'),
+    },
+    'youtube_comments': {
+        'platform': 'youtube', 'kind': 'comment', 'metrics': ('likes',),
+        'columns': ('text', 'username', 'likes', 'date_of_comment'),
+    },
+}
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not issued for this listing."""
+
+
+def ranked_table(platform, kind):
+    return f'{platform}_{kind}s'
+
+
+def ensure_keyset_indexes(engine, table_name):
+    """Creates the (metric, source_id) index for every rankable metric of `table_name`."""
+    spec = RANKED_TABLES.get(table_name)
+    if spec is None:
+        return
+    with engine.begin() as conn:
+        existing = {col['name'] for col in inspect(conn).get_columns(table_name)}
+        for metric in spec['metrics']:
+            if metric not in existing:
+                continue
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {quote_ident(f'ix_{table_name}_{metric}_source_id')} "
+                f"ON {quote_ident(table_name)} ({quote_ident(metric)}, source_id)"
+            ))
+
+
+def encode_cursor(table_name, metric, value, source_id):
+    payload = json.dumps([table_name, metric, value, source_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, table_name, metric):
+    """(value, source_id) of a cursor issued for `table_name` ordered by `metric`."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_table, cursor_metric, value, source_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if (cursor_table, cursor_metric) != (table_name, metric):
+        raise InvalidCursor("Cursor belongs to a different listing")
+    return value, source_id
+
+
+def fetch_page(conn, table_name, metric, limit, cursor=None):
+    """One page of `table_name` by `metric`, best first: (rows, next_cursor or None)."""
+    spec = RANKED_TABLES[table_name]
+    text_column = spec['columns'][0]
+    filters = [f"{quote_ident(metric)} IS NOT NULL", f"{quote_ident(text_column)} IS NOT NULL"]
+    params = {'limit': limit + 1}
+    if cursor:
+        params['after_value'], params['after_id'] = decode_cursor(cursor, table_name, metric)
+        filters.append(f"({quote_ident(metric)}, source_id) < (:after_value, :after_id)")
+
+    rows = conn.execute(text(f"""
+        SELECT source_id, {quote_ident(metric)} AS rank_value, {', '.join(map(quote_ident, spec['columns']))}
+        FROM {quote_ident(table_name)}
+        WHERE {' AND '.join(filters)}
+        ORDER BY {quote_ident(metric)} DESC, source_id DESC
+        LIMIT :limit
+    """), params).mappings().all()
+
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = encode_cursor(table_name, metric, last['rank_value'], last['source_id'])
+    return page, next_cursor
+
+
+def board_cursor(table_name, metric, board, limit):
+    """
+    Cursor that continues a leaderboard page in fetch_page. Boards are ranked like
+    the listing (score DESC, source_id DESC), so the next page starts after the
+    board's last row; None when the board held fewer than `limit` rows.
+    """
+    if len(board) < limit:
+        return None
+    last = board[-1]
+    return encode_cursor(table_name, metric, last['score'], last['source_id'])
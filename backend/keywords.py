@@ -0,0 +1,43 @@
+# --- Keyword extraction for the trending index ---
+# Titles and comments are tokenized once at ingestion; the trending endpoint then only
+# aggregates the per-day counts instead of re-scanning text on every request.
+
+MIN_KEYWORD_LENGTH = 4
+TOKEN_PATTERN = rf'\b\w{{{MIN_KEYWORD_LENGTH},}}\b'
+
+# English function words and social-media filler of keyword length (shorter words are
+# already dropped by MIN_KEYWORD_LENGTH).
+STOPWORDS = frozenset("""
+    about above across actually after afterwards again against almost alone along already also although
+    always among amongst another anybody anyhow anyone anything anyway anywhere around aren away back
+    became because become becomes becoming been before beforehand behind being below beside besides
+    best better between beyond both but cannot could couldn couldnt didn didnt does doesn doesnt doing done
+    dont down during each either else elsewhere enough even ever every everybody everyone everything
+    everywhere except few first from front further gets getting give given goes going gonna gotta
+    great hadn hasn hasnt have haven havent having hence here hereafter hereby herein hers herself
+    himself however https http isn isnt itself just keep know last later latter least less like lets
+    little lot lots made make makes many maybe might mine more moreover most mostly much must myself
+    near need neither never nevertheless next nobody none nothing now nowhere often once one only onto
+    other others otherwise ours ourselves over own part people perhaps please pretty quite rather
+    really right said same says seem seemed seeming seems shall should shouldn since some somebody
+    somehow someone something sometime sometimes somewhere still such sure take than that thats their
+    theirs them themselves then thence there thereafter thereby therefore therein theres these they
+    thing things think this those though through throughout thru thus together too toward towards
+    under until upon very want wants wasn wasnt well went were weren what whatever when whence
+    whenever where whereafter whereas whereby wherein whereupon wherever whether which while whither
+    whoever whole whom whose will with within without wont would wouldn wouldnt yeah year years
+    your yours yourself yourselves youre youve
+""".split())
+
+
+def document_keywords(texts):
+    """
+    Returns a Series of the distinct keywords of each text, indexed like `texts`
+    (one row per text and keyword). Tokens are lowercased; stopwords and
+    numbers are dropped.
+    """
+    tokens = texts.dropna().astype(str).str.lower().str.findall(TOKEN_PATTERN).explode().dropna()
+    tokens = tokens[~tokens.isin(STOPWORDS) & ~tokens.str.isdigit()]
+    # Each keyword counts once per text, however often it repeats
+    pairs = tokens.rename('keyword').rename_axis('row').reset_index().drop_duplicates()
+    return pairs.set_index('row')['keyword']
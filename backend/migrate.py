@@ -1,43 +1,254 @@
+import argparse
+import csv
+import io
+import math
+import os
 import sqlite3
-import pandas as pd
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from sqlalchemy import create_engine, text
-import os
 from dotenv import load_dotenv
+from bulk_load import NULL_MARKER, quote_ident
+from keyset import ensure_keyset_indexes
+from search_index import ensure_search_index
 
 load_dotenv()
 
 # --- Config ---
 SQLITE_DB_PATH = "insights.db"  # Your local SQLite DB
 POSTGRES_URI = os.getenv("DATABASE_URL")
+CHUNK_ROWS = 50000  # rows held in memory per table while streaming
+WORKERS = 4  # tables migrated at the same time
+
+# --- SQLite -> Postgres type mapping ---
+# Matched on the declared SQLite type, roughly following SQLite's own affinity rules.
+TYPE_RULES = [
+    ('BOOL', 'BOOLEAN'),
+    ('SMALLINT', 'SMALLINT'),  # before INT, which would widen toxicity_code to BIGINT
+    ('INT', 'BIGINT'),
+    ('TIMESTAMP', 'TIMESTAMP'),
+    ('DATETIME', 'TIMESTAMP'),
+    ('DATE', 'DATE'),
+    ('REAL', 'DOUBLE PRECISION'),
+    ('FLOA', 'DOUBLE PRECISION'),
+    ('DOUB', 'DOUBLE PRECISION'),
+    ('NUMERIC', 'NUMERIC'),
+    ('DECIMAL', 'NUMERIC'),
+    ('BLOB', 'BYTEA'),
+]
+
+
+def pg_type(sqlite_type):
+    declared = (sqlite_type or '').upper()
+    for needle, mapped in TYPE_RULES:
+        if needle in declared:
+            return mapped
+    return 'TEXT'
+
+
+def sqlite_tables(sqlite_conn):
+    rows = sqlite_conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+    )
+    return [row[0] for row in rows]
+
+
+def table_columns(sqlite_conn, table):
+    """Returns [(name, postgres type)] and the primary key columns of a SQLite table."""
+    info = sqlite_conn.execute(f"PRAGMA table_info({quote_ident(table)})").fetchall()
+    columns = [(row[1], pg_type(row[2])) for row in info]
+    primary_key = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+    return columns, primary_key
+
+
+def table_indexes(sqlite_conn, table):
+    """Returns [(name, unique, [columns])] for the explicitly created indexes of a table."""
+    indexes = []
+    for _, name, unique, origin, partial in sqlite_conn.execute(f"PRAGMA index_list({quote_ident(table)})"):
+        if origin != 'c' or partial:
+            continue  # primary key / UNIQUE constraint indexes, and partial indexes
+        columns = [row[2] for row in sqlite_conn.execute(f"PRAGMA index_info({quote_ident(name)})")]
+        if columns and None not in columns:  # expression indexes are skipped
+            indexes.append((name, bool(unique), columns))
+    return indexes
+
+
+# --- Streaming copy ---
+
+def _csv_value(value):
+    if value is None:
+        return NULL_MARKER
+    if isinstance(value, bytes):
+        return '\\x' + value.hex()  # bytea hex input format
+    return value
+
+
+def copy_rows(pg_conn, table, column_names, rows):
+    """COPYs a list of row tuples into a Postgres table."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    buffer.seek(0)
+    columns = ', '.join(quote_ident(name) for name in column_names)
+    with pg_conn.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {quote_ident(table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')", buffer
+        )
+
+
+def migrate_table(sqlite_path, pg_engine, table, chunk_rows=CHUNK_ROWS):
+    """Streams one table into Postgres and builds its keys and indexes after the load."""
+    start = time.perf_counter()
+    sqlite_conn = sqlite3.connect(sqlite_path)
+    try:
+        columns, primary_key = table_columns(sqlite_conn, table)
+        indexes = table_indexes(sqlite_conn, table)
+        column_names = [name for name, _ in columns]
+        column_defs = ', '.join(f"{quote_ident(name)} {pg_type}" for name, pg_type in columns)
+
+        with pg_engine.begin() as pg_conn:
+            pg_conn.execute(text(f"DROP TABLE IF EXISTS {quote_ident(table)}"))
+            # UNLOGGED while loading: no WAL for the bulk rows, switched back below
+            pg_conn.execute(text(f"CREATE UNLOGGED TABLE {quote_ident(table)} ({column_defs})"))
+
+        rows = 0
+        cursor = sqlite_conn.execute(
+            f"SELECT {', '.join(quote_ident(name) for name in column_names)} FROM {quote_ident(table)}"
+        )
+        while True:
+            batch = cursor.fetchmany(chunk_rows)
+            if not batch:
+                break
+            with pg_engine.begin() as pg_conn:
+                copy_rows(pg_conn, table, column_names, batch)
+            rows += len(batch)
+
+        with pg_engine.begin() as pg_conn:
+            if primary_key:
+                pg_conn.execute(text(
+                    f"ALTER TABLE {quote_ident(table)} ADD PRIMARY KEY ({', '.join(map(quote_ident, primary_key))})"
+                ))
+            for name, unique, index_columns in indexes:
+                pg_conn.execute(text(
+                    f"CREATE {'UNIQUE ' if unique else ''}INDEX {quote_ident(name)} ON {quote_ident(table)} "
+                    f"({', '.join(map(quote_ident, index_columns))})"
+                ))
+            indexed = {tuple(cols[:1]) for _, _, cols in indexes} | {tuple(primary_key[:1])}
+            if 'source_id' in column_names and ('source_id',) not in indexed:
+                pg_conn.execute(text(
+                    f"CREATE INDEX {quote_ident(f'ix_{table}_source_id')} ON {quote_ident(table)} (source_id)"
+                ))
+            pg_conn.execute(text(f"ALTER TABLE {quote_ident(table)} SET LOGGED"))
+            pg_conn.execute(text(f"ANALYZE {quote_ident(table)}"))
+        ensure_search_index(pg_engine, table)
+        ensure_keyset_indexes(pg_engine, table)
+    finally:
+        sqlite_conn.close()
+
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed else 0
+    return f"{rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)"
+
+
+# --- Verification ---
+# Both sides compute the same aggregates per column: the non-null count, plus the sum
+# for numbers and booleans and the total length for text, so truncated, dropped or
+# mangled values show up without comparing rows one by one.
+
+def checksum_expressions(columns, dialect):
+    expressions = ['COUNT(*)']
+    for name, pg_type in columns:
+        col = quote_ident(name)
+        expressions.append(f"COUNT({col})")
+        if pg_type in ('BIGINT', 'DOUBLE PRECISION', 'NUMERIC'):
+            expressions.append(f"SUM({col})")
+        elif pg_type == 'BOOLEAN':
+            expressions.append(f"SUM(CAST({col} AS INTEGER))" if dialect == 'postgresql' else f"SUM({col})")
+        elif pg_type == 'BYTEA':
+            expressions.append(f"SUM(OCTET_LENGTH({col}))" if dialect == 'postgresql' else f"SUM(LENGTH({col}))")
+        elif pg_type == 'TEXT':
+            expressions.append(f"SUM(LENGTH({col}))")
+    return expressions
+
+
+def _labels(columns):
+    labels = ['row count']
+    for name, pg_type in columns:
+        labels.append(f"{name} count")
+        if pg_type in ('BIGINT', 'DOUBLE PRECISION', 'NUMERIC', 'BOOLEAN'):
+            labels.append(f"{name} sum")
+        elif pg_type in ('BYTEA', 'TEXT'):
+            labels.append(f"{name} length")
+    return labels
+
+
+def _same(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    a, b = float(a), float(b)
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+
+
+def verify_table(sqlite_path, pg_engine, table):
+    """Returns a list of mismatch descriptions (empty when the copy is faithful)."""
+    sqlite_conn = sqlite3.connect(sqlite_path)
+    try:
+        columns, _ = table_columns(sqlite_conn, table)
+        source = sqlite_conn.execute(
+            f"SELECT {', '.join(checksum_expressions(columns, 'sqlite'))} FROM {quote_ident(table)}"
+        ).fetchone()
+    finally:
+        sqlite_conn.close()
+    with pg_engine.connect() as pg_conn:
+        target = pg_conn.execute(text(
+            f"SELECT {', '.join(checksum_expressions(columns, 'postgresql'))} FROM {quote_ident(table)}"
+        )).fetchone()
+    return [
+        f"{label}: sqlite={a} postgres={b}"
+        for label, a, b in zip(_labels(columns), source, target)
+        if not _same(a, b)
+    ]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Migrate the local SQLite database into Postgres.")
+    parser.add_argument('--tables', nargs='*', help="Only these tables (default: all).")
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--verify-only', action='store_true', help="Skip the copy and only compare checksums.")
+    args = parser.parse_args()
+
+    # --- Connect to Postgres (Neon) ---
+    pg_engine = create_engine(POSTGRES_URI, pool_size=args.workers)
+
+    with sqlite3.connect(SQLITE_DB_PATH) as sqlite_conn:
+        tables = args.tables or sqlite_tables(sqlite_conn)
+    print(f"Found tables: {tables}")
+
+    if not args.verify_only:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(migrate_table, SQLITE_DB_PATH, pg_engine, table, args.chunk_rows): table
+                for table in tables
+            }
+            for future in as_completed(futures):
+                print(f"Table {futures[future]} migrated: {future.result()}")
+
+    print("Verifying row counts and column checksums...")
+    failed = False
+    for table in tables:
+        mismatches = verify_table(SQLITE_DB_PATH, pg_engine, table)
+        if mismatches:
+            failed = True
+            print(f"  ! {table}:")
+            for mismatch in mismatches:
+                print(f"      {mismatch}")
+        else:
+            print(f"  - {table}: OK")
 
-# --- Connect to SQLite ---
-sqlite_conn = sqlite3.connect(SQLITE_DB_PATH)
-sqlite_cursor = sqlite_conn.cursor()
-
-# --- Connect to Postgres (Neon) ---
-pg_engine = create_engine(POSTGRES_URI)
-
-# --- Get list of tables in SQLite ---
-sqlite_cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-tables = [row[0] for row in sqlite_cursor.fetchall()]
-
-print(f"Found tables: {tables}")
-
-for table in tables:
-    print(f"Migrating table: {table}")
-    
-    # Read entire table from SQLite
-    df = pd.read_sql(f"SELECT * FROM {table}", sqlite_conn)
-    
-    # Optional: convert SQLite types to Postgres-compatible types if needed
-    # For example, booleans, timestamps, etc.
-    
-    # Write to Postgres
-    df.to_sql(table, pg_engine, if_exists="replace", index=False)
-    print(f"Table {table} migrated successfully.")
-
-print("Migration complete!")
-
-# Close connections
-sqlite_conn.close()
-pg_engine.dispose()
+    pg_engine.dispose()
+    if failed:
+        print("Migration finished with checksum mismatches.")
+        sys.exit(1)
+    print("Migration complete!")
@@ -0,0 +1,113 @@
+import numpy as np
+import orjson
+import pandas as pd
+
+# --- Helpers for the JSON columns of the raw data dumps ---
+
+def safe_json_object(text):
+    """Decodes a JSON object string, returning None for missing or malformed values."""
+    if not isinstance(text, str):
+        return None
+    try:
+        value = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def extract_json_fields(series, fields):
+    """
+    Decodes every JSON string in `series` exactly once and pulls out several keys.
+    `fields` maps each key to the default used when the key is missing or null.
+    Returns a DataFrame with one column per key, aligned to the series index.
+    """
+    decoded = [safe_json_object(item) for item in series]
+    data = {}
+    for key, default in fields.items():
+        values = [obj.get(key) if obj is not None else None for obj in decoded]
+        if default is not None:
+            values = [default if value is None else value for value in values]
+        data[key] = values
+    return pd.DataFrame(data, index=series.index)
+
+
+def parse_timestamps(values):
+    """
+    Parses a column of timestamps to UTC, NaT where unparseable. SQLite hands back
+    ISO text whose precision varies between rows, which defeats pandas' format inference.
+    """
+    return pd.to_datetime(values, errors='coerce', utc=True, format='ISO8601')
+
+
+# --- Columnar extraction of the 'text_analysis' column ---
+
+# Known toxicity labels, in the order used for the categorical codes.
+TOXICITY_LEVELS = ['non_toxic', 'toxic']
+# Stored toxicity codes (SMALLINT): any label other than 'non_toxic' counts as toxic
+NON_TOXIC, TOXIC = 0, 1
+SENTIMENT_KEYS = ['neutral', 'negative', 'positive']
+
+
+def _decode_batch(series):
+    """
+    Decodes a whole column of JSON strings with one parser call by splicing them
+    into a single JSON array. Falls back to per-row decoding if any row is malformed.
+    """
+    items = series.tolist()
+    valid = [i for i, item in enumerate(items) if isinstance(item, str) and item]
+    decoded = [None] * len(items)
+    if not valid:
+        return decoded
+    try:
+        values = orjson.loads('[' + ','.join(items[i] for i in valid) + ']')
+        if len(values) != len(valid):
+            raise ValueError("row count mismatch")
+        for i, value in zip(valid, values):
+            decoded[i] = value if isinstance(value, dict) else None
+    except (orjson.JSONDecodeError, ValueError):
+        for i in valid:
+            decoded[i] = safe_json_object(items[i])
+    return decoded
+
+
+def _toxicity_label(toxicity):
+    """Returns the non-'non_toxic' label if its score is above 0.5, else 'non_toxic'."""
+    toxic_key = next((k for k in toxicity if k != 'non_toxic'), 'non_toxic')
+    return toxic_key if (toxicity.get(toxic_key) or 0) > 0.5 else 'non_toxic'
+
+
+def toxicity_codes(labels):
+    """SMALLINT code of each toxicity label; missing labels stay missing."""
+    labels = pd.Series(labels).astype(object)
+    codes = pd.Series(np.where(labels == 'non_toxic', NON_TOXIC, TOXIC), index=labels.index).astype('Int16')
+    return codes.mask(labels.isna())
+
+
+def parse_analysis_data(series):
+    """
+    Parses the 'text_analysis' JSON column into float32 sentiment columns, a
+    categorical 'toxicity' column and its 'toxicity_code'. Rows that fail to parse
+    get NaN / missing values.
+    """
+    decoded = _decode_batch(series)
+    n = len(decoded)
+
+    sentiments = [obj.get('Sentiment') if obj is not None else None for obj in decoded]
+    sentiments = [s if isinstance(s, dict) else None for s in sentiments]
+    data = {}
+    for key in SENTIMENT_KEYS:
+        # numpy maps None to NaN when building a float array
+        values = [s.get(key) if s is not None else None for s in sentiments]
+        data[f'sentiment_{key}'] = np.array(values, dtype=np.float32)
+
+    labels = [None] * n
+    for i, obj in enumerate(decoded):
+        if obj is None:
+            continue
+        toxicity = obj.get('Toxicity', {})
+        labels[i] = _toxicity_label(toxicity) if isinstance(toxicity, dict) else None
+    extra_levels = sorted({label for label in labels if label is not None} - set(TOXICITY_LEVELS))
+    data['toxicity'] = pd.Categorical(labels, categories=TOXICITY_LEVELS + extra_levels)
+    data['toxicity_code'] = toxicity_codes(labels).array
+
+    return pd.DataFrame(data, index=series.index)
@@ -1,25 +1,29 @@
+import argparse
 import pandas as pd
 from sqlalchemy import create_engine
-import json
 import os
+from parsing import extract_json_fields
+from bulk_load import BulkWriter, count_rows
+from checkpoints import TableCheckpointStore
+from csv_chunks import iter_csv_chunks
+from progress import ByteProgress
+from realtime import publish_activity
+from rollups import apply_rollups, reset_source
+from keyset import ensure_keyset_indexes
+from search_index import ensure_search_index
 
 # --- Configuration ---
+# INGEST_DATABASE_URL can point the loader straight at Postgres, where chunks are written with COPY.
 DB_NAME = 'insights.db'
-DB_ENGINE = create_engine(f'sqlite:///{DB_NAME}')
-
-# --- Helper Function for Safe JSON Parsing ---
-def safe_json_loads(text, key):
-    """Safely loads a JSON string and extracts a key, returning None on failure."""
-    try:
-        return json.loads(text).get(key)
-    except (json.JSONDecodeError, TypeError, AttributeError):
-        return None
+DB_ENGINE = create_engine(os.getenv('INGEST_DATABASE_URL', f'sqlite:///{DB_NAME}'))
+# Kept in the database itself, so each checkpoint commits with its chunk
+CHECKPOINTS = TableCheckpointStore(DB_ENGINE)
 
 # --- Processing Function for each CSV file ---
 
 def process_youtube_comments_chunk(chunk):
     """Processes a chunk of the YouTube comments data."""
-    chunk['likes'] = chunk['reactions'].apply(lambda x: safe_json_loads(x, 'likes') or 0)
+    chunk['likes'] = extract_json_fields(chunk['reactions'], {'likes': 0})['likes']
     chunk.rename(columns={'id': 'source_id'}, inplace=True)
     
     columns_to_keep = [
@@ -38,8 +42,9 @@ def process_youtube_comments_chunk(chunk):
 
 def process_reddit_comments_chunk(chunk):
     """Processes a chunk of the Reddit comments data."""
-    chunk['likes'] = chunk['reactions'].apply(lambda x: safe_json_loads(x, 'likes') or 0)
-    chunk['dislikes'] = chunk['reactions'].apply(lambda x: safe_json_loads(x, 'dislikes') or 0)
+    reactions = extract_json_fields(chunk['reactions'], {'likes': 0, 'dislikes': 0})
+    chunk['likes'] = reactions['likes']
+    chunk['dislikes'] = reactions['dislikes']
     chunk.rename(columns={'id': 'source_id'}, inplace=True)
     
     columns_to_keep = [
@@ -57,8 +62,9 @@ def process_reddit_comments_chunk(chunk):
 
 def process_reddit_posts_chunk(chunk):
     """Processes a chunk of the Reddit posts data."""
-    chunk['title'] = chunk['raw_text'].apply(lambda x: safe_json_loads(x, 'title'))
-    chunk['ups'] = chunk['raw_text'].apply(lambda x: safe_json_loads(x, 'ups') or 0)
+    raw = extract_json_fields(chunk['raw_text'], {'title': None, 'ups': 0})
+    chunk['title'] = raw['title']
+    chunk['ups'] = raw['ups']
     chunk.rename(columns={'id': 'source_id', 'comments': 'num_comments'}, inplace=True)
     
     # Safely handle numeric and boolean columns
@@ -84,8 +90,9 @@ def process_reddit_posts_chunk(chunk):
 
 def process_youtube_posts_chunk(chunk):
     """Processes a chunk of the YouTube posts data."""
-    chunk['title'] = chunk['raw_text'].apply(lambda x: safe_json_loads(x, 'title'))
-    chunk['description'] = chunk['raw_text'].apply(lambda x: safe_json_loads(x, 'description'))
+    raw = extract_json_fields(chunk['raw_text'], {'title': None, 'description': None})
+    chunk['title'] = raw['title']
+    chunk['description'] = raw['description']
     chunk.rename(columns={'id': 'source_id'}, inplace=True)
     
     # Safely handle numeric and boolean columns
@@ -112,29 +119,48 @@ def process_youtube_posts_chunk(chunk):
 
 # --- Generic Loading Function ---
 
-def load_csv_to_db(file_path, table_name, processing_function, chunk_size=10000):
-    """Generic function to process any CSV and load it into the database."""
+def load_csv_to_db(file_path, table_name, processing_function, chunk_size=10000, merge=False):
+    """
+    Generic function to process any CSV and load it into the database.
+    With merge=True rows are upserted by source_id instead of replacing the table.
+    """
     print(f"\nProcessing '{os.path.basename(file_path)}' into table '{table_name}'...")
-    
-    with DB_ENGINE.connect() as connection:
-        if pd.io.sql.has_table(table_name, connection):
-            print(f"Table '{table_name}' already exists. Skipping.")
-            return
 
     try:
-        chunk_iterator = pd.read_csv(file_path, chunksize=chunk_size, on_bad_lines='skip', low_memory=False)
-        
-        is_first_chunk = True
-        for i, chunk in enumerate(chunk_iterator):
-            print(f"  - Processing chunk {i+1}...")
+        # Resume after the last chunk that made it into the table, if any
+        checkpoint = CHECKPOINTS.get(file_path, 'sql')
+        if checkpoint and not merge and count_rows(DB_ENGINE, table_name) < checkpoint['rows']:
+            # An UNLOGGED table comes back empty after a Postgres crash
+            print(f"  - '{table_name}' holds fewer rows than its checkpoint; loading it again from the start.")
+            checkpoint = None
+        if checkpoint:
+            chunk_size = checkpoint['chunk_size']
+            print(f"  - Resuming after chunk {checkpoint['chunk']} (byte {checkpoint['offset']:,}).")
+        start_offset = checkpoint['offset'] if checkpoint else 0
+        start_chunk = checkpoint['chunk'] if checkpoint else 0
+
+        progress = ByteProgress(file_path, start_offset)
+        chunk_iterator = iter_csv_chunks(file_path, chunk_size, start_offset=start_offset)
+        if merge:
+            writer = BulkWriter(DB_ENGINE, table_name, upsert_key='source_id', on_write=[apply_rollups, publish_activity])
+        else:
+            if not checkpoint:
+                reset_source(DB_ENGINE, table_name)
+            writer = BulkWriter(
+                DB_ENGINE, table_name, if_exists='append' if checkpoint else 'replace', unlogged=not checkpoint,
+                on_write=[apply_rollups, publish_activity],
+            )
+
+        for i, (chunk, end_offset) in enumerate(chunk_iterator, start=start_chunk + 1):
             processed_chunk = processing_function(chunk)
-            
-            if is_first_chunk:
-                processed_chunk.to_sql(table_name, DB_ENGINE, if_exists='replace', index=False)
-                is_first_chunk = False
-            else:
-                processed_chunk.to_sql(table_name, DB_ENGINE, if_exists='append', index=False)
-                
+            writer.write(processed_chunk, on_write=[
+                lambda conn, *_: CHECKPOINTS.update(conn, file_path, 'sql', end_offset, i, len(processed_chunk), chunk_size)
+            ])
+            print(f"  - Chunk {i}: {progress.update(end_offset, len(chunk))}")
+
+        writer.finish(index_columns=['source_id'])
+        ensure_search_index(DB_ENGINE, table_name)
+        ensure_keyset_indexes(DB_ENGINE, table_name)
         print(f"Successfully populated '{table_name}'")
     except FileNotFoundError:
         print(f"Error: File not found at '{file_path}'. Please check the path.")
@@ -153,14 +179,21 @@ if __name__ == '__main__':
         { "path": "data/posts Data Dump - Reddit.csv", "table": "reddit_posts", "processor": process_reddit_posts_chunk }
     ]
 
+    parser = argparse.ArgumentParser(description="Load the CSV dumps into the SQL database.")
+    parser.add_argument('--rebuild', action='store_true', help="Delete the database and checkpoints and load everything from scratch.")
+    parser.add_argument('--merge', action='store_true', help="Upsert rows by source_id into the existing tables (for delta dumps).")
+    args = parser.parse_args()
+
     print("--- Starting Data Processing ---")
-    # To ensure a fresh start, we remove the old database file if it exists.
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)
-        print(f"Removed old database '{DB_NAME}' to rebuild.")
+    # Loads resume from their checkpoints; --rebuild starts over from an empty database.
+    if args.rebuild:
+        if DB_ENGINE.dialect.name == 'sqlite' and os.path.exists(DB_NAME):
+            os.remove(DB_NAME)
+            print(f"Removed old database '{DB_NAME}' to rebuild.")
+        CHECKPOINTS.clear()
 
     for file_info in files_to_process:
-        load_csv_to_db(file_info["path"], file_info["table"], file_info["processor"])
+        load_csv_to_db(file_info["path"], file_info["table"], file_info["processor"], merge=args.merge)
     
     print("\n--- All data processing complete. ---")
     print(f"Database '{DB_NAME}' is ready with a complete schema.")
\ No newline at end of file
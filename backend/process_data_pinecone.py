@@ -1,64 +1,57 @@
+import argparse
 import pandas as pd
 from sqlalchemy import create_engine
 import json
 import os
-import pinecone
-from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import numpy as np
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
+from parsing import extract_json_fields, parse_analysis_data
+from bulk_load import BulkWriter, count_rows
+from checkpoints import CheckpointStore, TableCheckpointStore
+from csv_chunks import iter_csv_chunks
+from progress import ByteProgress
+from realtime import publish_activity
+from rollups import apply_rollups, reset_source
+from keyset import ensure_keyset_indexes
+from search_index import ensure_search_index
+from vector_pipeline import VectorUpsertPipeline
+from embeddings import CachedEncoder, EmbeddingStore
+from encoding_pool import EncodingPool
 
 # --- Configuration & Initialization ---
 load_dotenv() # Load variables from .env file
 
 # SQL Database Config
+# INGEST_DATABASE_URL can point the loader straight at Postgres, where chunks are written with COPY.
 SQL_DB_NAME = 'insights.db'
-SQL_ENGINE = create_engine(f'sqlite:///{SQL_DB_NAME}')
+SQL_ENGINE = create_engine(os.getenv('INGEST_DATABASE_URL', f'sqlite:///{SQL_DB_NAME}'))
 
 # Pinecone Config
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 PINECONE_INDEX_NAME = 'insights-index'
 
-# Sentence Transformer Model
-print("Loading Sentence Transformer model... (This may take a moment)")
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
-print("Model loaded.")
-
-# Initialize Pinecone
-# pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
-
-def count_csv_rows(file_path):
-    """Efficiently counts the number of rows in a CSV file."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        # Subtract 1 for the header row
-        return sum(1 for line in f) - 1
-
-# --- Helper Function for Advanced JSON Parsing ---
-def parse_analysis_data(series):
-    """Parses the 'text_analysis' JSON column into separate columns."""
-    data = {'sentiment_neutral': [], 'sentiment_negative': [], 'sentiment_positive': [], 'toxicity': []}
-    
-    for item in series:
-        try:
-            analysis = json.loads(item)
-            # Sentiment
-            sentiment = analysis.get('Sentiment', {})
-            data['sentiment_neutral'].append(sentiment.get('neutral'))
-            data['sentiment_negative'].append(sentiment.get('negative'))
-            data['sentiment_positive'].append(sentiment.get('positive'))
-            # Toxicity - get the key that is NOT 'non_toxic'
-            toxicity_dict = analysis.get('Toxicity', {})
-            toxic_key = next((k for k in toxicity_dict if k != 'non_toxic'), 'non_toxic')
-            data['toxicity'].append(toxic_key if toxicity_dict.get(toxic_key, 0) > 0.5 else 'non_toxic')
-
-        except (json.JSONDecodeError, TypeError, AttributeError):
-            for key in data: data[key].append(None)
-            
-    return pd.DataFrame(data, index=series.index)
+# Embedding / upsert throughput settings
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+ENCODE_BATCH_SIZE = 64
+UPSERT_WORKERS = 4
+
+# Set up in the main block. EncodingPool workers are spawned and re-import this file
+# before they fix their torch thread counts, so nothing at module level may load torch
+# or the model, open the embedding cache or a Pinecone client, or read checkpoints.
+embedding_model = None
+encoding_pool = None
+embedding_store = None  # vectors already computed for the same model and text are reused across runs
+pc = None
+
+# Per-file progress of the SQL and vector sinks, so interrupted loads can resume. The SQL
+# sink's checkpoints live in its own database and commit in the same transaction as each
+# chunk; the store only connects when first used
+checkpoints = None
+SQL_CHECKPOINTS = TableCheckpointStore(SQL_ENGINE)
+# process_data.py loads the same files into differently shaped tables under 'sql'
+SQL_SINK = 'sql:pinecone'
 
 
 # --- DETAILED Processing Functions for Each CSV file ---
@@ -66,11 +59,10 @@ def parse_analysis_data(series):
 def process_comments_chunk(chunk, platform):
     """Unified processor for both YouTube and Reddit comments."""
     # Reactions
-    if platform == 'youtube':
-        chunk['likes'] = chunk['reactions'].apply(lambda x: json.loads(x).get('likes') if isinstance(x, str) else 0)
-    else:
-        chunk['likes'] = chunk['reactions'].apply(lambda x: json.loads(x).get('likes') if isinstance(x, str) else 0)
-        chunk['dislikes'] = chunk['reactions'].apply(lambda x: json.loads(x).get('dislikes') if isinstance(x, str) else 0)
+    reaction_fields = {'likes': 0} if platform == 'youtube' else {'likes': 0, 'dislikes': 0}
+    reactions = extract_json_fields(chunk['reactions'], reaction_fields)
+    for col in reaction_fields:
+        chunk[col] = reactions[col]
 
     # Text Analysis
     analysis_df = parse_analysis_data(chunk['text_analysis'])
@@ -79,7 +71,7 @@ def process_comments_chunk(chunk, platform):
     chunk.rename(columns={'id': 'source_id'}, inplace=True)
     
     base_columns = ['source_id', 'comment_id', 'username', 'raw_text', 'text', 'date_of_comment', 'post_id', 'parent_comment_id', 'likes',
-                    'sentiment_neutral', 'sentiment_negative', 'sentiment_positive', 'toxicity']
+                    'sentiment_neutral', 'sentiment_negative', 'sentiment_positive', 'toxicity', 'toxicity_code']
     if platform == 'reddit':
         base_columns.append('dislikes')
 
@@ -93,15 +85,16 @@ def process_comments_chunk(chunk, platform):
 def process_posts_chunk(chunk, platform):
     """Unified processor for both YouTube and Reddit posts."""
     # Text/Title/Description from raw_text JSON
-    chunk['title'] = chunk['raw_text'].apply(lambda x: json.loads(x).get('title') if isinstance(x, str) else None)
-    if platform == 'youtube':
-        chunk['description'] = chunk['raw_text'].apply(lambda x: json.loads(x).get('description') if isinstance(x, str) else None)
+    # All derived fields come from a single decode of raw_text per row
+    raw_fields = {'title': None, 'description': None} if platform == 'youtube' else {'title': None, 'ups': 0}
+    raw = extract_json_fields(chunk['raw_text'], raw_fields)
+    for col in raw_fields:
+        chunk[col] = raw[col]
 
     # Engagement Metrics
     numeric_cols = ['comments', 'views', 'shares', 'reposts', 'engagement']
     if platform == 'reddit':
         numeric_cols.append('ups')
-        chunk['ups'] = chunk['raw_text'].apply(lambda x: json.loads(x).get('ups') if isinstance(x, str) else 0)
 
     for col in numeric_cols:
         if col in chunk.columns:
@@ -114,7 +107,7 @@ def process_posts_chunk(chunk, platform):
     chunk.rename(columns={'id': 'source_id'}, inplace=True)
 
     base_columns = ['source_id', 'post_id', 'title', 'timestamp', 'username', 'user_id', 'user_fullname', 'comments', 'link', 'platform', 'nsfw', 'media_url', 'external_url',
-                    'views', 'shares', 'reposts', 'engagement', 'sentiment_neutral', 'sentiment_negative', 'sentiment_positive', 'toxicity']
+                    'views', 'shares', 'reposts', 'engagement', 'sentiment_neutral', 'sentiment_negative', 'sentiment_positive', 'toxicity', 'toxicity_code']
     
     if platform == 'youtube':
         base_columns.append('description')
@@ -130,75 +123,122 @@ def process_posts_chunk(chunk, platform):
 
 
 # --- Main Data Loading & Embedding Function ---
-def process_and_load_data(file_info, csv_chunk_size=2000, pinecone_batch_size=100):
+def process_and_load_data(file_info, csv_chunk_size=2000, pinecone_batch_size=100, merge=False):
     file_path, table_name, processor, text_column, platform = file_info.values()
 
-    # NEW: Check if the table already exists in the SQL DB. If so, skip the file.
-    with SQL_ENGINE.connect() as connection:
-        if pd.io.sql.has_table(table_name, connection):
-            print(f"\nTable '{table_name}' already exists in the database. Skipping file.")
-            return
+    # Resume each sink from its last checkpoint instead of skipping or redoing the whole file
+    sql_checkpoint = SQL_CHECKPOINTS.get(file_path, SQL_SINK)
+    if sql_checkpoint and not merge and count_rows(SQL_ENGINE, table_name) < sql_checkpoint['rows']:
+        # An UNLOGGED table comes back empty after a Postgres crash
+        print(f"  - '{table_name}' holds fewer rows than its checkpoint; loading it again from the start.")
+        sql_checkpoint = None
+    vector_checkpoint = checkpoints.get(file_path, 'vector')
+    resumed = [cp for cp in (sql_checkpoint, vector_checkpoint) if cp is not None]
+    if resumed and resumed[0]['chunk_size'] != csv_chunk_size:
+        # Chunk boundaries have to line up with the ones the checkpoints were taken at
+        print(f"  - Using chunk size {resumed[0]['chunk_size']} from the existing checkpoint.")
+        csv_chunk_size = resumed[0]['chunk_size']
+
+    sql_offset = sql_checkpoint['offset'] if sql_checkpoint else 0
+    vector_offset = vector_checkpoint['offset'] if vector_checkpoint else 0
+    start_checkpoint = None
+    if sql_checkpoint and vector_checkpoint:
+        start_checkpoint = min(resumed, key=lambda cp: cp['offset'])
+    start_offset = start_checkpoint['offset'] if start_checkpoint else 0
+    start_chunk = start_checkpoint['chunk'] if start_checkpoint else 0
+
+    progress = ByteProgress(file_path, start_offset)
+    print(f"\nProcessing '{os.path.basename(file_path)}' ({progress.total_bytes / 1e6:,.1f} MB)...")
+    if start_chunk:
+        print(f"  - Resuming after chunk {start_chunk} (byte {start_offset:,}).")
 
-    total_rows = count_csv_rows(file_path)
-    total_chunks = (total_rows // csv_chunk_size) + 1
-    print(f"\nProcessing '{os.path.basename(file_path)}' ({total_rows} rows in {total_chunks} chunks)...")
-    
     index = pc.Index(PINECONE_INDEX_NAME)
-    
-    chunk_iterator = pd.read_csv(file_path, chunksize=csv_chunk_size, on_bad_lines='skip', low_memory=False)
-    is_first_sql_chunk = True
-
-    for i, chunk in enumerate(chunk_iterator):
-        # print(f"  - Processing CSV chunk {i+1} for {table_name}...")
-        print(f"  - Processing CSV chunk {i+1} of {total_chunks} for {table_name}...")
-        
-        # 1. Process for SQL
-        # FIX: Process the chunk first to create derived columns like 'title'
+    encoder = CachedEncoder(embedding_model, embedding_store, batch_size=ENCODE_BATCH_SIZE, pool=encoding_pool)
+
+    chunk_iterator = iter_csv_chunks(file_path, csv_chunk_size, start_offset=start_offset)
+    # Vector checkpoints are written as the upsert workers finish each chunk, in order
+    vector_pipeline = VectorUpsertPipeline(
+        index, batch_size=pinecone_batch_size, workers=UPSERT_WORKERS,
+        on_chunk_done=lambda done: checkpoints.update(file_path, 'vector', *done, csv_chunk_size),
+    )
+    # A fresh load replaces the table, a resumed one appends to it, and a merge upserts
+    # by source_id. Vectors are always upserted under '{table}_{source_id}', so they merge too.
+    # Rollup tables are updated in the same transaction as each chunk's rows, and the
+    # chunk's recent activity is pushed to the API's realtime stream when it commits
+    if merge:
+        sql_writer = BulkWriter(SQL_ENGINE, table_name, upsert_key='source_id', on_write=[apply_rollups, publish_activity])
+    else:
+        fresh_sql = sql_checkpoint is None
+        if fresh_sql:
+            reset_source(SQL_ENGINE, table_name)
+        sql_writer = BulkWriter(
+            SQL_ENGINE, table_name, if_exists='replace' if fresh_sql else 'append', unlogged=fresh_sql,
+            on_write=[apply_rollups, publish_activity],
+        )
+
+    for i, (chunk, end_offset) in enumerate(chunk_iterator, start=start_chunk + 1):
+        # Process the chunk first to create derived columns like 'title'
         processed_chunk = processor(chunk.copy(), platform)
-        
-        # 1. Process for SQL
-        if is_first_sql_chunk:
-            processed_chunk.to_sql(table_name, SQL_ENGINE, if_exists='replace', index=False)
-            is_first_sql_chunk = False
-        else:
-            processed_chunk.to_sql(table_name, SQL_ENGINE, if_exists='append', index=False)
+
+        # 1. Load into SQL
+        if end_offset > sql_offset:
+            sql_writer.write(processed_chunk, on_write=[
+                lambda conn, *_: SQL_CHECKPOINTS.update(conn, file_path, SQL_SINK, end_offset, i, len(processed_chunk), csv_chunk_size)
+            ])
+        print(f"  - Chunk {i} of {table_name}: {progress.update(end_offset, len(chunk))}")
+
+        if end_offset <= vector_offset:
+            continue
 
         # 2. Process for Pinecone Embeddings using the already processed chunk
-        # Now the 'title' column exists when this code is reached.
         pinecone_chunk = processed_chunk.dropna(subset=[text_column, 'source_id']).copy()
         pinecone_chunk = pinecone_chunk[pinecone_chunk[text_column].astype(str).str.strip() != '']
-        if pinecone_chunk.empty: continue
 
         texts_to_embed = pinecone_chunk[text_column].tolist()
         ids = [f"{table_name}_{int(row_id)}" for row_id in pinecone_chunk['source_id']]
-        embeddings = embedding_model.encode(texts_to_embed).tolist()
         metadata = [{"source": table_name, "text": text} for text in texts_to_embed]
-
-        # 3. Upsert to Pinecone in smaller batches to avoid size limits
-        for j in range(0, len(ids), pinecone_batch_size):
-            batch_end = j + pinecone_batch_size
-            batch_ids = ids[j:batch_end]
-            batch_embeddings = embeddings[j:batch_end]
-            batch_metadata = metadata[j:batch_end]
-            
-            # Zip the batch data for upsert
-            batch_to_upsert = zip(batch_ids, batch_embeddings, batch_metadata)
-            index.upsert(vectors=list(batch_to_upsert))
-
+        # Only texts missing from the embedding cache go through the model
+        embeddings = encoder.encode(texts_to_embed)
+
+        # 3. Hand the float32 matrix to the upsert workers while the next chunk is read and encoded
+        vector_pipeline.submit((end_offset, i, len(ids)), ids, embeddings, metadata)
+
+    try:
+        vector_pipeline.close()
+        print(f"  - Embeddings: {encoder.report()}")
+    finally:
+        # A failed upsert is re-raised by close(); the SQL table is complete either way
+        sql_writer.finish(index_columns=['source_id'])
+    ensure_search_index(SQL_ENGINE, table_name)
+    ensure_keyset_indexes(SQL_ENGINE, table_name)
     print(f"Successfully processed and uploaded '{os.path.basename(file_path)}'")
 
 # --- Main Execution Block ---
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load the CSV dumps into SQL and Pinecone.")
+    parser.add_argument('--rebuild', action='store_true', help="Ignore checkpoints and reload every file from the start.")
+    parser.add_argument('--merge', action='store_true', help="Upsert rows by source_id into the existing tables (for delta dumps).")
+    parser.add_argument('--encode-workers', type=int, default=0, help="Embed with this many worker processes (0 = in this process).")
+    args = parser.parse_args()
+
     if not all([PINECONE_API_KEY, PINECONE_ENVIRONMENT]):
         print("Error: Pinecone API Key or Environment not found in .env file.")
         exit()
 
+    from pinecone import Pinecone, ServerlessSpec
+    from sentence_transformers import SentenceTransformer
+
+    # pinecone.init(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+    embedding_store = EmbeddingStore(EMBEDDING_MODEL_NAME, EMBEDDING_DIM)
+    checkpoints = CheckpointStore()
+
     if PINECONE_INDEX_NAME not in pc.list_indexes().names():
         print(f"Creating Pinecone index '{PINECONE_INDEX_NAME}'...")
         # NEW: Updated index creation with required `spec`
         pc.create_index(
             name=PINECONE_INDEX_NAME, 
-            dimension=384, 
+            dimension=EMBEDDING_DIM, 
             metric='cosine',
             spec=ServerlessSpec(cloud='aws', region='us-east-1') # Free tier is on AWS
         )
@@ -224,11 +264,27 @@ if __name__ == '__main__':
         {"path": "data/posts Data Dump - Reddit.csv", "table": "reddit_posts", "processor": process_posts_chunk, "text_col": "title", "platform": "reddit"}
     ]
 
+    if args.rebuild:
+        checkpoints.clear()
+        SQL_CHECKPOINTS.clear()
+        print("Cleared ingestion checkpoints; every file will be reloaded.")
+
+    if args.encode_workers:
+        encoding_pool = EncodingPool(EMBEDDING_MODEL_NAME, EMBEDDING_DIM, workers=args.encode_workers, batch_size=ENCODE_BATCH_SIZE)
+    else:
+        print("Loading Sentence Transformer model... (This may take a moment)")
+        embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME, device='cpu')
+        print("Model loaded.")
+
     print("\n--- Starting Data Processing and Embedding ---")
-    for f_info in files_to_process:
-        if os.path.exists(f_info["path"]):
-            process_and_load_data(f_info)
-        else:
-            print(f"\nWarning: File not found at '{f_info['path']}'. Skipping.")
-    
+    try:
+        for f_info in files_to_process:
+            if os.path.exists(f_info["path"]):
+                process_and_load_data(f_info, merge=args.merge)
+            else:
+                print(f"\nWarning: File not found at '{f_info['path']}'. Skipping.")
+    finally:
+        if encoding_pool is not None:
+            encoding_pool.close()
+
     print("\n--- All data processing and embedding complete. ---")
\ No newline at end of file
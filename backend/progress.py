@@ -0,0 +1,35 @@
+import os
+import time
+
+# --- Load progress from byte offsets ---
+# The chunk reader reports how far into the file it is, so progress, throughput and
+# ETA come from the byte offset against the file size; no pre-scan of the file is needed.
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+class ByteProgress:
+    def __init__(self, file_path, start_offset=0):
+        self.total_bytes = os.path.getsize(file_path)
+        self.start_offset = start_offset
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def update(self, offset, rows):
+        """Records a finished chunk ending at byte `offset` and returns a status line."""
+        self.rows += rows
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        bytes_done = offset - self.start_offset
+        bytes_per_second = bytes_done / elapsed
+        remaining = max(self.total_bytes - offset, 0)
+        eta = format_duration(remaining / bytes_per_second) if bytes_per_second else '?'
+        percent = offset / self.total_bytes * 100 if self.total_bytes else 100
+        return (
+            f"{percent:5.1f}% | {self.rows:,} rows | {self.rows / elapsed:,.0f} rows/s | "
+            f"{bytes_per_second / 1e6:.1f} MB/s | ETA {eta}"
+        )
@@ -0,0 +1,333 @@
+import asyncio
+import json
+import select
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from bulk_load import is_postgres, quote_ident
+from parsing import parse_timestamps
+from ring_buffer import RingBuffer
+from rollups import SENTIMENT_COLUMNS, SOURCE_TABLES, as_int
+
+# --- Push-based realtime activity ---
+# The loaders run in their own process, so ingestion reaches the API through Postgres
+# LISTEN/NOTIFY: publish_activity (a BulkWriter on_write hook) sends each chunk's
+# per-bucket totals for the recent windows with pg_notify, which Postgres delivers when
+# the chunk's transaction commits. The API keeps those totals in NumPy ring buffers
+# (ActivityStore), applies every notification once and pushes the result to all open
+# dashboards (SSE or WebSocket), so they cost nothing per subscriber. The same buffers
+# answer the recent-trend endpoints without touching the raw tables. Each payload
+# carries the chunk's transaction id, so a chunk that committed before the hydrate
+# query's snapshot, and is therefore already in the hydrated totals, is not added again.
+
+CHANNEL = 'activity_deltas'
+WINDOW_MINUTES = 24 * 60
+HISTORY_DAYS = 32  # hourly buckets kept, enough for a 30-day window plus today
+NOTIFY_MAX_BYTES = 7000  # pg_notify payloads must stay under 8000 bytes
+SUBSCRIBER_QUEUE_SIZE = 100
+TICK_SECONDS = 60
+EPOCH = pd.Timestamp(0, tz='UTC')
+
+# Bucket width (seconds) and number of buckets kept per granularity
+GRANULARITIES = {'minute': (60, WINDOW_MINUTES), 'hour': (3600, HISTORY_DAYS * 24)}
+SERIES = [(source['platform'], source['kind']) for source in SOURCE_TABLES.values()]
+FIELDS = ('items', 'engagement', *SENTIMENT_COLUMNS, 'scored')
+
+
+def bucket_totals(source, rows, width, size, now=None):
+    """
+    [[bucket, items, engagement, positive, negative, neutral, scored]] of `rows` in the
+    newest `size` buckets of `width` seconds; buckets count from the epoch (UTC) and
+    `scored` is the number of rows carrying sentiment scores.
+    """
+    now_bucket = int((time.time() if now is None else now) // width)
+    times = parse_timestamps(rows[source['time']])
+    # Timedelta division works whatever resolution the timestamps were parsed at
+    buckets = (times - EPOCH) // pd.Timedelta(seconds=width)
+    live = buckets.between(now_bucket - size + 1, now_bucket)
+    if not live.any():
+        return []
+    frame = pd.DataFrame({'bucket': buckets[live].astype('int64'), 'items': 1, 'engagement': as_int(rows[source['engagement']])[live]})
+    sentiment = [pd.to_numeric(rows[column], errors='coerce')[live] if column in rows.columns else pd.Series(np.nan, index=frame.index) for column in SENTIMENT_COLUMNS]
+    for column, values in zip(SENTIMENT_COLUMNS, sentiment):
+        frame[column] = values.fillna(0)
+    frame['scored'] = sentiment[0].notna().astype('int64')
+    grouped = frame.groupby('bucket').sum()
+    return [
+        [int(bucket), int(items), int(engagement), round(positive, 4), round(negative, 4), round(neutral, 4), int(scored)]
+        for bucket, items, engagement, positive, negative, neutral, scored in grouped.itertuples()
+    ]
+
+
+def publish_activity(conn, table_name, rows, replaced=None):
+    """BulkWriter on_write hook: notifies API processes of the chunk's recent activity."""
+    source = SOURCE_TABLES.get(table_name)
+    if replaced is not None and not replaced.empty:
+        # Activity counts arrivals; an overwritten row was counted when it first arrived
+        rows = rows[~rows['source_id'].isin(replaced['source_id'])]
+    if source is None or rows.empty or not is_postgres(conn.engine):
+        return
+    xid = int(conn.execute(text("SELECT pg_current_xact_id()::text")).scalar())
+    for granularity, (width, size) in GRANULARITIES.items():
+        for payload in notify_payloads(xid, source, granularity, bucket_totals(source, rows, width, size)):
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {'channel': CHANNEL, 'payload': payload})
+
+
+def notify_payloads(xid, source, granularity, buckets):
+    """JSON messages carrying `buckets`, split so that none exceeds NOTIFY_MAX_BYTES."""
+    header = {'xid': xid, 'platform': source['platform'], 'kind': source['kind'], 'granularity': granularity}
+    empty = len(_payload(header, []))
+    batch, size = [], empty
+    for entry in buckets:
+        entry_size = len(json.dumps(entry, separators=(',', ':'))) + 1  # and its comma
+        if batch and size + entry_size > NOTIFY_MAX_BYTES:
+            yield _payload(header, batch)
+            batch, size = [], empty
+        batch.append(entry)
+        size += entry_size
+    if batch:
+        yield _payload(header, batch)
+
+
+def _payload(header, buckets):
+    return json.dumps({**header, 'buckets': buckets}, separators=(',', ':'))
+
+
+class Snapshot:
+    """A pg_current_snapshot() value ('xmin:xmax:xip,...'): which transactions it sees as committed."""
+
+    def __init__(self, value):
+        xmin, xmax, in_progress = value.split(':')
+        self.xmin, self.xmax = int(xmin), int(xmax)
+        self.in_progress = {int(xid) for xid in in_progress.split(',') if xid}
+
+    def sees(self, xid):
+        if xid < self.xmin:
+            return True
+        return xid < self.xmax and xid not in self.in_progress
+
+
+class ActivityStore:
+    """
+    Recent activity per platform and kind in two rings: per minute over the last
+    WINDOW_MINUTES and per hour over the last HISTORY_DAYS. Window queries slice the
+    rings, so they cost O(buckets) whatever the ingest volume.
+    """
+
+    def __init__(self):
+        self.rings = {
+            granularity: RingBuffer(width, size, SERIES, FIELDS)
+            for granularity, (width, size) in GRANULARITIES.items()
+        }
+
+    def add(self, platform, kind, granularity, buckets, now=None):
+        if not buckets:
+            return
+        ring = self.rings[granularity]
+        values = np.asarray(buckets, dtype=np.float64)
+        ring.add((platform, kind), values[:, 0].astype(np.int64), values[:, 1:], ring.bucket_of(time.time() if now is None else now))
+
+    def roll(self, now=None):
+        """Moves both rings up to the current bucket, clearing the expired ones."""
+        now = time.time() if now is None else now
+        for ring in self.rings.values():
+            ring.advance(ring.bucket_of(now))
+
+    def _recent(self, granularity, count, now=None):
+        """(first bucket, window) of the newest `count` buckets of a ring."""
+        ring = self.rings[granularity]
+        last = ring.bucket_of(time.time() if now is None else now)
+        return last - count + 1, ring.window(last - count + 1, last)
+
+    def hourly(self, kind='post', now=None):
+        """Per-hour items and average engagement over the last day, oldest hour first."""
+        ring = self.rings['minute']
+        first, window = self._recent('minute', WINDOW_MINUTES, now)
+        mask = ring.series_mask(lambda name: name[1] == kind)
+        items = ring.field(window, 'items')[:, mask].sum(axis=1)
+        engagement = ring.field(window, 'engagement')[:, mask].sum(axis=1)
+        hours = (first + np.arange(len(window))) // 60
+        # Minutes are contiguous, so each hour is one run of the window
+        starts = np.flatnonzero(np.r_[True, hours[1:] != hours[:-1]])
+        items, engagement = np.add.reduceat(items, starts), np.add.reduceat(engagement, starts)
+        return [
+            {
+                "hour": time.strftime('%H:00', time.gmtime(int(hour) * 3600)),
+                "activity_count": int(count),
+                "avg_engagement": round(float(total) / count, 2) if count else 0
+            }
+            for hour, count, total in zip(hours[starts], items, engagement)
+            if count
+        ]
+
+    def metrics(self, now=None):
+        """Headline rates over the last day, the last hour and the last ten minutes."""
+        ring = self.rings['minute']
+        _, window = self._recent('minute', WINDOW_MINUTES, now)
+        items, engagement = ring.field(window, 'items'), ring.field(window, 'engagement')
+        posts, comments = ring.series_mask(lambda name: name[1] == 'post'), ring.series_mask(lambda name: name[1] == 'comment')
+        posts_last_hour = int(items[-60:, posts].sum())
+        return {
+            "items_24h": int(items.sum()),
+            "posts_per_hour": int(posts_last_hour),
+            "comments_per_minute": round(float(items[-10:, comments].sum()) / 10, 1),
+            "avg_post_engagement": round(float(engagement[-60:, posts].sum()) / posts_last_hour, 2) if posts_last_hour else 0
+        }
+
+    def daily(self, days=30, now=None):
+        """
+        Per-day items by platform and kind plus total engagement, from `days` days
+        before today (UTC) to today, skipping days without activity.
+        """
+        ring = self.rings['hour']
+        now = time.time() if now is None else now
+        today = int(now // 86400)
+        first, last = (today - days) * 24, ring.bucket_of(now)
+        window = ring.window(first, last)
+        day_of_bucket = (first + np.arange(len(window))) // 24
+        starts = np.flatnonzero(np.r_[True, day_of_bucket[1:] != day_of_bucket[:-1]])
+        items = np.add.reduceat(ring.field(window, 'items'), starts, axis=0)
+        engagement = np.add.reduceat(ring.field(window, 'engagement').sum(axis=1), starts)
+        trends = []
+        for day, counts, total in zip(day_of_bucket[starts], items, engagement):
+            if not counts.any():
+                continue
+            entry = {"date": time.strftime('%Y-%m-%d', time.gmtime(int(day) * 86400))}
+            entry.update({f"{platform}_{kind}s": int(counts[ring.series[(platform, kind)]]) for platform, kind in SERIES})
+            entry["total_engagement"] = int(total)
+            trends.append(entry)
+        return trends
+
+
+class ActivityHub:
+    """Owns the activity store and fans each update out to the subscribed dashboards."""
+
+    def __init__(self):
+        self.store = ActivityStore()
+        self.ready = False  # set once the store has been hydrated
+        self.subscribers = set()
+        self.loop = None
+        self._stop = threading.Event()
+
+    def start(self, engine, loop):
+        """Hydrates the store and starts listening for ingestion notifications."""
+        self.loop = loop
+        threading.Thread(target=self._listen, args=(engine,), daemon=True).start()
+        loop.create_task(self._tick())
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def snapshot(self):
+        return {"type": "snapshot", "activity": self.store.hourly(), "metrics": self.store.metrics()}
+
+    def apply(self, delta):
+        """Applies one notification (on the event loop) and broadcasts live-window changes."""
+        self.store.add(delta['platform'], delta['kind'], delta['granularity'], delta['buckets'])
+        if delta['granularity'] != 'minute':
+            return  # the matching minute notification carries the live part of the chunk
+        self._broadcast({
+            "type": "delta",
+            "platform": delta['platform'],
+            "kind": delta['kind'],
+            "items": sum(bucket[1] for bucket in delta['buckets']),
+            "engagement": sum(bucket[2] for bucket in delta['buckets']),
+            "activity": self.store.hourly(),
+            "metrics": self.store.metrics()
+        })
+
+    def hydrate(self, engine):
+        """
+        Loads the per-minute and per-hour totals of the recent windows from the database.
+        Returns (store, snapshot): every query reads the same snapshot, whose transactions
+        are exactly the chunks counted in the store.
+        """
+        store = ActivityStore()
+        now = time.time()
+        with engine.connect().execution_options(isolation_level='REPEATABLE READ') as conn:
+            # The first statement fixes the transaction's snapshot for the queries below
+            snapshot = Snapshot(conn.execute(text("SELECT pg_current_snapshot()::text")).scalar())
+            # ::timestamptz reads naive times in the session time zone; bucket_totals reads them as UTC
+            conn.execute(text("SET LOCAL TIME ZONE 'UTC'"))
+            for table_name, source in SOURCE_TABLES.items():
+                if not inspect(conn).has_table(table_name):
+                    continue
+                existing = {col['name'] for col in inspect(conn).get_columns(table_name)}
+                if set(SENTIMENT_COLUMNS) <= existing:
+                    sentiment = ', '.join(f"COALESCE(SUM({quote_ident(column)}), 0)" for column in SENTIMENT_COLUMNS)
+                    sentiment += f", COUNT({quote_ident(SENTIMENT_COLUMNS[0])})"
+                else:
+                    sentiment = '0, 0, 0, 0'
+                time_column = f"{quote_ident(source['time'])}::timestamptz"
+                for granularity, (width, size) in GRANULARITIES.items():
+                    first = (int(now // width) - size + 1) * width
+                    rows = conn.execute(text(f"""
+                        SELECT
+                            FLOOR(EXTRACT(EPOCH FROM {time_column}) / {width})::BIGINT AS bucket,
+                            COUNT(*) AS items,
+                            COALESCE(SUM({quote_ident(source['engagement'])}::BIGINT), 0) AS engagement,
+                            {sentiment}
+                        FROM {quote_ident(table_name)}
+                        WHERE {time_column} >= TO_TIMESTAMP(:first)
+                        GROUP BY 1
+                    """), {'first': first}).fetchall()
+                    store.add(source['platform'], source['kind'], granularity, [[float(value) for value in row] for row in rows], now)
+        return store, snapshot
+
+    def _broadcast(self, message):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                pass  # a stalled client catches up with the next message, which carries the full state
+
+    async def _tick(self):
+        # Rolls the window forward for open dashboards even when nothing is ingested
+        while not self._stop.is_set():
+            await asyncio.sleep(TICK_SECONDS)
+            self.store.roll()
+            self._broadcast(self.snapshot())
+
+    def _listen(self, engine):
+        while not self._stop.is_set():
+            try:
+                raw = engine.raw_connection()
+                try:
+                    dbapi_connection = raw.driver_connection
+                    dbapi_connection.autocommit = True
+                    with dbapi_connection.cursor() as cursor:
+                        cursor.execute(f"LISTEN {CHANNEL}")
+                    # LISTEN first so no chunk committed after the hydrate query is missed;
+                    # chunks that committed in between are in both and are skipped below
+                    store, snapshot = self.hydrate(engine)
+                    self.loop.call_soon_threadsafe(self._replace_store, store)
+                    while not self._stop.is_set():
+                        if select.select([dbapi_connection], [], [], 5) == ([], [], []):
+                            continue
+                        dbapi_connection.poll()
+                        while dbapi_connection.notifies:
+                            delta = json.loads(dbapi_connection.notifies.pop(0).payload)
+                            if snapshot.sees(delta['xid']):
+                                continue
+                            self.loop.call_soon_threadsafe(self.apply, delta)
+                finally:
+                    raw.invalidate()
+            except Exception as e:
+                print(f"Realtime listener error, reconnecting: {e}")
+                time.sleep(5)
+
+    def _replace_store(self, store):
+        self.store = store
+        self.ready = True
+        self._broadcast(self.snapshot())
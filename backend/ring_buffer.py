@@ -0,0 +1,71 @@
+import numpy as np
+
+# --- Fixed-width time buckets in a NumPy ring ---
+# A RingBuffer keeps the newest `size` buckets of `width` seconds as one array of
+# shape (size, series, fields); bucket b (seconds since the epoch // width) lives in
+# slot b % size. Moving the head forward zeroes the slots it passes, so the array
+# never grows and a window of n buckets is read with at most two slices.
+
+
+class RingBuffer:
+    """Per-bucket sums for a few series, over the newest `size` buckets."""
+
+    def __init__(self, width, size, series, fields):
+        self.width = width
+        self.size = size
+        self.series = {name: i for i, name in enumerate(series)}
+        self.fields = {name: i for i, name in enumerate(fields)}
+        self.values = np.zeros((size, len(self.series), len(self.fields)))
+        self.head = None  # newest bucket held
+
+    def bucket_of(self, seconds):
+        return int(seconds // self.width)
+
+    def advance(self, bucket):
+        """Moves the head to `bucket`, clearing the slots of the buckets it skips."""
+        if self.head is None:
+            self.head = bucket
+            return
+        if bucket <= self.head:
+            return
+        if bucket - self.head >= self.size:
+            self.values[:] = 0
+        else:
+            slots = np.arange(self.head + 1, bucket + 1) % self.size
+            self.values[slots] = 0
+        self.head = bucket
+
+    def add(self, series, buckets, values, now_bucket):
+        """
+        Adds rows of `values` (one column per field) to their buckets of `series`.
+        Buckets after `now_bucket` or older than the ring are dropped.
+        """
+        buckets = np.asarray(buckets, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(buckets), len(self.fields))
+        self.advance(now_bucket)
+        keep = (buckets <= self.head) & (buckets > self.head - self.size)
+        np.add.at(self.values, (buckets[keep] % self.size, self.series[series]), values[keep])
+
+    def window(self, first, last):
+        """
+        Values of buckets first..last (inclusive) in time order, shape (n, series, fields).
+        Buckets outside the ring read as zeros.
+        """
+        out = np.zeros((last - first + 1, len(self.series), len(self.fields)))
+        if self.head is None:
+            return out
+        lo, hi = max(first, self.head - self.size + 1), min(last, self.head)
+        if lo > hi:
+            return out
+        start, end = lo % self.size, hi % self.size
+        held = self.values[start:end + 1] if start <= end else np.concatenate((self.values[start:], self.values[:end + 1]))
+        out[lo - first:hi - first + 1] = held
+        return out
+
+    def field(self, window, name):
+        """One field of a window: shape (n, series)."""
+        return window[:, :, self.fields[name]]
+
+    def series_mask(self, predicate):
+        """Boolean mask over the series for which predicate(name) holds."""
+        return np.array([predicate(name) for name in self.series])
@@ -0,0 +1,682 @@
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+from bulk_load import copy_dataframe, is_postgres, quote_ident
+from keywords import document_keywords
+from parsing import TOXIC, parse_timestamps, toxicity_codes
+from search_index import searchable_columns
+from trending import TrendingSketchRollup
+
+# --- Ingestion-time rollups ---
+# Small aggregate tables the dashboard reads instead of scanning the raw tables. The
+# loaders pass apply_rollups to BulkWriter, so every chunk adds its increments inside
+# the transaction that writes its rows: INSERT ... ON CONFLICT (keys) DO UPDATE adds
+# to the running sums and widens min/max columns. Every rollup is keyed by platform
+# and kind (the leaderboard through its metric names, user_stats through separate
+# post and comment columns), which is how a table that is reloaded from scratch gets
+# its old rows taken out.
+
+# How each ingested table feeds the rollups
+SOURCE_TABLES = {
+    'reddit_posts': {'platform': 'reddit', 'kind': 'post', 'time': 'timestamp', 'text': 'title', 'engagement': 'engagement'},
+    'youtube_posts': {'platform': 'youtube', 'kind': 'post', 'time': 'timestamp', 'text': 'title', 'engagement': 'engagement'},
+    'reddit_comments': {'platform': 'reddit', 'kind': 'comment', 'time': 'date_of_comment', 'text': 'text', 'engagement': 'likes'},
+    'youtube_comments': {'platform': 'youtube', 'kind': 'comment', 'time': 'date_of_comment', 'text': 'text', 'engagement': 'likes'},
+}
+REPLAY_CHUNK_ROWS = 50000
+
+
+def day_of(values):
+    """ISO day string of each timestamp (NaN when missing or unparseable)."""
+    return parse_timestamps(values).dt.strftime('%Y-%m-%d')
+
+
+def as_int(values):
+    return pd.to_numeric(values, errors='coerce').fillna(0).astype('int64')
+
+
+class Rollup:
+    """
+    An aggregate table maintained from ingested rows.
+
+    `build(source, rows)` turns a chunk of a source table (described by its
+    SOURCE_TABLES entry) into one row per key, or returns None. Columns listed in
+    `sums` are added up, `mins`/`maxs` keep the smallest/largest value seen; any
+    other value column is overwritten by the latest chunk.
+    """
+
+    def __init__(self, table, keys, values, build, sums=(), mins=(), maxs=(), indexes=()):
+        self.table = table
+        self.keys = keys  # {column: SQL type}, the primary key
+        self.values = values  # {column: SQL type}
+        self.build = build
+        self.sums, self.mins, self.maxs = set(sums), set(mins), set(maxs)
+        self.indexes = indexes
+
+    def ensure_table(self, conn):
+        columns = [f"{quote_ident(name)} {sql_type} NOT NULL" for name, sql_type in self.keys.items()]
+        columns += [f"{quote_ident(name)} {sql_type}" for name, sql_type in self.values.items()]
+        columns.append(f"PRIMARY KEY ({', '.join(map(quote_ident, self.keys))})")
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {quote_ident(self.table)} ({', '.join(columns)})"))
+        for index_columns in self.indexes:
+            name = f"ix_{self.table}_{'_'.join(index_columns)}"
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {quote_ident(name)} ON {quote_ident(self.table)} "
+                f"({', '.join(map(quote_ident, index_columns))})"
+            ))
+
+    def apply(self, conn, source, rows):
+        increments = self.build(source, rows)
+        if increments is None or increments.empty:
+            return
+        self.upsert(conn, increments)
+
+    def replace(self, conn, source, rows, replaced):
+        """Merge mode: `rows` overwrote `replaced`, the previous versions of some of them."""
+        retracted = self.retract(conn, source, replaced)
+        self.apply(conn, source, rows)
+        if retracted is not None:
+            self._delete_emptied(conn, retracted)
+
+    def retract(self, conn, source, rows):
+        """Takes back what `rows` added to the sums and returns the keys it touched. Mins
+        and maxs cannot be narrowed again, so they keep the values the old rows set."""
+        if not self.sums:
+            return None
+        decrements = self.build(source, rows)
+        if decrements is None or decrements.empty:
+            return None
+        for name in self.sums:
+            decrements[name] = -decrements[name]
+        for name in self.mins | self.maxs:
+            decrements[name] = None
+        self.upsert(conn, decrements)
+        return decrements[list(self.keys)]
+
+    def reset(self, conn, platform, kind):
+        """Drops everything one source table (a platform and kind) added to the rollup."""
+        conn.execute(text(f"DELETE FROM {quote_ident(self.table)} WHERE platform = :platform AND kind = :kind"),
+                     {'platform': platform, 'kind': kind})
+
+    def _delete_emptied(self, conn, keys):
+        """Drops the rows among `keys` whose counts are back to zero: nothing feeds them anymore."""
+        counts = [name for name in self.sums if self.values[name] == 'BIGINT']
+        conditions = [f"{quote_ident(name)} = :{name}" for name in self.keys]
+        conditions += [f"COALESCE({quote_ident(name)}, 0) = 0" for name in counts]
+        params = keys.astype(object).to_dict('records')
+        conn.execute(text(f"DELETE FROM {quote_ident(self.table)} WHERE {' AND '.join(conditions)}"), params)
+
+    def upsert(self, conn, increments):
+        """Merges one row per key into the table."""
+        self.ensure_table(conn)
+        increments = increments[list(self.keys) + list(self.values)]
+        postgres = is_postgres(conn.engine)
+        cols = ', '.join(map(quote_ident, increments.columns))
+        conflict = f"ON CONFLICT ({', '.join(map(quote_ident, self.keys))}) DO UPDATE SET {self._merge_sql(postgres)}"
+
+        if postgres:
+            staging = quote_ident(f'{self.table}_increments')
+            conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+            conn.execute(text(f"CREATE TEMP TABLE {staging} (LIKE {quote_ident(self.table)})"))
+            copy_dataframe(conn, f'{self.table}_increments', increments)
+            conn.execute(text(f"INSERT INTO {quote_ident(self.table)} ({cols}) SELECT {cols} FROM {staging} {conflict}"))
+            conn.execute(text(f"DROP TABLE {staging}"))
+        else:
+            placeholders = ', '.join('?' for _ in increments.columns)
+            # object dtype boxes numpy scalars into Python values the driver accepts
+            values = increments.astype(object).where(increments.notna(), None)
+            conn.exec_driver_sql(
+                f"INSERT INTO {quote_ident(self.table)} ({cols}) VALUES ({placeholders}) {conflict}",
+                list(values.itertuples(index=False, name=None)),
+            )
+
+    def _merge_sql(self, postgres):
+        updates = []
+        for name in self.values:
+            current, new = f"{quote_ident(self.table)}.{quote_ident(name)}", f"EXCLUDED.{quote_ident(name)}"
+            if name in self.sums:
+                expression = f"COALESCE({current}, 0) + COALESCE({new}, 0)"
+            elif name in self.mins or name in self.maxs:
+                if postgres:
+                    expression = f"{'LEAST' if name in self.mins else 'GREATEST'}({current}, {new})"
+                else:
+                    # SQLite's scalar min()/max() return NULL if either side is NULL
+                    function = 'MIN' if name in self.mins else 'MAX'
+                    expression = f"{function}(COALESCE({current}, {new}), COALESCE({new}, {current}))"
+            else:
+                expression = new
+            updates.append(f"{quote_ident(name)} = {expression}")
+        return ', '.join(updates)
+
+
+# --- Rollup definitions ---
+
+def keyword_increments(source, rows):
+    """Per-day keyword counts: in how many titles/comments a keyword appears, and their engagement."""
+    rows = rows.reset_index(drop=True)
+    keywords = document_keywords(rows[source['text']])
+    if keywords.empty:
+        return None
+    increments = pd.DataFrame({
+        'day': day_of(rows[source['time']]).loc[keywords.index].to_numpy(),
+        'platform': source['platform'],
+        'kind': source['kind'],
+        'keyword': keywords.to_numpy(),
+        'mentions': 1,
+        'engagement': as_int(rows[source['engagement']]).loc[keywords.index].to_numpy(),
+    }).dropna(subset=['day'])
+    return increments.groupby(['day', 'platform', 'kind', 'keyword'], as_index=False, sort=False).sum()
+
+
+KEYWORD_DAILY = Rollup(
+    'keyword_daily',
+    keys={'day': 'DATE', 'platform': 'TEXT', 'kind': 'TEXT', 'keyword': 'TEXT'},
+    values={'mentions': 'BIGINT', 'engagement': 'BIGINT'},
+    build=keyword_increments,
+    sums=['mentions', 'engagement'],
+)
+
+
+def user_increments(source, rows):
+    """Per-user activity: posts and their engagement, comments and their likes, first/last seen."""
+    if 'username' not in rows.columns:
+        return None
+    posts = source['kind'] == 'post'
+    seen = parse_timestamps(rows[source['time']]).dt.strftime('%Y-%m-%d %H:%M:%S')
+    activity = pd.DataFrame({
+        'username': rows['username'],
+        'items': 1,
+        'score': as_int(rows[source['engagement']]),
+        'first_seen': seen,
+        'last_seen': seen,
+    }).dropna(subset=['username'])
+    increments = activity.groupby('username', as_index=False, sort=False).agg(
+        items=('items', 'sum'), score=('score', 'sum'), first_seen=('first_seen', 'min'), last_seen=('last_seen', 'max'),
+    )
+    zero = pd.Series(0, index=increments.index)
+    return pd.DataFrame({
+        'platform': source['platform'],
+        'username': increments['username'],
+        'post_count': increments['items'] if posts else zero,
+        'comment_count': zero if posts else increments['items'],
+        'engagement_sum': increments['score'] if posts else zero,
+        'likes_sum': zero if posts else increments['score'],
+        'first_seen': increments['first_seen'],
+        'last_seen': increments['last_seen'],
+    })
+
+
+class UserStats(Rollup):
+    """user_stats keeps posts and comments in separate columns rather than under a kind key."""
+
+    KIND_COLUMNS = {'post': ('post_count', 'engagement_sum'), 'comment': ('comment_count', 'likes_sum')}
+
+    def reset(self, conn, platform, kind):
+        # First/last-seen dates cannot be split by kind, so like merges they only widen
+        table = quote_ident(self.table)
+        conn.execute(text(
+            f"UPDATE {table} SET {', '.join(f'{quote_ident(name)} = 0' for name in self.KIND_COLUMNS[kind])} "
+            "WHERE platform = :platform"
+        ), {'platform': platform})
+        conn.execute(text(
+            f"DELETE FROM {table} WHERE platform = :platform "
+            "AND COALESCE(post_count, 0) = 0 AND COALESCE(comment_count, 0) = 0"
+        ), {'platform': platform})
+
+
+USER_STATS = UserStats(
+    'user_stats',
+    keys={'platform': 'TEXT', 'username': 'TEXT'},
+    values={
+        'post_count': 'BIGINT', 'comment_count': 'BIGINT', 'engagement_sum': 'BIGINT', 'likes_sum': 'BIGINT',
+        'first_seen': 'TEXT', 'last_seen': 'TEXT',
+    },
+    build=user_increments,
+    sums=['post_count', 'comment_count', 'engagement_sum', 'likes_sum'],
+    mins=['first_seen'],
+    maxs=['last_seen'],
+    indexes=[('platform', column) for column in ('engagement_sum', 'post_count', 'comment_count', 'likes_sum')],
+)
+
+# Rows without a parseable timestamp are kept under this day, outside every date range
+UNDATED_DAY = '0001-01-01'
+
+
+def toxicity_increments(source, rows):
+    """Per-day counts of rows with a toxicity label (`scored`) and of toxic rows."""
+    if 'toxicity_code' in rows.columns:
+        codes = pd.to_numeric(rows['toxicity_code'], errors='coerce')
+    elif 'toxicity' in rows.columns:
+        codes = toxicity_codes(rows['toxicity']).astype('float64')
+    else:
+        return None
+    scored = codes.notna()
+    if not scored.any():
+        return None
+    increments = pd.DataFrame({
+        'day': day_of(rows[source['time']])[scored].fillna(UNDATED_DAY),
+        'platform': source['platform'],
+        'kind': source['kind'],
+        'scored': 1,
+        'toxic': (codes[scored] == TOXIC).astype('int64'),
+    })
+    return increments.groupby(['day', 'platform', 'kind'], as_index=False, sort=False).sum()
+
+
+TOXICITY_DAILY = Rollup(
+    'toxicity_daily',
+    keys={'day': 'DATE', 'platform': 'TEXT', 'kind': 'TEXT'},
+    values={'scored': 'BIGINT', 'toxic': 'BIGINT'},
+    build=toxicity_increments,
+    sums=['scored', 'toxic'],
+)
+
+
+def read_toxicity(conn, start=None, end=None):
+    """
+    {(platform, kind): (scored, toxic)} over the days start..end (inclusive, either
+    end optional). Undated rows only count when no range is given.
+    """
+    filters, params = [], {}
+    if start:
+        filters.append("day >= :start")
+        params['start'] = start
+    if end:
+        filters.append("day <= :end")
+        params['end'] = end
+    if filters:
+        filters.append(f"day > '{UNDATED_DAY}'")
+    where = f"WHERE {' AND '.join(filters)}" if filters else ''
+    rows = conn.execute(text(f"""
+        SELECT platform, kind, SUM(scored), SUM(toxic)
+        FROM {quote_ident(TOXICITY_DAILY.table)}
+        {where}
+        GROUP BY platform, kind
+    """), params).fetchall()
+    return {(platform, kind): (int(scored), int(toxic)) for platform, kind, scored, toxic in rows}
+
+
+SENTIMENT_COLUMNS = ('sentiment_positive', 'sentiment_negative', 'sentiment_neutral')
+UNDATED_HOUR = f'{UNDATED_DAY} 00:00:00'
+
+
+def sentiment_increments(source, rows):
+    """Per-hour sentiment score sums and the number of scored rows they add up."""
+    if not set(SENTIMENT_COLUMNS) <= set(rows.columns):
+        return None
+    scores = rows[list(SENTIMENT_COLUMNS)].apply(pd.to_numeric, errors='coerce')
+    scored = scores['sentiment_positive'].notna()
+    if not scored.any():
+        return None
+    increments = pd.DataFrame({
+        'hour': parse_timestamps(rows[source['time']]).dt.strftime('%Y-%m-%d %H:00:00')[scored].fillna(UNDATED_HOUR),
+        'platform': source['platform'],
+        'kind': source['kind'],
+        'scored': 1,
+        'positive_sum': scores['sentiment_positive'][scored].astype('float64'),
+        'negative_sum': scores['sentiment_negative'][scored].fillna(0).astype('float64'),
+        'neutral_sum': scores['sentiment_neutral'][scored].fillna(0).astype('float64'),
+    })
+    return increments.groupby(['hour', 'platform', 'kind'], as_index=False, sort=False).sum()
+
+
+SENTIMENT_HOURLY = Rollup(
+    'sentiment_hourly',
+    keys={'hour': 'TIMESTAMP', 'platform': 'TEXT', 'kind': 'TEXT'},
+    values={'scored': 'BIGINT', 'positive_sum': 'DOUBLE PRECISION', 'negative_sum': 'DOUBLE PRECISION', 'neutral_sum': 'DOUBLE PRECISION'},
+    build=sentiment_increments,
+    sums=['scored', 'positive_sum', 'negative_sum', 'neutral_sum'],
+)
+
+
+def sentiment_filters(platform=None, kind=None):
+    filters, params = [], {}
+    for column, value in (('platform', platform), ('kind', kind)):
+        if value:
+            filters.append(f"{column} = :{column}")
+            params[column] = value
+    return filters, params
+
+
+def read_sentiment_totals(conn, platform=None):
+    """[(platform, kind, scored, positive_sum, negative_sum, neutral_sum)] over all time."""
+    filters, params = sentiment_filters(platform)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ''
+    return conn.execute(text(f"""
+        SELECT platform, kind, SUM(scored), SUM(positive_sum), SUM(negative_sum), SUM(neutral_sum)
+        FROM {quote_ident(SENTIMENT_HOURLY.table)}
+        {where}
+        GROUP BY platform, kind
+    """), params).fetchall()
+
+
+def read_sentiment_series(conn, days, granularity='day', platform=None, kind='post'):
+    """
+    [(period, scored, positive_sum, negative_sum, neutral_sum)] per `granularity`
+    ('hour', 'day' or 'week') over the `days` days up to the newest hour with data.
+    Postgres only (date_trunc).
+    """
+    filters, params = sentiment_filters(platform, kind)
+    filters.append(f"hour > '{UNDATED_HOUR}'")
+    table = quote_ident(SENTIMENT_HOURLY.table)
+    return conn.execute(text(f"""
+        WITH scoped AS (
+            SELECT * FROM {table} WHERE {' AND '.join(filters)}
+        )
+        SELECT
+            date_trunc(:granularity, hour) AS period,
+            SUM(scored), SUM(positive_sum), SUM(negative_sum), SUM(neutral_sum)
+        FROM scoped
+        WHERE hour >= (SELECT MAX(hour) FROM scoped) - :days * INTERVAL '1 day'
+        GROUP BY 1
+        ORDER BY 1
+    """), {**params, 'granularity': granularity, 'days': days}).fetchall()
+
+
+# --- Leaderboards ---
+# Top rows per platform and metric, all-time and per day. Each chunk upserts its own
+# top candidates and then trims every board it touched back to its size, so a board
+# behaves like a bounded min-heap that only admits rows beating its current floor.
+
+LEADERBOARD_METRICS = {'post': ('engagement', 'views'), 'comment': ('likes',)}
+LEADERBOARD_SIZE = 1000  # all-time boards
+DAILY_LEADERBOARD_SIZE = 100
+ALL_TIME = 'all'
+# Columns copied from the ranked row so a board can be served without a join
+LEADERBOARD_DETAILS = ('views', 'engagement', 'likes', 'ups', 'comments')
+
+
+def leaderboard_entries(source, rows):
+    """Each chunk's best rows per metric, for the all-time board and each day's board."""
+    # A chunk may repeat a source_id (later rows win, as in merge mode); one upsert
+    # statement must not touch the same board entry twice
+    rows = rows.drop_duplicates('source_id', keep='last')
+    days = day_of(rows[source['time']])
+    created = parse_timestamps(rows[source['time']]).dt.strftime('%Y-%m-%d %H:%M:%S')
+    entries = []
+    for metric in LEADERBOARD_METRICS[source['kind']]:
+        if metric not in rows.columns:
+            continue
+        ranked = pd.DataFrame({
+            'platform': source['platform'],
+            'metric': f"{source['kind']}_{metric}",
+            'source_id': rows['source_id'],
+            'score': pd.to_numeric(rows[metric], errors='coerce'),
+            'content': rows[source['text']],
+            'created_at': created,
+            'username': rows['username'] if 'username' in rows.columns else None,
+            'day': days,
+        })
+        for column in LEADERBOARD_DETAILS:
+            ranked[column] = as_int(rows[column]) if column in rows.columns else None
+        ranked['sentiment_positive'] = rows['sentiment_positive'] if 'sentiment_positive' in rows.columns else None
+        ranked = ranked.dropna(subset=['score', 'content', 'source_id'])
+        ranked = ranked.astype({'score': 'int64', 'source_id': 'int64'})
+        ranked = ranked.sort_values(['score', 'source_id'], ascending=False)
+
+        entries.append(ranked.head(LEADERBOARD_SIZE).assign(period=ALL_TIME))
+        daily = ranked.dropna(subset=['day']).groupby('day', sort=False).head(DAILY_LEADERBOARD_SIZE)
+        entries.append(daily.assign(period=daily['day']))
+    if not entries:
+        return None
+    return pd.concat(entries, ignore_index=True).drop(columns='day')
+
+
+class Leaderboard(Rollup):
+    """A Rollup whose rows are the ranked entries themselves, trimmed to size after each chunk."""
+
+    def apply(self, conn, source, rows):
+        entries = self.build(source, rows)
+        if entries is None or entries.empty:
+            return
+        self.upsert(conn, entries)
+        # Only the boards this chunk added to can have grown past their size
+        for metric, periods in entries.groupby('metric')['period'].unique().items():
+            params = {f'p{i}': period for i, period in enumerate(periods)}
+            params.update({
+                'platform': source['platform'], 'metric': metric, 'all_time': ALL_TIME,
+                'size': LEADERBOARD_SIZE, 'daily_size': DAILY_LEADERBOARD_SIZE,
+            })
+            excess = conn.execute(text(f"""
+                SELECT period, source_id FROM (
+                    SELECT period, source_id,
+                           ROW_NUMBER() OVER (PARTITION BY period ORDER BY score DESC, source_id DESC) AS position
+                    FROM {quote_ident(self.table)}
+                    WHERE platform = :platform AND metric = :metric
+                      AND period IN ({', '.join(':p' + str(i) for i in range(len(periods)))})
+                ) ranked
+                WHERE position > CASE WHEN period = :all_time THEN :size ELSE :daily_size END
+            """), params).fetchall()
+            # Deleted by primary key: the planner has no statistics for a board created in
+            # this transaction and would re-rank the board for every row of a joined DELETE
+            self._delete(conn, source['platform'], metric, excess)
+
+    def replace(self, conn, source, rows, replaced):
+        """Overwritten rows leave every board they were on and are ranked again on their new
+        scores. Rows an earlier chunk trimmed off a board cannot be recalled to fill the gap."""
+        source_ids = as_int(replaced['source_id']).unique().tolist()
+        metrics = [f"{source['kind']}_{metric}" for metric in LEADERBOARD_METRICS[source['kind']]]
+        self.ensure_table(conn)
+        for start in range(0, len(source_ids), 500):
+            params = {f's{i}': source_id for i, source_id in enumerate(source_ids[start:start + 500])}
+            params.update({f'm{i}': metric for i, metric in enumerate(metrics)})
+            conn.execute(text(
+                f"DELETE FROM {quote_ident(self.table)} WHERE platform = :platform "
+                f"AND metric IN ({', '.join(':m' + str(i) for i in range(len(metrics)))}) "
+                f"AND source_id IN ({', '.join(':s' + str(i) for i in range(len(params) - len(metrics)))})"
+            ), {**params, 'platform': source['platform']})
+        self.apply(conn, source, rows)
+
+    def reset(self, conn, platform, kind):
+        metrics = [f"{kind}_{metric}" for metric in LEADERBOARD_METRICS[kind]]
+        params = {f'm{i}': metric for i, metric in enumerate(metrics)}
+        conn.execute(text(
+            f"DELETE FROM {quote_ident(self.table)} WHERE platform = :platform "
+            f"AND metric IN ({', '.join(':' + name for name in params)})"
+        ), {**params, 'platform': platform})
+
+    def _delete(self, conn, platform, metric, entries, batch_size=500):
+        by_period = {}
+        for period, source_id in entries:
+            by_period.setdefault(period, []).append(source_id)
+        for period, source_ids in by_period.items():
+            for start in range(0, len(source_ids), batch_size):
+                params = {f's{i}': source_id for i, source_id in enumerate(source_ids[start:start + batch_size])}
+                conn.execute(text(
+                    f"DELETE FROM {quote_ident(self.table)} WHERE platform = :platform AND metric = :metric "
+                    f"AND period = :period AND source_id IN ({', '.join(':' + name for name in params)})"
+                ), {**params, 'platform': platform, 'metric': metric, 'period': period})
+
+
+LEADERBOARD = Leaderboard(
+    'leaderboard',
+    keys={'platform': 'TEXT', 'metric': 'TEXT', 'period': 'TEXT', 'source_id': 'BIGINT'},
+    values={
+        'score': 'BIGINT', 'content': 'TEXT', 'created_at': 'TEXT', 'username': 'TEXT',
+        'views': 'BIGINT', 'engagement': 'BIGINT', 'likes': 'BIGINT', 'ups': 'BIGINT', 'comments': 'BIGINT',
+        'sentiment_positive': 'DOUBLE PRECISION',
+    },
+    build=leaderboard_entries,
+    indexes=[('platform', 'metric', 'period', 'score', 'source_id')],
+)
+
+
+def read_leaderboard(conn, platform, metric, limit, day=None):
+    """The top `limit` entries of one board (all-time, or the given ISO day)."""
+    return conn.execute(text(f"""
+        SELECT source_id, score, content, created_at, username, views, engagement, likes, ups, comments, sentiment_positive
+        FROM {quote_ident(LEADERBOARD.table)}
+        WHERE platform = :platform AND metric = :metric AND period = :period
+        ORDER BY score DESC, source_id DESC
+        LIMIT :limit
+    """), {'platform': platform, 'metric': metric, 'period': day or ALL_TIME, 'limit': limit}).mappings().all()
+
+
+# --- Uniform content sample ---
+# A bottom-k sample per platform and kind: every row gets a pseudo-random priority in
+# (0, 1) from a hash of its source_id and the SAMPLE_SIZE rows with the smallest
+# priorities are kept. That is a uniform sample of the table that replays reproduce
+# exactly, and the largest kept priority also estimates the table's row count
+# (KMV: (k - 1) / priority), so approximate answers never touch the raw tables.
+
+# Rows per platform and kind. At 95%, KMV row counts are within about +/-1% (1.96 / sqrt(k - 2))
+# and a proportion near 0.5 within +/-0.5 points. Changing it needs a rebuild (python rollups.py):
+# a sample trimmed at a smaller size would be read as the whole table
+SAMPLE_SIZE = 40000
+
+
+def sample_priorities(source, source_ids):
+    """
+    Priority in (0, 1) of each source_id, from its 64-bit hash. The hash is keyed by
+    platform and kind so tables sharing ids are still sampled independently.
+    """
+    salt = pd.util.hash_array(np.array([f"{source['platform']}:{source['kind']}"], dtype=object))[0]
+    hashes = pd.util.hash_array(as_int(source_ids).to_numpy().astype(np.uint64) ^ salt)
+    return ((hashes >> np.uint64(11)).astype('float64') + 0.5) * 2.0 ** -53
+
+
+def whole_numbers(values):
+    """Nullable integers for BIGINT columns (missing values stay missing)."""
+    return pd.to_numeric(values, errors='coerce').round().astype('Int64')
+
+
+def sample_entries(source, rows):
+    """Chunk rows with their sample priority and the columns approximate answers aggregate."""
+    if 'source_id' not in rows.columns:
+        return None
+    if 'toxicity_code' in rows.columns:
+        codes = pd.to_numeric(rows['toxicity_code'], errors='coerce')
+    elif 'toxicity' in rows.columns:
+        codes = toxicity_codes(rows['toxicity'])
+    else:
+        codes = None
+    entries = pd.DataFrame({
+        'platform': source['platform'],
+        'kind': source['kind'],
+        'source_id': as_int(rows['source_id']),
+        'priority': sample_priorities(source, rows['source_id']),
+        'created_at': parse_timestamps(rows[source['time']]).dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'views': whole_numbers(rows['views']) if 'views' in rows.columns else None,
+        'engagement': whole_numbers(rows[source['engagement']]),
+        'toxicity_code': codes.astype('Int16') if codes is not None else None,
+    })
+    for column in SENTIMENT_COLUMNS:
+        entries[column] = pd.to_numeric(rows[column], errors='coerce') if column in rows.columns else None
+    return entries.drop_duplicates('source_id', keep='last').nsmallest(SAMPLE_SIZE, 'priority')
+
+
+class ContentSample(Rollup):
+    """A Rollup holding the sampled rows themselves, trimmed back to SAMPLE_SIZE after each chunk."""
+
+    def apply(self, conn, source, rows):
+        entries = self.build(source, rows)
+        if entries is None or entries.empty:
+            return
+        self.ensure_table(conn)
+        stratum = {'platform': source['platform'], 'kind': source['kind']}
+        threshold = self._priority_at(conn, stratum, SAMPLE_SIZE - 1)
+        if threshold is not None:
+            entries = entries[entries['priority'] <= threshold]
+            if entries.empty:
+                return
+        self.upsert(conn, entries)
+        cutoff = self._priority_at(conn, stratum, SAMPLE_SIZE)
+        if cutoff is not None:
+            conn.execute(text(
+                f"DELETE FROM {quote_ident(self.table)} "
+                "WHERE platform = :platform AND kind = :kind AND priority >= :cutoff"
+            ), {**stratum, 'cutoff': cutoff})
+
+    def _priority_at(self, conn, stratum, position):
+        """Priority of the kept row at `position` (0-based, smallest first), or None."""
+        return conn.execute(text(
+            f"SELECT priority FROM {quote_ident(self.table)} WHERE platform = :platform AND kind = :kind "
+            "ORDER BY priority LIMIT 1 OFFSET :position"
+        ), {**stratum, 'position': position}).scalar()
+
+
+CONTENT_SAMPLE = ContentSample(
+    'content_sample',
+    keys={'platform': 'TEXT', 'kind': 'TEXT', 'source_id': 'BIGINT'},
+    values={
+        'priority': 'DOUBLE PRECISION', 'created_at': 'TEXT', 'views': 'BIGINT', 'engagement': 'BIGINT',
+        'toxicity_code': 'SMALLINT', 'sentiment_positive': 'DOUBLE PRECISION',
+        'sentiment_negative': 'DOUBLE PRECISION', 'sentiment_neutral': 'DOUBLE PRECISION',
+    },
+    build=sample_entries,
+    indexes=[('platform', 'kind', 'priority')],
+)
+
+
+# The trending sketch is not a sum, but is fed and reset the same way
+ROLLUPS = [KEYWORD_DAILY, TrendingSketchRollup(), LEADERBOARD, USER_STATS, TOXICITY_DAILY, SENTIMENT_HOURLY, CONTENT_SAMPLE]
+
+
+# --- Hooks for the loaders ---
+
+def apply_rollups(conn, table_name, rows, replaced=None):
+    """BulkWriter on_write hook: adds a freshly written chunk to every rollup, in merge
+    mode in place of the `replaced` versions of its rows."""
+    source = SOURCE_TABLES.get(table_name)
+    if source is None or rows.empty:
+        return
+    for rollup in ROLLUPS:
+        if replaced is None or replaced.empty:
+            rollup.apply(conn, source, rows)
+        else:
+            rollup.replace(conn, source, rows, replaced)
+
+
+def replay_table(conn, table_name, chunk_rows=REPLAY_CHUNK_ROWS):
+    """Feeds every row already in `table_name` through the rollups, on the same connection."""
+    if not inspect(conn).has_table(table_name):
+        return 0
+    rows = 0
+    columns = ', '.join(map(quote_ident, searchable_columns(conn, table_name)))
+    result = conn.execute(text(f"SELECT {columns} FROM {quote_ident(table_name)}").execution_options(stream_results=True))
+    columns = list(result.keys())
+    for partition in result.partitions(chunk_rows):
+        apply_rollups(conn, table_name, pd.DataFrame(partition, columns=columns))
+        rows += len(partition)
+    return rows
+
+
+def reset_source(engine, table_name):
+    """
+    Called before `table_name` is reloaded from scratch: takes what it added out of
+    every rollup, so the rollups end up counting the reloaded table exactly once.
+    The other tables' contributions stay as they are.
+    """
+    source = SOURCE_TABLES.get(table_name)
+    if source is None:
+        return
+    with engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        for rollup in ROLLUPS:
+            if rollup.table in existing:
+                rollup.reset(conn, source['platform'], source['kind'])
+
+
+def rebuild_rollups(engine, chunk_rows=REPLAY_CHUNK_ROWS):
+    """Recomputes every rollup from the ingested tables."""
+    with engine.begin() as conn:
+        for rollup in ROLLUPS:
+            conn.execute(text(f"DROP TABLE IF EXISTS {quote_ident(rollup.table)}"))
+        for table_name in SOURCE_TABLES:
+            start = time.perf_counter()
+            rows = replay_table(conn, table_name, chunk_rows)
+            print(f"  - {table_name}: {rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recompute the rollup tables from the ingested tables.")
+    parser.add_argument('--database', default=os.getenv('INGEST_DATABASE_URL', 'sqlite:///insights.db'))
+    args = parser.parse_args()
+
+    print("Rebuilding rollups...")
+    rebuild_rollups(create_engine(args.database))
+    print("Rollups rebuilt.")
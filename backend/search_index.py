@@ -0,0 +1,172 @@
+import argparse
+import os
+import re
+import time
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, inspect, text
+
+from bulk_load import is_postgres, quote_ident
+
+load_dotenv()
+
+# --- Full-text search index ---
+# Each searchable table gets a stored generated tsvector column over its text fields
+# (weighted so title matches rank above body matches) and a GIN index on it. Postgres
+# keeps the column current on every insert and update, so the loaders only need to
+# add it back after a table is recreated, or rebuild it once a table gains one of its
+# searchable columns (its comment records which ones it covers). Postgres only: SQLite
+# and the DuckDB snapshot have no tsvector type.
+
+SEARCH_COLUMN = 'search_vector'
+SEARCH_CONFIG = 'english'
+# Searchable text columns and their weight; columns a table does not have are skipped.
+# Usernames get the lowest weight: they find a user's rows without outranking text matches.
+SEARCH_TABLES = {
+    'reddit_posts': {'title': 'A', 'body': 'B', 'username': 'D'},
+    'youtube_posts': {'title': 'A', 'description': 'B', 'username': 'D'},
+    'reddit_comments': {'text': 'A', 'username': 'D'},
+    'youtube_comments': {'text': 'A', 'username': 'D'},
+}
+# How search results are read back from each table
+RESULT_COLUMNS = {
+    'reddit_posts': {'platform': 'reddit', 'kind': 'post', 'content': 'title', 'time': 'timestamp', 'engagement': 'engagement'},
+    'youtube_posts': {'platform': 'youtube', 'kind': 'post', 'content': 'title', 'time': 'timestamp', 'engagement': 'engagement'},
+    'reddit_comments': {'platform': 'reddit', 'kind': 'comment', 'content': 'text', 'time': 'date_of_comment', 'engagement': 'likes'},
+    'youtube_comments': {'platform': 'youtube', 'kind': 'comment', 'content': 'text', 'time': 'date_of_comment', 'engagement': 'likes'},
+}
+
+
+def vector_expression(columns):
+    """tsvector expression over the weighted text columns."""
+    parts = [
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', COALESCE({quote_ident(column)}::text, '')), '{weight}')"
+        for column, weight in columns.items()
+    ]
+    return ' || '.join(parts)
+
+
+def ensure_search_index(engine, table_name):
+    """
+    Adds the generated search column and its GIN index to `table_name` if missing,
+    or rebuilds them when the table's searchable columns differ from those indexed.
+    """
+    weights = SEARCH_TABLES.get(table_name)
+    if weights is None or not is_postgres(engine):
+        return False
+    with engine.begin() as conn:
+        existing = {col['name']: col for col in inspect(conn).get_columns(table_name)}
+        columns = {column: weight for column, weight in weights.items() if column in existing}
+        if not columns:
+            return False
+        indexed = ', '.join(f'{column}:{weight}' for column, weight in columns.items())
+        if SEARCH_COLUMN in existing:
+            if existing[SEARCH_COLUMN].get('comment') == indexed:
+                return False
+            # Dropping the column also drops its index
+            conn.execute(text(f"ALTER TABLE {quote_ident(table_name)} DROP COLUMN {quote_ident(SEARCH_COLUMN)}"))
+        start = time.perf_counter()
+        conn.execute(text(
+            f"ALTER TABLE {quote_ident(table_name)} ADD COLUMN {quote_ident(SEARCH_COLUMN)} tsvector "
+            f"GENERATED ALWAYS AS ({vector_expression(columns)}) STORED"
+        ))
+        conn.execute(text(
+            f"COMMENT ON COLUMN {quote_ident(table_name)}.{quote_ident(SEARCH_COLUMN)} IS '{indexed}'"
+        ))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {quote_ident(f'ix_{table_name}_{SEARCH_COLUMN}')} "
+            f"ON {quote_ident(table_name)} USING GIN ({quote_ident(SEARCH_COLUMN)})"
+        ))
+        conn.execute(text(f"ANALYZE {quote_ident(table_name)}"))
+    print(f"  - Search index on {table_name} ({', '.join(columns)}) built in {time.perf_counter() - start:.1f}s")
+    return True
+
+
+def searchable_columns(conn, table_name):
+    """Columns of `table_name` without the search vector, for queries that read whole rows."""
+    return [col['name'] for col in inspect(conn).get_columns(table_name) if col['name'] != SEARCH_COLUMN]
+
+
+# --- Ranked search ---
+
+# A word with the characters Postgres keeps inside one token (john.doe, u/spez,
+# john@example.com); a leading @ or # is dropped, as to_tsvector drops it
+QUERY_TERM = re.compile(r"\w(?:[\w.@/-]*\w)?")
+RRF_K = 60
+
+
+def any_word_query(question):
+    """search_documents query matching rows that contain any word of a free-form question."""
+    return " or ".join(QUERY_TERM.findall(question))
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """
+    Merges ranked candidate lists: each list adds 1 / (k + rank) to a document's score,
+    so agreement between lists counts for more than a high rank in just one.
+    """
+    fused = {}
+    for leg, candidates in rankings.items():
+        for rank, candidate in enumerate(candidates, start=1):
+            key = (candidate["table_name"], candidate["row_id"])
+            hit = fused.setdefault(key, {**candidate, "relevance_score": 0.0, "matched_by": []})
+            hit["relevance_score"] += 1.0 / (k + rank)
+            hit["matched_by"].append(leg)
+            if not hit.get("text"):
+                hit["text"] = candidate.get("text")
+    return sorted(fused.values(), key=lambda hit: hit["relevance_score"], reverse=True)
+
+
+def search_documents(conn, query, tables=RESULT_COLUMNS, limit=20, offset=0):
+    """
+    Rows of `tables` matching the web-search style `query` ("quoted phrases", OR,
+    -excluded), best ranked first. Each table contributes at most offset + limit + 1
+    rows, so only the top of every table is sorted; the extra row tells the caller
+    whether there is a next page.
+    """
+    branches = []
+    for table_name, source in tables.items():
+        branches.append(f"""
+            (SELECT
+                '{source['platform']}' AS platform,
+                '{source['kind']}' AS kind,
+                source_id,
+                {quote_ident(source['content'])}::text AS content,
+                {quote_ident(source['time'])}::text AS created_at,
+                {quote_ident(source['engagement'])} AS engagement,
+                ts_rank_cd({quote_ident(SEARCH_COLUMN)}, q.query) AS rank
+            FROM {quote_ident(table_name)}, q
+            WHERE {quote_ident(SEARCH_COLUMN)} @@ q.query
+            ORDER BY rank DESC
+            LIMIT :window)""")
+
+    rows = conn.execute(text(f"""
+        WITH q AS (
+            SELECT websearch_to_tsquery('{SEARCH_CONFIG}', :query) AS query
+        ),
+        hits AS ({' UNION ALL '.join(branches)})
+        SELECT
+            hits.*,
+            ts_headline('{SEARCH_CONFIG}', COALESCE(content, ''), q.query, 'MaxFragments=2, MaxWords=25, MinWords=8') AS snippet
+        FROM (
+            SELECT * FROM hits
+            ORDER BY rank DESC, platform, kind, source_id
+            LIMIT :limit OFFSET :offset
+        ) hits, q
+        ORDER BY rank DESC, platform, kind, source_id
+    """), {'query': query, 'window': offset + limit + 1, 'limit': limit + 1, 'offset': offset})
+    return rows.mappings().all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Add the full-text search columns and GIN indexes.")
+    parser.add_argument('--database', default=os.getenv('DATABASE_URL') or os.getenv('INGEST_DATABASE_URL'))
+    args = parser.parse_args()
+
+    engine = create_engine(args.database)
+    if not is_postgres(engine):
+        raise SystemExit("Full-text search indexes need a Postgres DATABASE_URL.")
+    print("Building search indexes...")
+    for table_name in SEARCH_TABLES:
+        if inspect(engine).has_table(table_name) and not ensure_search_index(engine, table_name):
+            print(f"  - {table_name}: already indexed")
+    print("Search indexes ready.")
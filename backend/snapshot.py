@@ -0,0 +1,162 @@
+import argparse
+import os
+import shutil
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy import types as sqltypes
+
+from bulk_load import quote_ident
+from parsing import parse_timestamps
+from search_index import SEARCH_COLUMN
+
+load_dotenv()
+
+# --- Columnar analytics snapshot ---
+# The dashboard endpoints only read, and mostly aggregate a few columns over whole
+# tables. This exports the four tables to Parquet, partitioned by platform (one
+# dataset per table) and by month, and serves them through an embedded DuckDB engine
+# whose views have the same names and columns as the SQL tables. The same queries
+# then run locally as vectorized scans that only read the columns they touch.
+
+SNAPSHOT_DIR = 'snapshot'
+CHUNK_ROWS = 200000
+# Column each table is partitioned by month on
+SNAPSHOT_TABLES = {
+    'reddit_posts': 'timestamp',
+    'youtube_posts': 'timestamp',
+    'reddit_comments': 'date_of_comment',
+    'youtube_comments': 'date_of_comment',
+}
+UNKNOWN_MONTH = 'unknown'
+
+
+def arrow_schema(engine, table):
+    """Arrow schema matching the SQL column types of `table`."""
+    fields = []
+    for col in inspect(engine).get_columns(table):
+        if col['name'] == SEARCH_COLUMN:
+            continue  # Postgres-only full-text column
+        col_type = col['type']
+        if isinstance(col_type, sqltypes.Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(col_type, sqltypes.Integer):
+            arrow_type = pa.int64()
+        elif isinstance(col_type, (sqltypes.Float, sqltypes.Numeric)):
+            arrow_type = pa.float64()
+        elif isinstance(col_type, sqltypes.DateTime):
+            arrow_type = pa.timestamp('us', tz='UTC' if col_type.timezone else None)
+        elif isinstance(col_type, sqltypes.Date):
+            arrow_type = pa.date32()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(col['name'], arrow_type))
+    return pa.schema(fields)
+
+
+def _conform(df, schema):
+    """Coerces a chunk read through pandas to the table's Arrow schema."""
+    for field in schema:
+        col = df[field.name]
+        if pa.types.is_integer(field.type):
+            df[field.name] = pd.to_numeric(col, errors='coerce').astype('Int64')
+        elif pa.types.is_floating(field.type):
+            df[field.name] = pd.to_numeric(col, errors='coerce').astype('float64')
+        elif pa.types.is_boolean(field.type):
+            df[field.name] = col.astype('boolean')
+        elif pa.types.is_timestamp(field.type):
+            df[field.name] = pd.to_datetime(col, errors='coerce', utc=field.type.tz is not None, format='ISO8601')
+        elif pa.types.is_date(field.type):
+            df[field.name] = pd.to_datetime(col, errors='coerce', format='ISO8601').dt.date
+        else:
+            df[field.name] = col.astype('string')
+    return df
+
+
+def export_table(engine, table, time_column, out_dir, chunk_rows=CHUNK_ROWS):
+    """Writes one table as {out_dir}/{table}/month=YYYY-MM/part-NNNNN.parquet files."""
+    schema = arrow_schema(engine, table)
+    table_dir = os.path.join(out_dir, table)
+    rows = 0
+    with engine.connect() as conn:
+        chunks = pd.read_sql_query(
+            text(f"SELECT {', '.join(map(quote_ident, schema.names))} FROM {quote_ident(table)}"),
+            conn.execution_options(stream_results=True),
+            chunksize=chunk_rows,
+        )
+        for part, chunk in enumerate(chunks):
+            chunk = _conform(chunk, schema)
+            months = parse_timestamps(chunk[time_column]).dt.strftime('%Y-%m')
+            for month, group in chunk.groupby(months.fillna(UNKNOWN_MONTH), sort=False):
+                month_dir = os.path.join(table_dir, f'month={month}')
+                os.makedirs(month_dir, exist_ok=True)
+                arrow_table = pa.Table.from_pandas(group, schema=schema, preserve_index=False)
+                pq.write_table(arrow_table, os.path.join(month_dir, f'part-{part:05d}.parquet'), compression='zstd')
+            rows += len(chunk)
+
+    if rows == 0:
+        # An empty file keeps the view (and its columns) valid for an empty table
+        month_dir = os.path.join(table_dir, f'month={UNKNOWN_MONTH}')
+        os.makedirs(month_dir, exist_ok=True)
+        pq.write_table(schema.empty_table(), os.path.join(month_dir, 'part-00000.parquet'))
+    return rows
+
+
+def write_snapshot(engine, out_dir=SNAPSHOT_DIR, tables=SNAPSHOT_TABLES, chunk_rows=CHUNK_ROWS):
+    """Exports every table into a fresh directory and swaps it in place of the old snapshot."""
+    staging_dir = out_dir + '.tmp'
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    for table, time_column in tables.items():
+        start = time.perf_counter()
+        rows = export_table(engine, table, time_column, staging_dir, chunk_rows)
+        print(f"  - {table}: {rows:,} rows in {time.perf_counter() - start:.1f}s")
+
+    old_dir = out_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(staging_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# --- Embedded query engine over the snapshot ---
+
+def create_snapshot_engine(snapshot_dir=SNAPSHOT_DIR, tables=SNAPSHOT_TABLES):
+    """
+    SQLAlchemy engine on an in-memory DuckDB database in which every snapshot table
+    is a view over its Parquet files, so existing queries run unchanged.
+    """
+    snapshot_dir = os.path.abspath(snapshot_dir)
+    missing = [table for table in tables if not os.path.isdir(os.path.join(snapshot_dir, table))]
+    if missing:
+        raise FileNotFoundError(f"Snapshot in '{snapshot_dir}' is missing {missing}; run snapshot.py first.")
+
+    engine = create_engine('duckdb:///:memory:')
+
+    @event.listens_for(engine, 'connect')
+    def create_views(dbapi_connection, connection_record):
+        for table in tables:
+            files = os.path.join(snapshot_dir, table, '*', '*.parquet').replace("'", "''")
+            dbapi_connection.execute(
+                f"CREATE OR REPLACE VIEW {quote_ident(table)} AS SELECT * EXCLUDE (month) FROM read_parquet("
+                f"'{files}', hive_partitioning = true, hive_types = {{'month': VARCHAR}}, union_by_name = true)"
+            )
+
+    return engine
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the analytics tables to a partitioned Parquet snapshot.")
+    parser.add_argument('--source', default=os.getenv('DATABASE_URL') or 'sqlite:///insights.db',
+                        help="Database to export (default: DATABASE_URL, else the local insights.db).")
+    parser.add_argument('--out', default=SNAPSHOT_DIR)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    print(f"Writing snapshot to '{args.out}'...")
+    write_snapshot(create_engine(args.source), args.out, chunk_rows=args.chunk_rows)
+    print("Snapshot complete!")
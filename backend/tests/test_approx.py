@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+import approx
+import rollups
+from approx import Estimate, combined_count, combined_mean, populations, subpopulation
+from rollups import CONTENT_SAMPLE, SOURCE_TABLES, sample_priorities
+
+POSTS = SOURCE_TABLES['reddit_posts']
+COMMENTS = SOURCE_TABLES['reddit_comments']
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'insights.db'}")
+
+
+@pytest.fixture
+def small_sample(monkeypatch):
+    monkeypatch.setattr(rollups, 'SAMPLE_SIZE', 500)
+    monkeypatch.setattr(approx, 'SAMPLE_SIZE', 500)
+    return 500
+
+
+def posts(ids):
+    return pd.DataFrame({'source_id': ids, 'timestamp': '2026-10-01 12:00:00', 'engagement': 1})
+
+
+def test_estimate_arithmetic():
+    total = Estimate(100.0, 3.0) + Estimate(50.0, 4.0)
+    assert total.value == 150.0
+    assert total.stderr == 5.0
+    assert total.interval() == [140.2, 159.8]
+    assert Estimate(0.1234).rounded(scale=100) == 12.34
+
+
+def test_priorities_are_stable_uniform_and_keyed_by_stratum():
+    ids = pd.Series(range(100000))
+    priorities = sample_priorities(POSTS, ids)
+    assert np.array_equal(priorities, sample_priorities(POSTS, ids))
+    assert 0 < priorities.min() and priorities.max() < 1
+    assert abs(priorities.mean() - 0.5) < 0.01
+    # Posts and comments with the same ids are sampled independently
+    assert np.corrcoef(priorities, sample_priorities(COMMENTS, ids))[0, 1] < 0.02
+
+
+def test_sample_keeps_the_smallest_priorities_across_chunks(engine, small_sample):
+    ids = np.random.default_rng(3).permutation(5000)
+    with engine.begin() as conn:
+        for start in range(0, len(ids), 700):
+            CONTENT_SAMPLE.apply(conn, POSTS, posts(ids[start:start + 700]))
+    kept = pd.read_sql('SELECT source_id FROM content_sample', engine)['source_id']
+    expected = pd.Series(sample_priorities(POSTS, pd.Series(ids)), index=ids).nsmallest(small_sample).index
+    assert sorted(kept) == sorted(expected)
+
+
+def test_populations_exact_until_full_then_kmv(engine, small_sample):
+    with engine.begin() as conn:
+        CONTENT_SAMPLE.apply(conn, POSTS, posts(range(300)))
+        CONTENT_SAMPLE.apply(conn, COMMENTS, posts(range(20000)).rename(columns={'timestamp': 'date_of_comment', 'engagement': 'likes'}))
+        strata = populations(conn)
+
+    sampled, size = strata[('reddit', 'post')]
+    assert (sampled, size.value, size.stderr) == (300, 300.0, 0.0)
+
+    sampled, size = strata[('reddit', 'comment')]
+    assert sampled == small_sample
+    assert size.stderr == pytest.approx(size.value / math.sqrt(small_sample - 2))
+    assert abs(size.value - 20000) < 3 * size.stderr
+
+
+def test_subpopulation_of_a_complete_stratum_is_exact():
+    strata = {('reddit', 'post'): (200, Estimate(200.0))}
+    matched = subpopulation(strata, {'platform': 'reddit', 'kind': 'post', 'matched': 50})
+    assert (matched.value, matched.stderr) == (50.0, 0.0)
+
+
+def test_subpopulation_of_a_sampled_stratum_carries_both_errors():
+    strata = {('reddit', 'post'): (1000, Estimate(100000.0, 3000.0))}
+    matched = subpopulation(strata, {'platform': 'reddit', 'kind': 'post', 'matched': 250})
+    assert matched.value == 25000.0
+    share_error = 100000 * math.sqrt(0.25 * 0.75 / 1000 * (1 - 1000 / 100000))
+    assert matched.stderr == pytest.approx(math.hypot(share_error, 0.25 * 3000))
+
+
+def test_strata_are_combined_by_estimated_size():
+    strata = {
+        ('reddit', 'post'): (100, Estimate(100.0)),
+        ('youtube', 'post'): (100, Estimate(300.0, 10.0)),
+    }
+    rows = [
+        {'platform': 'reddit', 'kind': 'post', 'matched': 100, 'score_n': 100, 'score_mean': 1.0, 'score_var': 0.0},
+        {'platform': 'youtube', 'kind': 'post', 'matched': 100, 'score_n': 100, 'score_mean': 5.0, 'score_var': 4.0},
+    ]
+    assert combined_mean(strata, rows, 'score').value == pytest.approx(4.0)
+    assert combined_count(strata, rows).value == pytest.approx(400.0)
+    assert combined_mean(strata, [], 'score').value == 0.0
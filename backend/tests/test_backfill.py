@@ -0,0 +1,64 @@
+import json
+import sqlite3
+from functools import partial
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from backfill import backfill_columns, raw_text_values
+
+pytestmark = pytest.mark.skipif(
+    sqlite3.sqlite_version_info < (3, 33), reason='UPDATE ... FROM needs SQLite 3.33+'
+)
+
+BODY = {'body': partial(raw_text_values, key='body')}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'insights.db'}")
+    pd.DataFrame({'source_id': [1, 2, 3], 'title': 'x', 'body': ['kept', None, '']}).to_sql('reddit_posts', engine, index=False)
+    return engine
+
+
+@pytest.fixture
+def dump(tmp_path):
+    rows = [
+        (1, {'body': 'one'}),
+        (2, {'body': 'two'}),
+        (None, {'body': 'no id'}),  # makes the id column float64 in its chunk
+        (3, {'body': 'three'}),
+        (2, {'body': 'two, edited'}),  # repeated id in a later chunk: the last value wins
+        (3, {'title': 'no body'}),  # rows without the field do not blank the value
+    ]
+    path = tmp_path / 'reddit_posts.csv'
+    pd.DataFrame({
+        'id': pd.array([source_id for source_id, _ in rows], dtype='Int64'),
+        'raw_text': [json.dumps(raw) for _, raw in rows],
+    }).to_csv(path, index=False)
+    return path
+
+
+def bodies(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text('SELECT source_id, body FROM reddit_posts')).fetchall())
+
+
+def test_only_empty_fills_null_and_blank_values(engine, dump):
+    updated = backfill_columns(engine, dump, 'reddit_posts', BODY, chunk_size=2)
+    assert updated == {'body': 2}
+    assert bodies(engine) == {1: 'kept', 2: 'two, edited', 3: 'three'}
+
+
+def test_overwrite_replaces_existing_values(engine, dump):
+    updated = backfill_columns(engine, dump, 'reddit_posts', BODY, only_empty=False, chunk_size=2)
+    assert updated == {'body': 3}
+    assert bodies(engine) == {1: 'one', 2: 'two, edited', 3: 'three'}
+
+
+def test_adds_missing_columns(engine, dump):
+    backfill_columns(engine, dump, 'reddit_posts', {'raw_title': partial(raw_text_values, key='title')})
+    with engine.connect() as conn:
+        titles = dict(conn.execute(text('SELECT source_id, raw_title FROM reddit_posts')).fetchall())
+    assert titles == {1: None, 2: None, 3: 'no body'}
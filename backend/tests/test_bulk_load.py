@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, inspect
+
+from bulk_load import BulkWriter, column_type, count_rows
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'insights.db'}")
+    pd.DataFrame({'source_id': [1, 2], 'toxicity': ['toxic', None]}).to_sql('reddit_posts', engine, index=False)
+    return engine
+
+
+def chunk(ids):
+    return pd.DataFrame({
+        'source_id': ids,
+        'toxicity': 'non_toxic',
+        'toxicity_code': pd.array([0] * len(ids), dtype='Int16'),
+    })
+
+
+@pytest.mark.parametrize('mode', [{'if_exists': 'append'}, {'upsert_key': 'source_id'}])
+def test_appending_adds_columns_the_table_lacks(engine, mode):
+    writer = BulkWriter(engine, 'reddit_posts', **mode)
+    writer.write(chunk([2, 3]))
+    writer.finish()
+    columns = {col['name'] for col in inspect(engine).get_columns('reddit_posts')}
+    assert 'toxicity_code' in columns
+    codes = pd.read_sql('SELECT source_id, toxicity_code FROM reddit_posts', engine).groupby('source_id')['toxicity_code'].last()
+    assert pd.isna(codes[1])
+    assert codes[3] == 0
+    assert count_rows(engine, 'reddit_posts') == (4 if 'if_exists' in mode else 3)
+
+
+def test_column_types_follow_to_sql():
+    assert column_type(pd.Series([1], dtype='Int16').dtype) == 'SMALLINT'
+    assert column_type(pd.Series([1]).dtype) == 'BIGINT'
+    assert column_type(pd.Series([1.5]).dtype) == 'DOUBLE PRECISION'
+    assert column_type(pd.Series([True]).dtype) == 'BOOLEAN'
+    assert column_type(pd.Series(pd.to_datetime(['2026-01-01'])).dtype) == 'TIMESTAMP'
+    assert column_type(pd.Series(['x']).dtype) == 'TEXT'
@@ -0,0 +1,104 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from bulk_load import BulkWriter, count_rows
+from checkpoints import CheckpointStore, TableCheckpointStore
+from csv_chunks import iter_csv_chunks
+
+
+class Crash(Exception):
+    pass
+
+
+def crash(*_):
+    raise Crash()
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / 'dump.csv'
+    path.write_text('source_id,text\n' + ''.join(f'{i},row {i}\n' for i in range(10)), encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'insights.db'}")
+
+
+def load(engine, store, dump, crash_at=None):
+    """The loaders' resume loop: returns how many chunks were written."""
+    checkpoint = store.get(dump, 'sql')
+    writer = BulkWriter(engine, 'items', if_exists='append' if checkpoint else 'replace')
+    start = checkpoint['chunk'] if checkpoint else 0
+    written = 0
+    chunks = iter_csv_chunks(dump, 4, start_offset=checkpoint['offset'] if checkpoint else 0)
+    for i, (chunk, end_offset) in enumerate(chunks, start=start + 1):
+        hooks = [lambda conn, *_: store.update(conn, dump, 'sql', end_offset, i, len(chunk), 4)]
+        if i == crash_at:
+            # Dies after the rows and the checkpoint were written, before the commit
+            hooks.append(crash)
+        writer.write(chunk, on_write=hooks)
+        written += 1
+    return written
+
+
+def test_file_store_round_trip(tmp_path, dump):
+    store = CheckpointStore(str(tmp_path / 'checkpoints.json'))
+    store.update(dump, 'sql', 30, 1, 4, 4)
+    store.update(dump, 'sql', 60, 2, 4, 4)
+    reloaded = CheckpointStore(str(tmp_path / 'checkpoints.json'))
+    assert reloaded.get(dump, 'sql')['offset'] == 60
+    assert reloaded.get(dump, 'sql')['rows'] == 8
+    assert reloaded.get(dump, 'vector') is None
+    # Starting over from chunk 1 resets the row count
+    store.update(dump, 'sql', 30, 1, 4, 4)
+    assert store.get(dump, 'sql')['rows'] == 4
+
+
+def test_replaced_dump_invalidates_checkpoint(tmp_path, dump):
+    store = CheckpointStore(str(tmp_path / 'checkpoints.json'))
+    store.update(dump, 'sql', 30, 1, 4, 4)
+    with open(dump, 'a', encoding='utf-8') as f:
+        f.write('10,appended\n')
+    assert store.get(dump, 'sql') is not None
+    with open(dump, 'w', encoding='utf-8') as f:
+        f.write('source_id,text\n99,a different dump that is long enough\n')
+    assert store.get(dump, 'sql') is None
+
+
+def test_crash_rolls_back_chunk_and_checkpoint(engine, dump):
+    store = TableCheckpointStore(engine)
+    with pytest.raises(Crash):
+        load(engine, store, dump, crash_at=2)
+    assert count_rows(engine, 'items') == 4
+    assert store.get(dump, 'sql')['chunk'] == 1
+
+    # The resumed run repeats only the chunk that was in flight
+    assert load(engine, store, dump) == 2
+    assert count_rows(engine, 'items') == 10
+    assert store.get(dump, 'sql')['rows'] == 10
+    ids = pd.read_sql('SELECT source_id FROM items ORDER BY source_id', engine)['source_id'].tolist()
+    assert ids == list(range(10))
+
+
+def test_finished_load_resumes_with_nothing_to_do(engine, dump):
+    store = TableCheckpointStore(engine)
+    load(engine, store, dump)
+    assert load(engine, store, dump) == 0
+    assert count_rows(engine, 'items') == 10
+
+
+def test_table_store_clear(engine, dump, tmp_path):
+    store = TableCheckpointStore(engine)
+    other = tmp_path / 'other.csv'
+    other.write_text('source_id\n1\n', encoding='utf-8')
+    load(engine, store, dump)
+    with engine.begin() as conn:
+        store.update(conn, str(other), 'sql', 12, 1, 1, 4)
+    store.clear(dump)
+    assert store.get(dump, 'sql') is None
+    assert store.get(str(other), 'sql') is not None
+    store.clear()
+    assert store.get(str(other), 'sql') is None
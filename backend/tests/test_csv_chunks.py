@@ -0,0 +1,40 @@
+from csv_chunks import iter_csv_chunks
+
+
+def write_csv(path, rows):
+    path.write_text('id,text\n' + ''.join(f'{i},{text}\n' for i, text in rows), encoding='utf-8')
+    return str(path)
+
+
+def test_chunks_cover_every_record_once(tmp_path):
+    path = write_csv(tmp_path / 'dump.csv', [(i, f'row {i}') for i in range(10)])
+    chunks = list(iter_csv_chunks(path, 4))
+    assert [len(chunk) for chunk, _ in chunks] == [4, 4, 2]
+    assert [i for chunk, _ in chunks for i in chunk['id']] == list(range(10))
+    assert chunks[-1][1] == (tmp_path / 'dump.csv').stat().st_size
+
+
+def test_resume_from_yielded_offset(tmp_path):
+    path = write_csv(tmp_path / 'dump.csv', [(i, f'row {i}') for i in range(10)])
+    _, offset = next(iter_csv_chunks(path, 4))
+    resumed = list(iter_csv_chunks(path, 4, start_offset=offset))
+    assert [i for chunk, _ in resumed for i in chunk['id']] == list(range(4, 10))
+    # The header is still applied to chunks read from the middle of the file
+    assert list(resumed[0][0].columns) == ['id', 'text']
+
+
+def test_quoted_newlines_stay_in_one_record(tmp_path):
+    path = write_csv(tmp_path / 'dump.csv', [(0, '"first\nline"'), (1, 'plain'), (2, '"a ""quoted"" \nvalue"')])
+    chunks = list(iter_csv_chunks(path, 2))
+    assert [len(chunk) for chunk, _ in chunks] == [2, 1]
+    assert chunks[0][0]['text'][0] == 'first\nline'
+    assert chunks[1][0]['text'][0] == 'a "quoted" \nvalue'
+
+
+def test_appended_records_are_picked_up(tmp_path):
+    path = write_csv(tmp_path / 'dump.csv', [(i, 'x') for i in range(3)])
+    *_, (_, offset) = iter_csv_chunks(path, 2)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('3,x\n4,x\n')
+    resumed = list(iter_csv_chunks(path, 2, start_offset=offset))
+    assert [i for chunk, _ in resumed for i in chunk['id']] == [3, 4]
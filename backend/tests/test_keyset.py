@@ -0,0 +1,79 @@
+import base64
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from keyset import InvalidCursor, board_cursor, decode_cursor, encode_cursor, ensure_keyset_indexes, fetch_page
+from rollups import LEADERBOARD, SOURCE_TABLES, read_leaderboard
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'insights.db'}")
+    # Many ties on the metric, so the source_id tie-break decides page boundaries
+    pd.DataFrame({
+        'source_id': range(50),
+        'likes': [i % 7 for i in range(50)],
+        'text': [f'comment {i}' for i in range(50)],
+        'username': 'someone',
+        'date_of_comment': '2026-01-01',
+    }).to_sql('reddit_comments', engine, index=False)
+    ensure_keyset_indexes(engine, 'reddit_comments')
+    return engine
+
+
+@pytest.mark.parametrize('value', [0, 12345678901, 2.5, None, 'text'])
+def test_cursor_round_trip(value):
+    cursor = encode_cursor('reddit_posts', 'views', value, 42)
+    assert '=' not in cursor
+    assert decode_cursor(cursor, 'reddit_posts', 'views') == (value, 42)
+
+
+def test_cursor_for_another_listing_is_rejected():
+    cursor = encode_cursor('reddit_posts', 'views', 10, 1)
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 'reddit_posts', 'engagement')
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 'youtube_posts', 'views')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not a cursor!',
+    base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+    base64.urlsafe_b64encode(b'[1, 2]').decode(),
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 'reddit_posts', 'views')
+
+
+def test_pages_cover_the_ranking_once(engine):
+    with engine.connect() as conn:
+        seen, cursor = [], None
+        while True:
+            page, cursor = fetch_page(conn, 'reddit_comments', 'likes', 8, cursor)
+            seen.extend(row['source_id'] for row in page)
+            if cursor is None:
+                break
+    expected = sorted(range(50), key=lambda i: (i % 7, i), reverse=True)
+    assert seen == expected
+
+
+def test_last_full_page_has_no_cursor(engine):
+    with engine.connect() as conn:
+        page, cursor = fetch_page(conn, 'reddit_comments', 'likes', 50)
+    assert len(page) == 50
+    assert cursor is None
+
+
+def test_board_cursor_continues_after_the_board(engine):
+    comments = pd.read_sql('SELECT * FROM reddit_comments', engine)
+    with engine.begin() as conn:
+        LEADERBOARD.apply(conn, SOURCE_TABLES['reddit_comments'], comments)
+        board = read_leaderboard(conn, 'reddit', 'comment_likes', 10)
+        page, _ = fetch_page(conn, 'reddit_comments', 'likes', 8, board_cursor('reddit_comments', 'likes', board, 10))
+        assert board_cursor('reddit_comments', 'likes', board, 11) is None
+    expected = sorted(range(50), key=lambda i: (i % 7, i), reverse=True)
+    assert [row['source_id'] for row in board] + [row['source_id'] for row in page] == expected[:18]
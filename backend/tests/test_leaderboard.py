@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from rollups import ALL_TIME, LEADERBOARD, SOURCE_TABLES, leaderboard_entries, read_leaderboard
+
+POSTS = SOURCE_TABLES['reddit_posts']
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'insights.db'}")
+
+
+def chunk():
+    # source_id 1 appears twice on the same day; the later row is the current one
+    return pd.DataFrame({
+        'source_id': [1, 2, 1],
+        'title': ['first', 'second', 'first (edited)'],
+        'timestamp': ['2026-10-01 08:00:00', '2026-10-01 09:00:00', '2026-10-01 10:00:00'],
+        'username': 'someone',
+        'engagement': [5, 7, 9],
+        'views': [50, 70, 90],
+    })
+
+
+def test_repeated_ids_become_one_entry_per_board():
+    entries = leaderboard_entries(POSTS, chunk())
+    assert not entries.duplicated(['metric', 'period', 'source_id']).any()
+    engagement = entries[(entries['metric'] == 'post_engagement') & (entries['period'] == ALL_TIME)]
+    assert engagement.set_index('source_id')['score'].to_dict() == {1: 9, 2: 7}
+    assert set(entries['period']) == {ALL_TIME, '2026-10-01'}
+
+
+def test_board_keeps_the_latest_row(engine):
+    with engine.begin() as conn:
+        LEADERBOARD.apply(conn, POSTS, chunk())
+        board = read_leaderboard(conn, 'reddit', 'post_engagement', 10)
+        daily = read_leaderboard(conn, 'reddit', 'post_engagement', 10, day='2026-10-01')
+    for rows in (board, daily):
+        assert [(row['source_id'], row['score']) for row in rows] == [(1, 9), (2, 7)]
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from bulk_load import BulkWriter
+from rollups import apply_rollups, read_leaderboard
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'insights.db'}")
+
+
+def posts(ids, titles, usernames, engagement, toxicity):
+    return pd.DataFrame({
+        'source_id': ids,
+        'title': titles,
+        'timestamp': '2026-10-01 08:00:00',
+        'username': usernames,
+        'engagement': engagement,
+        'views': [10 * value for value in engagement],
+        'toxicity': toxicity,
+    })
+
+
+def merge(engine, *chunks):
+    writer = BulkWriter(engine, 'reddit_posts', upsert_key='source_id', on_write=[apply_rollups])
+    for chunk in chunks:
+        writer.write(chunk)
+    writer.finish()
+
+
+def table(engine, name, index):
+    return pd.read_sql(f'SELECT * FROM {name}', engine).set_index(index)
+
+
+def test_merged_rows_replace_their_old_versions(engine):
+    merge(
+        engine,
+        posts([1, 2], ['solar panels', 'wind farms'], ['alice', 'bob'], [5, 7], ['toxic', 'non_toxic']),
+        # Post 1 is edited, changes hands and gains engagement; post 3 is new
+        posts([1, 3], ['solar roofs', 'tidal power'], ['carol', 'bob'], [20, 1], ['non_toxic', 'non_toxic']),
+    )
+
+    users = table(engine, 'user_stats', 'username')
+    assert 'alice' not in users.index
+    assert users.loc['carol', ['post_count', 'engagement_sum']].tolist() == [1, 20]
+    assert users.loc['bob', ['post_count', 'engagement_sum']].tolist() == [2, 8]
+
+    keywords = table(engine, 'keyword_daily', 'keyword')['mentions']
+    assert 'panels' not in keywords.index
+    assert keywords[['solar', 'roofs', 'wind', 'tidal']].tolist() == [1, 1, 1, 1]
+
+    toxicity = pd.read_sql('SELECT scored, toxic FROM toxicity_daily', engine)
+    assert toxicity.sum().tolist() == [3, 0]
+
+    with engine.connect() as conn:
+        board = read_leaderboard(conn, 'reddit', 'post_engagement', 10)
+    assert [(row['source_id'], row['score'], row['username']) for row in board] == [
+        (1, 20, 'carol'), (2, 7, 'bob'), (3, 1, 'bob'),
+    ]
+
+
+def test_reloading_unchanged_rows_leaves_the_rollups_alone(engine):
+    chunk = posts([1, 2], ['solar panels', 'wind farms'], ['alice', 'bob'], [5, 7], ['toxic', 'non_toxic'])
+    merge(engine, chunk)
+    before = {name: pd.read_sql(f'SELECT * FROM {name}', engine) for name in ('user_stats', 'keyword_daily', 'toxicity_daily', 'leaderboard')}
+    merge(engine, chunk)
+    for name, rows in before.items():
+        pd.testing.assert_frame_equal(pd.read_sql(f'SELECT * FROM {name}', engine), rows)
@@ -0,0 +1,103 @@
+import json
+
+import pandas as pd
+
+from realtime import NOTIFY_MAX_BYTES, ActivityStore, GRANULARITIES, Snapshot, bucket_totals, notify_payloads
+from rollups import SOURCE_TABLES
+
+POSTS, COMMENTS = SOURCE_TABLES['reddit_posts'], SOURCE_TABLES['youtube_comments']
+NOW = pd.Timestamp('2026-10-19 00:30:00', tz='UTC').timestamp()
+
+
+def posts():
+    return pd.DataFrame({
+        'timestamp': ['2026-10-18 23:10', '2026-10-18 23:50', '2026-10-19 00:05', '2026-10-19 00:29'],
+        'engagement': [1, 2, 3, 6],
+        'sentiment_positive': [0.5, None, 0.25, 1.0],
+        'sentiment_negative': [0.5, None, 0.75, 0.0],
+        'sentiment_neutral': [0.0, None, 0.0, 0.0],
+    })
+
+
+def comments():
+    return pd.DataFrame({'date_of_comment': ['2026-10-19 00:25'], 'likes': [4]})
+
+
+def store():
+    activity = ActivityStore()
+    for source, rows in ((POSTS, posts()), (COMMENTS, comments())):
+        for granularity, (width, size) in GRANULARITIES.items():
+            activity.add(source['platform'], source['kind'], granularity, bucket_totals(source, rows, width, size, NOW), NOW)
+    return activity
+
+
+def test_snapshot_visibility():
+    snapshot = Snapshot('100:105:100,103')
+    # Committed before the oldest transaction still running
+    assert snapshot.sees(99)
+    # Between xmin and xmax: committed unless still in progress
+    assert not snapshot.sees(100)
+    assert snapshot.sees(101)
+    assert snapshot.sees(104)
+    assert not snapshot.sees(103)
+    # Started after the snapshot was taken
+    assert not snapshot.sees(105)
+    assert not snapshot.sees(200)
+
+
+def test_snapshot_without_running_transactions():
+    snapshot = Snapshot('812:812:')
+    assert snapshot.in_progress == set()
+    assert snapshot.sees(811)
+    assert not snapshot.sees(812)
+
+
+def test_bucket_totals_count_from_the_epoch():
+    hours = bucket_totals(POSTS, posts(), 3600, 24, NOW)
+    first_hour = int(pd.Timestamp('2026-10-18 23:00', tz='UTC').timestamp()) // 3600
+    # [bucket, items, engagement, positive, negative, neutral, scored]
+    assert hours == [[first_hour, 2, 3, 0.5, 0.5, 0.0, 1], [first_hour + 1, 2, 9, 1.25, 0.75, 0.0, 2]]
+
+
+def test_bucket_totals_keep_only_the_window():
+    rows = pd.DataFrame({'timestamp': ['2026-10-19 00:10', '2026-10-19 00:11', '2026-10-19 00:31', 'not a time'], 'engagement': 1})
+    # The newest 20 minute buckets are 00:11 to 00:30; later and unparseable times are dropped too
+    minutes = bucket_totals(POSTS, rows, 60, 20, NOW)
+    assert [bucket for bucket, *_ in minutes] == [int(NOW) // 60 - 19]
+    assert bucket_totals(POSTS, rows, 60, 20, NOW + 3600) == []
+
+
+def test_notify_payloads_stay_under_the_limit():
+    # Wide entries: ~75 bytes each, so a count-based split would overflow
+    buckets = [[29000000 + i, 123456, 1234567890, 12345.6789, 12345.6789, 12345.6789, 123456] for i in range(1000)]
+    payloads = list(notify_payloads(2 ** 40, POSTS, 'minute', buckets))
+    assert len(payloads) > 1
+    assert all(len(payload.encode()) <= NOTIFY_MAX_BYTES for payload in payloads)
+    messages = [json.loads(payload) for payload in payloads]
+    assert [entry for message in messages for entry in message['buckets']] == buckets
+    assert {(message['xid'], message['platform'], message['granularity']) for message in messages} == {(2 ** 40, 'reddit', 'minute')}
+    assert list(notify_payloads(1, POSTS, 'minute', [])) == []
+
+
+def test_hourly_sums_each_hour_of_minutes():
+    assert store().hourly('post', NOW) == [
+        {'hour': '23:00', 'activity_count': 2, 'avg_engagement': 1.5},
+        {'hour': '00:00', 'activity_count': 2, 'avg_engagement': 4.5},
+    ]
+    assert store().hourly('comment', NOW) == [{'hour': '00:00', 'activity_count': 1, 'avg_engagement': 4.0}]
+
+
+def test_metrics_windows():
+    assert store().metrics(NOW) == {
+        'items_24h': 5,
+        'posts_per_hour': 3,  # 23:50, 00:05 and 00:29
+        'comments_per_minute': 0.1,
+        'avg_post_engagement': round(11 / 3, 2),
+    }
+
+
+def test_daily_splits_at_utc_midnight():
+    assert store().daily(30, NOW) == [
+        {'date': '2026-10-18', 'reddit_posts': 2, 'youtube_posts': 0, 'reddit_comments': 0, 'youtube_comments': 0, 'total_engagement': 3},
+        {'date': '2026-10-19', 'reddit_posts': 2, 'youtube_posts': 0, 'reddit_comments': 0, 'youtube_comments': 1, 'total_engagement': 13},
+    ]
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from rollups import apply_rollups, reset_source
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'insights.db'}")
+    posts = pd.DataFrame({
+        'source_id': [1, 2],
+        'title': ['solar panels', 'wind farms'],
+        'timestamp': '2026-10-01 08:00:00',
+        'username': ['alice', 'bob'],
+        'engagement': [5, 7],
+        'views': [50, 70],
+        'toxicity': 'non_toxic',
+    })
+    comments = pd.DataFrame({
+        'source_id': [10],
+        'text': ['solar is cheap'],
+        'date_of_comment': '2026-10-01 09:00:00',
+        'username': ['bob'],
+        'likes': [3],
+        'toxicity': 'toxic',
+    })
+    with engine.begin() as conn:
+        apply_rollups(conn, 'reddit_posts', posts)
+        apply_rollups(conn, 'youtube_posts', posts)
+        apply_rollups(conn, 'reddit_comments', comments)
+    return engine
+
+
+def rows(engine, table):
+    return pd.read_sql(f'SELECT * FROM {table}', engine)
+
+
+def test_reset_only_takes_out_the_reloaded_table(engine):
+    before = {table: rows(engine, table) for table in ('keyword_daily', 'toxicity_daily', 'leaderboard', 'content_sample')}
+    reset_source(engine, 'reddit_posts')
+
+    for table, previous in before.items():
+        kind = previous['metric'].str.split('_').str[0] if table == 'leaderboard' else previous['kind']
+        expected = previous[(previous['platform'] != 'reddit') | (kind != 'post')]
+        pd.testing.assert_frame_equal(rows(engine, table), expected.reset_index(drop=True))
+
+    sketches = rows(engine, 'trending_sketch')
+    assert set(zip(sketches['platform'], sketches['kind'])) == {('youtube', 'post'), ('reddit', 'comment')}
+
+
+def test_reset_keeps_the_other_kind_of_user_stats(engine):
+    reset_source(engine, 'reddit_posts')
+    users = rows(engine, 'user_stats').set_index(['platform', 'username'])
+    assert ('reddit', 'alice') not in users.index
+    bob = users.loc[('reddit', 'bob')]
+    assert bob[['post_count', 'engagement_sum', 'comment_count', 'likes_sum']].tolist() == [0, 0, 1, 3]
+    assert users.loc[('youtube', 'alice'), 'post_count'] == 1
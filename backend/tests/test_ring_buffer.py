@@ -0,0 +1,64 @@
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+
+def ring(size=5):
+    return RingBuffer(width=60, size=size, series=['a', 'b'], fields=['items', 'engagement'])
+
+
+def items(buffer, first, last, series='a'):
+    window = buffer.window(first, last)
+    return buffer.field(window, 'items')[:, buffer.series[series]].tolist()
+
+
+def test_window_in_time_order_across_the_wrap():
+    buffer = ring()
+    buffer.add('a', [10, 11, 12], [[1, 0], [2, 0], [3, 0]], now_bucket=12)
+    buffer.add('a', [13, 14], [[4, 0], [5, 0]], now_bucket=14)
+    # Buckets 10..14 occupy slots 0..4; bucket 15 reuses bucket 10's slot
+    buffer.add('a', [15], [[6, 0]], now_bucket=15)
+    assert items(buffer, 11, 15) == [2, 3, 4, 5, 6]
+    # Bucket 10 fell out of the ring and reads as zero
+    assert items(buffer, 9, 12) == [0, 0, 2, 3]
+
+
+def test_advance_clears_the_buckets_it_passes():
+    buffer = ring()
+    buffer.add('a', [0, 1, 2, 3, 4], np.ones((5, 2)), now_bucket=4)
+    buffer.advance(6)
+    assert items(buffer, 2, 6) == [1, 1, 1, 0, 0]
+    # Moving backwards is a no-op
+    buffer.advance(3)
+    assert buffer.head == 6
+
+
+def test_jump_past_the_whole_ring_clears_it():
+    buffer = ring()
+    buffer.add('a', [0, 1, 2], np.ones((3, 2)), now_bucket=2)
+    buffer.advance(100)
+    assert not buffer.values.any()
+    assert items(buffer, 96, 100) == [0] * 5
+
+
+def test_add_drops_future_and_expired_buckets():
+    buffer = ring()
+    buffer.add('a', [3, 7, 9, 10, 11], np.ones((5, 2)), now_bucket=10)
+    assert items(buffer, 6, 10) == [0, 1, 0, 1, 1]
+
+
+def test_repeated_buckets_accumulate_per_series():
+    buffer = ring()
+    buffer.add('a', [4, 4, 3], [[1, 10], [2, 20], [5, 50]], now_bucket=4)
+    buffer.add('b', [4], [[7, 70]], now_bucket=4)
+    window = buffer.window(3, 4)
+    assert buffer.field(window, 'items').tolist() == [[5, 0], [3, 7]]
+    assert buffer.field(window, 'engagement').tolist() == [[50, 0], [30, 70]]
+
+
+def test_window_beyond_the_head_and_on_an_empty_ring():
+    buffer = ring()
+    assert items(buffer, 0, 3) == [0, 0, 0, 0]
+    buffer.add('a', [5], [[1, 0]], now_bucket=5)
+    assert items(buffer, 4, 8) == [0, 1, 0, 0, 0]
+    assert buffer.series_mask(lambda name: name == 'b').tolist() == [False, True]
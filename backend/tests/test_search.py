@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from search_index import any_word_query, ensure_search_index, reciprocal_rank_fusion, search_documents
+
+# The full-text index is Postgres only: point TEST_DATABASE_URL at a scratch database to run those tests
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+POSTS = {'reddit_posts': {'platform': 'reddit', 'kind': 'post', 'content': 'title', 'time': 'timestamp', 'engagement': 'engagement'}}
+
+
+def hit(table_name, row_id):
+    return {'table_name': table_name, 'row_id': row_id, 'text': f'{table_name} {row_id}', 'score': 1.0}
+
+
+def test_any_word_query_keeps_usernames_whole():
+    assert any_word_query('what did @john.doe and u/spez say?') == 'what or did or john.doe or and or u/spez or say'
+    assert any_word_query('#AI') == 'AI'
+    assert any_word_query('?!') == ''
+
+
+def test_a_lexical_only_hit_is_fused_in():
+    vector = [hit('reddit_posts', row_id) for row_id in range(20)]
+    lexical = [hit('reddit_comments', 7)]
+    fused = reciprocal_rank_fusion({'vector': vector, 'lexical': lexical})[:5]
+    assert [(h['table_name'], h['row_id']) for h in fused[:2]] == [('reddit_posts', 0), ('reddit_comments', 7)]
+    assert fused[1]['matched_by'] == ['lexical']
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason='needs a Postgres TEST_DATABASE_URL')
+def test_username_only_query_finds_the_users_rows():
+    engine = create_engine(TEST_DATABASE_URL)
+    pd.DataFrame({
+        'source_id': [1, 2, 3],
+        'title': ['solar panels are cheap', 'wind farms', 'the john.doe fan club'],
+        'timestamp': '2026-10-01 08:00:00',
+        'username': ['john.doe', 'someone', 'someone'],
+        'engagement': [1, 2, 3],
+    }).to_sql('reddit_posts', engine, if_exists='replace', index=False)
+    ensure_search_index(engine, 'reddit_posts')
+
+    with engine.connect() as conn:
+        rows = search_documents(conn, any_word_query('@john.doe'), tables=POSTS)
+    # A title match outranks the lower-weighted username match
+    assert [row['source_id'] for row in rows] == [3, 1]
+
+    vector = [hit('reddit_posts', 2)]
+    lexical = [{'table_name': 'reddit_posts', 'row_id': row['source_id'], 'text': row['content'], 'score': row['rank']} for row in rows]
+    fused = reciprocal_rank_fusion({'vector': vector, 'lexical': lexical})
+    assert {(h['row_id'], tuple(h['matched_by'])) for h in fused} == {(2, ('vector',)), (3, ('lexical',)), (1, ('lexical',))}
@@ -0,0 +1,71 @@
+from collections import Counter
+
+import numpy as np
+
+from trending import SpaceSaving
+
+
+def test_exact_below_capacity():
+    sketch = SpaceSaving(capacity=10)
+    for term in ['a', 'b', 'a', 'c', 'a', 'b']:
+        sketch.add(term)
+    assert sketch.top(2) == [('a', 3.0, 3, 0.0), ('b', 2.0, 2, 0.0)]
+
+
+def test_newcomer_inherits_evicted_score_as_error():
+    sketch = SpaceSaving(capacity=2)
+    sketch.add('a', 5.0)
+    sketch.add('b', 2.0)
+    sketch.add('c', 1.0)
+    assert set(sketch.counters) == {'a', 'c'}
+    assert sketch.counters['c'] == [3.0, 1, 2.0]
+
+
+def test_error_bounds_on_a_skewed_stream():
+    rng = np.random.default_rng(7)
+    stream = [f't{i}' for i in rng.zipf(1.3, 20000) if i < 5000]
+    truth = Counter(stream)
+    sketch = SpaceSaving(capacity=100)
+    for term in stream:
+        sketch.add(term)
+
+    assert len(sketch.counters) == 100
+    for term, (score, count, error) in sketch.counters.items():
+        # Scores never undercount, and score - error never overcounts
+        assert score >= truth[term]
+        assert score - error <= truth[term]
+    # Every term above N / capacity is guaranteed a counter
+    for term, seen in truth.items():
+        if seen > len(stream) / 100:
+            assert term in sketch.counters
+    assert [term for term, *_ in sketch.top(5)] == [term for term, _ in truth.most_common(5)]
+
+
+def test_grown_counters_are_not_evicted_by_stale_heap_entries():
+    sketch = SpaceSaving(capacity=2)
+    sketch.add('a', 1.0)
+    sketch.add('b', 2.0)
+    sketch.add('a', 5.0)  # leaves a stale (1.0, 'a') heap entry behind
+    sketch.add('c', 1.0)
+    assert set(sketch.counters) == {'a', 'c'}
+
+
+def test_merge_scales_and_keeps_the_largest():
+    day = SpaceSaving(capacity=3)
+    for term, weight in [('a', 4.0), ('b', 3.0), ('c', 1.0)]:
+        day.add(term, weight)
+    week = SpaceSaving(capacity=3)
+    week.add('d', 2.5)
+    week.merge(day, scale=0.5)
+    assert [(term, score) for term, score, *_ in week.top(3)] == [('d', 2.5), ('a', 2.0), ('b', 1.5)]
+    assert 'c' not in week.counters
+
+
+def test_json_round_trip_keeps_updating():
+    sketch = SpaceSaving(capacity=2)
+    sketch.add('a', 3.0)
+    sketch.add('b', 1.0)
+    restored = SpaceSaving.from_json(sketch.to_json(), capacity=2)
+    assert restored.counters == sketch.counters
+    restored.add('c', 1.0)
+    assert set(restored.counters) == {'a', 'c'}
@@ -0,0 +1,180 @@
+import heapq
+import math
+import numpy as np
+import orjson
+import pandas as pd
+from sqlalchemy import text
+
+from bulk_load import quote_ident
+from keywords import document_keywords
+from parsing import parse_timestamps
+
+# --- Streaming trending sketch ---
+# A Space-Saving summary (Metwally et al.) keeps the heaviest terms of a stream in a
+# fixed number of counters. One summary is kept per day, platform and kind, fed
+# from every ingested post title and comment, so any window/platform combination is
+# answered by merging a bounded number of small summaries.
+#
+# Mentions are weighted with exponential time decay: an item at time t counts
+# 2 ** -((T - t) / HALF_LIFE_DAYS) at query time T. Each day stores weights relative
+# to its own midnight (always in [1, 2 ** (1 / HALF_LIFE_DAYS))), and the query scales
+# whole days down, so weights never overflow however old the data gets.
+
+SKETCH_TABLE = 'trending_sketch'
+SKETCH_CAPACITY = 512  # counters per day/platform/kind
+HALF_LIFE_DAYS = 2.0
+DECAY_RATE = math.log(2) / HALF_LIFE_DAYS  # per day
+
+
+class SpaceSaving:
+    """
+    Top-k summary over weighted items. Each counter holds [score, count, error]:
+    the (over-)estimated score, the mentions seen since the term got its counter,
+    and the score it inherited from the counter it replaced.
+    """
+
+    def __init__(self, capacity=SKETCH_CAPACITY, counters=None):
+        self.capacity = capacity
+        self.counters = counters or {}
+        self._rebuild_heap()
+
+    def add(self, term, weight=1.0, count=1):
+        entry = self.counters.get(term)
+        if entry is not None:
+            entry[0] += weight
+            entry[1] += count
+        elif len(self.counters) < self.capacity:
+            entry = self.counters[term] = [weight, count, 0.0]
+        else:
+            # Evict the smallest counter; the newcomer inherits its score as error
+            floor, victim = self._pop_min()
+            del self.counters[victim]
+            entry = self.counters[term] = [floor + weight, count, floor]
+        heapq.heappush(self._heap, (entry[0], term))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def merge(self, other, scale=1.0):
+        """Adds another summary's counters (scaled), keeping the `capacity` largest."""
+        for term, (score, count, error) in other.counters.items():
+            entry = self.counters.setdefault(term, [0.0, 0, 0.0])
+            entry[0] += score * scale
+            entry[1] += count
+            entry[2] += error * scale
+        if len(self.counters) > self.capacity:
+            kept = heapq.nlargest(self.capacity, self.counters.items(), key=lambda item: item[1][0])
+            self.counters = dict(kept)
+        self._rebuild_heap()
+
+    def top(self, k):
+        """[(term, score, count, error)] for the k highest-scoring terms."""
+        ranked = heapq.nlargest(k, self.counters.items(), key=lambda item: item[1][0])
+        return [(term, score, count, error) for term, (score, count, error) in ranked]
+
+    def to_json(self):
+        return orjson.dumps([[term, *entry] for term, entry in self.counters.items()]).decode()
+
+    @classmethod
+    def from_json(cls, payload, capacity=SKETCH_CAPACITY):
+        return cls(capacity, {term: [score, count, error] for term, score, count, error in orjson.loads(payload)})
+
+    def _pop_min(self):
+        # The heap holds stale entries for counters that grew since; skip them
+        while True:
+            score, term = heapq.heappop(self._heap)
+            entry = self.counters.get(term)
+            if entry is not None and entry[0] == score:
+                return score, term
+
+    def _rebuild_heap(self):
+        self._heap = [(entry[0], term) for term, entry in self.counters.items()]
+        heapq.heapify(self._heap)
+
+
+class TrendingSketchRollup:
+    """Keeps trending_sketch up to date from ingested chunks (used like rollups.Rollup)."""
+
+    table = SKETCH_TABLE
+
+    def ensure_table(self, conn):
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {quote_ident(self.table)} ("
+            "day DATE NOT NULL, platform TEXT NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+            "PRIMARY KEY (day, platform, kind))"
+        ))
+
+    def reset(self, conn, platform, kind):
+        conn.execute(text(f"DELETE FROM {quote_ident(self.table)} WHERE platform = :platform AND kind = :kind"),
+                     {'platform': platform, 'kind': kind})
+
+    def replace(self, conn, source, rows, replaced):
+        """Decayed counts cannot be taken back out of a sketch, so a merged chunk only adds
+        the rows that are new to the table; overwritten rows keep their old keywords."""
+        self.apply(conn, source, rows[~rows['source_id'].isin(replaced['source_id'])])
+
+    def apply(self, conn, source, rows):
+        rows = rows.reset_index(drop=True)
+        keywords = document_keywords(rows[source['text']])
+        if keywords.empty:
+            return
+        times = parse_timestamps(rows[source['time']])
+        days = times.dt.floor('D')
+        # Decay weight relative to the start of the item's own day
+        weights = np.exp((times - days).dt.total_seconds().to_numpy() / 86400 * DECAY_RATE)
+        terms = pd.DataFrame({
+            'day': days.loc[keywords.index].to_numpy(),
+            'keyword': keywords.to_numpy(),
+            'weight': weights[keywords.index.to_numpy()],
+            'count': 1,
+        }).dropna(subset=['day'])
+        if terms.empty:
+            return
+        self.ensure_table(conn)
+
+        for day, day_terms in terms.groupby('day', sort=False):
+            key = {'day': day.strftime('%Y-%m-%d'), 'platform': source['platform'], 'kind': source['kind']}
+            payload = conn.execute(text(
+                f"SELECT payload FROM {quote_ident(self.table)} "
+                "WHERE day = :day AND platform = :platform AND kind = :kind"
+            ), key).scalar()
+            sketch = SpaceSaving.from_json(payload) if payload else SpaceSaving()
+            totals = day_terms.groupby('keyword', sort=False)[['weight', 'count']].sum()
+            for term, weight, count in totals.itertuples():
+                sketch.add(term, weight, int(count))
+            conn.execute(text(
+                f"INSERT INTO {quote_ident(self.table)} (day, platform, kind, payload) "
+                "VALUES (:day, :platform, :kind, :payload) "
+                "ON CONFLICT (day, platform, kind) DO UPDATE SET payload = EXCLUDED.payload"
+            ), {**key, 'payload': sketch.to_json()})
+
+
+def top_trending(conn, days=7, platforms=None, kinds=None, limit=20, end_day=None):
+    """
+    Merges the day sketches of the window ending at `end_day` (default: the newest
+    day with data) and returns the top `limit` terms with their decayed scores.
+    """
+    if end_day is None:
+        end_day = conn.execute(text(f"SELECT MAX(day) FROM {quote_ident(SKETCH_TABLE)}")).scalar()
+        if end_day is None:
+            return []
+    last_day = pd.Timestamp(end_day)
+    end = last_day + pd.Timedelta(days=1)
+    filters = ["day > :start", "day <= :last_day"]
+    params = {
+        'start': (last_day - pd.Timedelta(days=days)).strftime('%Y-%m-%d'),
+        'last_day': last_day.strftime('%Y-%m-%d'),
+    }
+    for column, values in (('platform', platforms), ('kind', kinds)):
+        if values:
+            names = [f'{column}{i}' for i in range(len(values))]
+            filters.append(f"{column} IN ({', '.join(':' + name for name in names)})")
+            params.update(zip(names, values))
+
+    merged = SpaceSaving()
+    rows = conn.execute(text(
+        f"SELECT day, payload FROM {quote_ident(SKETCH_TABLE)} WHERE {' AND '.join(filters)}"
+    ), params)
+    for day, payload in rows:
+        age = (end - pd.Timestamp(day)).days  # whole days between the bucket's start and the window end
+        merged.merge(SpaceSaving.from_json(payload), scale=math.exp(-DECAY_RATE * age))
+    return merged.top(limit)
@@ -0,0 +1,109 @@
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+# --- Overlapped vector upserts ---
+# The loader encodes one CSV chunk at a time on the main thread and hands the float32
+# embedding matrix to this pipeline. A bounded queue feeds several upsert threads, so
+# the network is busy while the next chunk is being encoded, and a slow index pushes
+# back on the encoder instead of piling up vectors in memory.
+
+
+class VectorUpsertPipeline:
+    """
+    Upserts (id, vector, metadata) batches to a Pinecone index from worker threads.
+
+    Each submitted chunk carries a `token`; `on_chunk_done(token)` is called once
+    every batch of that chunk has been acknowledged, always in submission order, so
+    callers can checkpoint progress safely. Failed batches are retried with
+    exponential backoff; if a batch still fails the error is re-raised from
+    `submit()` / `close()`.
+    """
+
+    def __init__(self, index, batch_size=100, workers=4, max_pending=32, max_retries=5, on_chunk_done=None):
+        self.index = index
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.on_chunk_done = on_chunk_done
+        self.vectors = 0
+        self.started = time.perf_counter()
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._remaining = {}
+        self._order = deque()
+        self._error = None
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, token, ids, embeddings, metadata):
+        """Queues one chunk. `embeddings` is the (n, dim) float32 array from the model."""
+        self._raise_if_failed()
+        batches = [
+            (token, ids[j:j + self.batch_size], embeddings[j:j + self.batch_size], metadata[j:j + self.batch_size])
+            for j in range(0, len(ids), self.batch_size)
+        ]
+        with self._lock:
+            self._order.append(token)
+            self._remaining[token] = len(batches)
+            if not batches:
+                self._flush_done()
+        for batch in batches:
+            self._queue.put(batch)
+
+    def close(self):
+        """Waits for every queued batch, stops the workers and prints the upsert rate."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._raise_if_failed()
+        elapsed = time.perf_counter() - self.started
+        rate = self.vectors / elapsed if elapsed else 0
+        print(f"  - Upserted {self.vectors:,} vectors in {elapsed:.1f}s ({rate:,.0f} vectors/s)")
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            token, ids, embeddings, metadata = item
+            if self._error is not None:
+                continue  # drain the queue so close() can finish
+            try:
+                # Vectors stay float32 until here; the client serialises each row per request
+                self._upsert_with_retry(list(zip(ids, embeddings, metadata)))
+            except Exception as e:
+                self._error = e
+                continue
+            with self._lock:
+                self.vectors += len(ids)
+                self._remaining[token] -= 1
+                self._flush_done()
+
+    def _upsert_with_retry(self, vectors):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.index.upsert(vectors=vectors)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(30, 0.5 * 2 ** attempt) * (0.5 + random.random())
+                print(f"    ! Upsert failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _flush_done(self):
+        """Reports finished chunks in submission order. Must hold self._lock."""
+        while self._order and self._remaining[self._order[0]] == 0:
+            token = self._order.popleft()
+            del self._remaining[token]
+            if self.on_chunk_done is not None:
+                self.on_chunk_done(token)
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise RuntimeError(f"Vector upsert failed: {self._error}") from self._error
@@ -120,19 +120,13 @@ export default function RealtimeFeed() {
   const [isLoading, setIsLoading] = useState(true);
 
   const [liveMetrics, setLiveMetrics] = useState({
-    activeUsers: 1247,
-    postsPerHour: 89,
-    commentsPerMinute: 23,
-    engagementRate: 94.2
+    items24h: 0,
+    postsPerHour: 0,
+    commentsPerMinute: 0,
+    avgPostEngagement: 0
   });
   
-  const [activityFeed, setActivityFeed] = useState([
-    { id: 1, action: "New high-engagement post", platform: "Reddit", time: "2 min ago", metric: "1.2K", metricType: "upvotes", type: "post" },
-    { id: 2, action: "Viral comment thread", platform: "YouTube", time: "5 min ago", metric: "856", metricType: "likes", type: "comment" },
-    { id: 3, action: "Trending discussion", platform: "Reddit", time: "8 min ago", metric: "2.1K", metricType: "views", type: "post" },
-    { id: 4, action: "Popular video comment", platform: "YouTube", time: "12 min ago", metric: "445", metricType: "likes", type: "comment" },
-    { id: 5, action: "Breaking news post", platform: "Reddit", time: "15 min ago", metric: "3.5K", metricType: "engagement", type: "post" }
-  ]);
+  const [activityFeed, setActivityFeed] = useState([]);
 
   const fetchActivityData = async () => {
     try {
@@ -151,38 +145,45 @@ export default function RealtimeFeed() {
     fetchActivityData();
   }, []);
 
+  // The server pushes a snapshot on connect, then one message per ingested chunk
   useEffect(() => {
     if (!isLive) return;
-    
-    const metricInterval = setInterval(() => {
-      setLiveMetrics(prev => ({
-        activeUsers: Math.max(500, prev.activeUsers + Math.floor(Math.random() * 20) - 10),
-        postsPerHour: Math.max(30, prev.postsPerHour + Math.floor(Math.random() * 6) - 3),
-        commentsPerMinute: Math.max(10, prev.commentsPerMinute + Math.floor(Math.random() * 4) - 2),
-        engagementRate: Math.max(85, Math.min(98, prev.engagementRate + (Math.random() - 0.5) * 0.5))
-      }));
-      setLastUpdate(new Date());
-    }, 2000);
 
-    const feedInterval = setInterval(() => {
-        setActivityFeed(prevFeed => {
-            const newItem = {
-                id: Date.now(),
-                action: "New user interaction detected",
-                platform: Math.random() > 0.5 ? "Reddit" : "YouTube",
-                time: "Just now",
-                metric: Math.floor(Math.random() * 500) + 50,
-                metricType: "engagement",
-                type: Math.random() > 0.5 ? "post" : "comment"
-            };
-            return [newItem, ...prevFeed.slice(0, 4)];
-        });
-    }, 5000);
+    const source = new EventSource(`${API_BASE_URL}/api/realtime/stream`);
+    source.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      setActivityData(message.activity);
+      setLiveMetrics({
+        items24h: message.metrics.items_24h,
+        postsPerHour: message.metrics.posts_per_hour,
+        commentsPerMinute: message.metrics.comments_per_minute,
+        avgPostEngagement: message.metrics.avg_post_engagement
+      });
+      setLastUpdate(new Date());
+      setIsLoading(false);
 
-    return () => {
-        clearInterval(metricInterval);
-        clearInterval(feedInterval);
+      if (message.type === 'delta') {
+        const platform = message.platform === 'reddit' ? 'Reddit' : 'YouTube';
+        setActivityFeed(prevFeed => [
+          {
+            id: Date.now(),
+            action: `${message.items.toLocaleString()} new ${message.kind}${message.items === 1 ? '' : 's'}`,
+            platform,
+            time: new Date().toLocaleTimeString(),
+            metric: message.engagement.toLocaleString(),
+            metricType: message.kind === 'post' ? 'engagement' : 'likes',
+            type: message.kind
+          },
+          ...prevFeed.slice(0, 4)
+        ]);
+      }
+    };
+    source.onerror = (error) => {
+      // EventSource reconnects on its own
+      console.error('Realtime stream error:', error);
     };
+
+    return () => source.close();
   }, [isLive]);
 
   if (isLoading) {
@@ -224,10 +225,10 @@ export default function RealtimeFeed() {
         </motion.div>
 
         <div className="grid gap-6 md:grid-cols-2 lg:grid-cols-4 mb-8">
-          <LiveMetric title="Active Users" value={liveMetrics.activeUsers.toLocaleString()} unit="online" icon={<Users className="h-6 w-6 text-emerald-600" />} iconBg="bg-emerald-100" trend={5.2} isActive={isLive} />
-          <LiveMetric title="Posts per Hour" value={liveMetrics.postsPerHour} unit="posts" icon={<MessageSquare className="h-6 w-6 text-indigo-600" />} iconBg="bg-indigo-100" trend={-2.1} isActive={isLive} />
-          <LiveMetric title="Comments/Min" value={liveMetrics.commentsPerMinute} unit="comments" icon={<Activity className="h-6 w-6 text-purple-600" />} iconBg="bg-purple-100" trend={8.7} isActive={isLive} />
-          <LiveMetric title="Engagement Rate" value={liveMetrics.engagementRate.toFixed(1)} unit="%" icon={<Zap className="h-6 w-6 text-amber-600" />} iconBg="bg-amber-100" trend={1.3} isActive={isLive} />
+          <LiveMetric title="Activity (24h)" value={liveMetrics.items24h.toLocaleString()} unit="items" icon={<Users className="h-6 w-6 text-emerald-600" />} iconBg="bg-emerald-100" isActive={isLive} />
+          <LiveMetric title="Posts per Hour" value={liveMetrics.postsPerHour} unit="posts" icon={<MessageSquare className="h-6 w-6 text-indigo-600" />} iconBg="bg-indigo-100" isActive={isLive} />
+          <LiveMetric title="Comments/Min" value={liveMetrics.commentsPerMinute} unit="comments" icon={<Activity className="h-6 w-6 text-purple-600" />} iconBg="bg-purple-100" isActive={isLive} />
+          <LiveMetric title="Avg Engagement" value={liveMetrics.avgPostEngagement.toFixed(1)} unit="per post" icon={<Zap className="h-6 w-6 text-amber-600" />} iconBg="bg-amber-100" isActive={isLive} />
         </div>
 
         <div className="grid gap-8 lg:grid-cols-3">
@@ -256,12 +257,15 @@ export default function RealtimeFeed() {
                         <ActivityFeedItem key={item.id} item={item} index={index} />
                     ))}
                 </AnimatePresence>
+                {activityFeed.length === 0 && (
+                    <p className="text-sm text-slate-500">Waiting for new posts and comments...</p>
+                )}
             </div>
             {isLive && (
                 <div className="mt-4 p-3 bg-emerald-50 rounded-lg border border-emerald-200">
                     <div className="flex items-center gap-3 text-sm text-emerald-800">
                         <RefreshCw className="h-4 w-4 animate-spin" style={{ animationDuration: '2s' }} />
-                        <span>Feed is live and auto-refreshing.</span>
+                        <span>Feed is live: updates are pushed as data is ingested.</span>
                     </div>
                 </div>
             )}